@@ -0,0 +1,138 @@
+import json
+import os
+import re
+import threading
+
+# --- CONFIGURATION ---
+DEFAULT_ACCOUNT = "default"
+
+# Posts carry an `account` key; posts without one belong to "default", the plain TWITTER_* keys.
+# X_ACCOUNTS lists the others ("acme,globex"). Each reads TWITTER_<NAME>_ACCESS_TOKEN and
+# TWITTER_<NAME>_ACCESS_TOKEN_SECRET, plus TWITTER_<NAME>_CONSUMER_KEY / _CONSUMER_SECRET when the
+# account uses its own app (otherwise the app keys of "default" are shared).
+# X_ACCOUNTS_JSON (one secret instead of four per account) holds the same keys by account name:
+#   {"acme": {"access_token": "...", "access_token_secret": "...", "consumer_key": "...", "consumer_secret": "..."}}
+# Its accounts are configured without listing them in X_ACCOUNTS; the consumer keys are optional as above.
+
+
+def account_of(post):
+    return post.get("account") or DEFAULT_ACCOUNT
+
+
+def group_account(group):
+    """Account of a single or thread (every part of a thread goes out from the same account)."""
+    return account_of(group["items"][0])
+
+
+def json_accounts(env=os.environ):
+    """{name: {key field: value}} from X_ACCOUNTS_JSON ({} when unset)."""
+    try:
+        data = json.loads(env.get("X_ACCOUNTS_JSON") or "{}")
+    except ValueError as e:
+        raise ValueError(f"X_ACCOUNTS_JSON is not valid JSON ({e})") from None
+    if not isinstance(data, dict) or not all(isinstance(v, dict) for v in data.values()):
+        raise ValueError('X_ACCOUNTS_JSON must map account names to objects, e.g. {"acme": {"access_token": "..."}}')
+    return data
+
+
+def names(env=os.environ):
+    """Configured account names, "default" first."""
+    extra = [n.strip() for n in env.get("X_ACCOUNTS", "").split(",") if n.strip()] + list(json_accounts(env))
+    return [DEFAULT_ACCOUNT] + [n for n in dict.fromkeys(extra) if n != DEFAULT_ACCOUNT]
+
+
+def account_keys(name, default_keys, env=os.environ):
+    """(consumer key, consumer secret, access token, access secret) of an account, or None if it isn't configured."""
+    entry = json_accounts(env).get(name)
+    if name == DEFAULT_ACCOUNT:
+        keys = tuple(default_keys)
+    elif entry is not None:
+        keys = (
+            entry.get("consumer_key") or default_keys[0],
+            entry.get("consumer_secret") or default_keys[1],
+            entry.get("access_token"),
+            entry.get("access_token_secret"),
+        )
+    else:
+        prefix = "TWITTER_" + re.sub(r"[^A-Z0-9]", "_", name.upper()) + "_"
+        keys = (
+            env.get(prefix + "CONSUMER_KEY") or default_keys[0],
+            env.get(prefix + "CONSUMER_SECRET") or default_keys[1],
+            env.get(prefix + "ACCESS_TOKEN"),
+            env.get(prefix + "ACCESS_TOKEN_SECRET"),
+        )
+    return keys if all(keys) else None
+
+
+class UnknownAccount(LookupError):
+    """A post names an account that has no credentials configured."""
+
+
+class Account:
+    """One X account's clients, its own rate-limit bucket and its own image stager (media ids belong to the uploader)."""
+
+    __slots__ = ("name", "client", "api", "limiter", "stager")
+
+    def __init__(self, name, client, api, limiter, stager):
+        self.name, self.client, self.api, self.limiter, self.stager = name, client, api, limiter, stager
+
+
+class AccountPool:
+    """Authenticated clients per account, built on first use and kept for the life of the process.
+
+    `factory(name)` builds an Account and raises UnknownAccount for an account without
+    credentials; that error is remembered, so a misconfigured account fails its posts without
+    retrying the lookup for each one.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._accounts = {}  # name -> Account or UnknownAccount
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._accounts:
+                try:
+                    self._accounts[name] = self.factory(name)
+                except UnknownAccount as e:
+                    self._accounts[name] = e
+            account = self._accounts[name]
+        if isinstance(account, UnknownAccount): raise account
+        return account
+
+    def paused_until(self, name):
+        """Epoch seconds until which the account is rate limited after a 429 (0 if it isn't, or has no clients yet)."""
+        with self._lock:
+            account = self._accounts.get(name)
+        return account.limiter.paused_until if isinstance(account, Account) else 0
+
+    def _stagers(self, posts):
+        """(stager, posts) per account; posts of accounts without credentials are left out."""
+        by_account = {}
+        for p in posts: by_account.setdefault(account_of(p), []).append(p)
+        for name, batch in by_account.items():
+            try:
+                yield self.get(name).stager, batch
+            except UnknownAccount:
+                continue  # fails when it's posted, with the reason saved in its delivery state
+
+    def stage(self, posts):
+        """Starts image uploads for `posts`, each on its own account's stager."""
+        for stager, batch in self._stagers(posts): stager.stage(batch)
+
+    def wait(self, posts):
+        """Blocks until the uploads started for `posts` are done."""
+        for stager, batch in self._stagers(posts): stager.wait(batch)
+
+    def staged(self, post):
+        """The post's finished upload on its account's stager, or None (lets the pool stand in for a stager in `checkpoint`)."""
+        try:
+            return self.get(account_of(post)).stager.staged(post)
+        except UnknownAccount:
+            return None
+
+    def shutdown(self):
+        with self._lock:
+            accounts = [a for a in self._accounts.values() if isinstance(a, Account)]
+        for account in accounts: account.stager.shutdown()
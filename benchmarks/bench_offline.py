@@ -0,0 +1,160 @@
+"""End-to-end numbers for the GitHub queue and the scheduler, fully offline.
+
+Runs the real store / scheduler code against the fake GitHub and X servers in
+fake_servers.py and reports wall time, API calls, bytes sent/received and peak Python
+memory (tracemalloc, which also slows things down a bit; compare runs with each other).
+
+Run from the repo root:
+    python benchmarks/bench_offline.py
+    python benchmarks/bench_offline.py --sizes 1000 10000 --latency 0.05 --conflict-rate 0.1 --rate-limit-every 25
+    python benchmarks/bench_offline.py --json > bench.jsonl
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import github_client  # noqa: E402
+import post_scheduler  # noqa: E402
+from fake_servers import FakeGitHub, FakeX, route_to  # noqa: E402
+from fixtures import SIZES, VARIANTS, make_images, make_queue, queue_files  # noqa: E402
+from media_store import MEDIA_PATH, make_ref  # noqa: E402
+from queue_model import QueueIndex  # noqa: E402
+from queue_store import GitHubQueueStore  # noqa: E402
+
+OWNER, REPO, TOKEN = "owner", "repo", "token"
+
+
+def measure(name, fn, servers):
+    """Runs `fn` once (its prints swallowed) and returns (result, row of numbers)."""
+    for server in servers: server.reset_stats()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        out = fn()
+    ms = (time.perf_counter() - t0) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = [s.stats for s in servers]
+    status = {}
+    for st in stats:
+        for code, count in st["status"].items(): status[code] = status.get(code, 0) + count
+    return out, {
+        "scenario": name,
+        "ms": round(ms, 1),
+        "peak_mb": round(peak / 2 ** 20, 2),
+        "calls": sum(st["calls"] for st in stats),
+        "sent_kb": round(sum(st["bytes_in"] for st in stats) / 1024, 1),
+        "recv_kb": round(sum(st["bytes_out"] for st in stats) / 1024, 1),
+        "409s": status.get(409, 0) + status.get(422, 0),
+        "429s": status.get(429, 0),
+    }
+
+
+def cold_store():
+    """A store on a brand-new client, like a fresh cron run."""
+    github_client._clients.clear()
+    return GitHubQueueStore(TOKEN, OWNER, REPO)
+
+
+def wire_scheduler(gh, x):
+    """Points post_scheduler at the fakes: GitHub through GITHUB_API_URL, tweepy through session adapters."""
+    github_client.BASE_URL = gh.url
+    post_scheduler.GITHUB_TOKEN, post_scheduler.GITHUB_OWNER, post_scheduler.GITHUB_REPO = TOKEN, OWNER, REPO
+    post_scheduler.QUEUE_BACKEND = "github"
+    post_scheduler.CONSUMER_KEY = post_scheduler.CONSUMER_SECRET = "key"
+    post_scheduler.ACCESS_TOKEN = post_scheduler.ACCESS_SECRET = "secret"
+    post_scheduler.X_WRITE_LIMIT = 10 ** 6  # pacing is not what we measure; 429s from the fake still apply
+    make_clients = post_scheduler.make_clients
+
+    def routed(*args):
+        client, api = make_clients(*args)
+        route_to(x, client.session, api.session)
+        return client, api
+
+    post_scheduler.make_clients = routed
+
+
+def run_case(gh, x, variant, n, images):
+    opts = VARIANTS[variant]
+    refs = [make_ref(b) for b in images]
+    posts = make_queue(n, threads=opts["threads"], images=opts["images"], image_refs=refs)
+    files = queue_files(posts)
+    if opts["images"]: files.update({f"{MEDIA_PATH}/{ref.split(':', 1)[1]}": b for ref, b in zip(refs, images)})
+    gh.seed(files)
+    servers = [gh, x]
+    label = f"{variant} {n:,}"
+    rows = []
+
+    store = cold_store()
+    loaded, row = measure(f"{label}: load cold (get_posts)", store.load, servers)
+    rows.append(row)
+    _, row = measure(f"{label}: load warm (304)", store.load, servers)
+    rows.append(row)
+    _, row = measure(f"{label}: group (QueueIndex)", lambda: QueueIndex(loaded).groups(), servers)
+    rows.append(row)
+    now = datetime.now(timezone.utc)
+    _, row = measure(f"{label}: due cold (today's shards)", lambda: cold_store().due(now), servers)
+    rows.append(row)
+    extra = make_queue(1, threads=False, due=0)[0]
+    extra["id"] = "bench-extra"
+    _, row = measure(f"{label}: add 1 (update_file)", lambda: store.add([extra]), servers)
+    rows.append(row)
+    _, row = measure(f"{label}: remove 1 (update_file)", lambda: store.remove([extra["id"]]), servers)
+    rows.append(row)
+    _, row = measure(f"{label}: compact journal", store.compact, servers)
+    rows.append(row)
+
+    github_client._clients.clear()
+    _, row = measure(f"{label}: post_scheduler.main()", post_scheduler.main, servers)
+    row["tweets"] = x.stats["routes"].get("POST tweet", 0)
+    row["uploads"] = x.stats["routes"].get("POST media", 0)
+    rows.append(row)
+    return rows
+
+
+def print_table(rows):
+    cols = ["ms", "peak_mb", "calls", "sent_kb", "recv_kb", "409s", "429s"]
+    width = max(len(r["scenario"]) for r in rows)
+    print(f"{'scenario':<{width}}  " + "  ".join(f"{c:>9}" for c in cols))
+    for r in rows:
+        extra = f"  tweets={r['tweets']} uploads={r['uploads']}" if "tweets" in r else ""
+        print(f"{r['scenario']:<{width}}  " + "  ".join(f"{r[c]:>9}" for c in cols) + extra)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline benchmarks against fake GitHub / X servers.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), help="Queue sizes")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every fake API call")
+    parser.add_argument("--conflict-rate", type=float, default=0.0, help="Share of GitHub writes answered with a 409")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Every Nth X call gets a 429")
+    parser.add_argument("--json", action="store_true", help="One JSON object per scenario instead of a table")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    images = make_images()
+    rows = []
+    with FakeGitHub(OWNER, REPO, latency=args.latency, conflict_rate=args.conflict_rate) as gh, \
+            FakeX(latency=args.latency, rate_limit_every=args.rate_limit_every) as x:
+        wire_scheduler(gh, x)
+        for variant in args.variants:
+            for n in args.sizes:
+                rows += run_case(gh, x, variant, n, images)
+    if args.json:
+        for r in rows: print(json.dumps(r))
+    else:
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
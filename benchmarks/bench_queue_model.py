@@ -0,0 +1,82 @@
+"""Grouping and due-selection over a large synthetic queue.
+
+Run from the repo root:  python benchmarks/bench_queue_model.py [n_posts]
+"""
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from queue_model import QueueIndex  # noqa: E402
+
+
+def make_posts(n, thread_share=0.3, seed=7):
+    """~`thread_share` of posts belong to 3-8 part threads, spread over the next 30 days."""
+    rnd = random.Random(seed)
+    start = datetime.now(timezone.utc) - timedelta(days=1)
+    posts = []
+    while len(posts) < n:
+        t = start + timedelta(minutes=rnd.randrange(0, 60 * 24 * 30))
+        if rnd.random() < thread_share:
+            thread_id = str(uuid.UUID(int=rnd.getrandbits(128)))
+            for i in range(rnd.randint(3, 8)):
+                posts.append({"id": uuid.uuid4().hex, "text": f"part {i}", "schedule_time": (t + timedelta(minutes=i)).isoformat(), "thread_id": thread_id})
+        else:
+            posts.append({"id": uuid.uuid4().hex, "text": "single", "schedule_time": t.isoformat(), "thread_id": None})
+    rnd.shuffle(posts)
+    return posts[:n]
+
+
+def legacy_groups(posts):
+    """The old Smart Queue loop, kept here only as the baseline."""
+    posts = sorted(posts, key=lambda x: x["schedule_time"])
+    grouped, processed = [], set()
+    for i, p in enumerate(posts):
+        if i in processed: continue
+        t_id = p.get("thread_id")
+        if t_id:
+            siblings = []
+            for j, sibling in enumerate(posts):
+                if sibling.get("thread_id") == t_id:
+                    siblings.append((j, sibling))
+                    processed.add(j)
+            grouped.append({"type": "thread", "items": siblings})
+        else:
+            grouped.append({"type": "single", "items": [(i, p)]})
+            processed.add(i)
+    return grouped
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    posts = make_posts(n)
+    now_ts = int(datetime.now(timezone.utc).timestamp())
+
+    index, build_ms = timed(QueueIndex, posts)
+    groups, group_ms = timed(index.groups)
+    due, due_ms = timed(index.due_groups, now_ts)
+
+    print(f"posts: {n:,}  groups: {len(groups):,}  due groups: {len(due):,}")
+    print(f"build index (parse + sort):  {build_ms:8.1f} ms")
+    print(f"group all:                   {group_ms:8.1f} ms")
+    print(f"due selection (bisect):      {due_ms:8.1f} ms")
+
+    # The quadratic baseline gets slow fast; only run it on a slice
+    sample = posts[:2_000]
+    _, legacy_ms = timed(legacy_groups, sample)
+    _, new_ms = timed(lambda: QueueIndex(sample).groups())
+    print(f"legacy vs new on {len(sample):,} posts: {legacy_ms:.1f} ms vs {new_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Local stand-ins for the GitHub contents / Git Data API and the X v2 + v1.1 endpoints.
+
+Both run in a background thread on 127.0.0.1 and count calls and bytes per route. Latency,
+409s (GitHub writes) and 429s are configurable, so retry and backoff paths can be measured
+without touching the real services.
+"""
+import base64
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+
+class FakeServer:
+    """ThreadingHTTPServer around `handle(method, path, query, headers, body) -> (status, headers, body)`."""
+
+    def __init__(self, latency=0.0, rate_limit_every=0, reset_after=1, seed=7):
+        self.latency = latency                    # seconds added to every request
+        self.rate_limit_every = rate_limit_every  # every Nth request gets a 429 (0 = never)
+        self.reset_after = reset_after            # seconds until the 429 window resets
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self.reset_stats()
+
+    # --- STATS ---
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"calls": 0, "bytes_in": 0, "bytes_out": 0, "status": {}, "routes": {}}
+
+    def _record(self, route, status, bytes_in, bytes_out):
+        with self._lock:
+            st = self.stats
+            st["calls"] += 1
+            st["bytes_in"] += bytes_in
+            st["bytes_out"] += bytes_out
+            st["status"][status] = st["status"].get(status, 0) + 1
+            st["routes"][route] = st["routes"].get(route, 0) + 1
+
+    # --- SERVER ---
+    def start(self):
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+            disable_nagle_algorithm = True  # otherwise small writes wait ~40 ms for delayed ACKs
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                parts = urlsplit(self.path)
+                status, headers, out = owner._dispatch(self.command, parts.path, parse_qs(parts.query), self.headers, body)
+                self.send_response(status)
+                for k, v in headers.items(): self.send_header(k, v)
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                if self.command != "HEAD": self.wfile.write(out)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _dispatch(self, method, path, query, headers, body):
+        if self.latency: time.sleep(self.latency)
+        with self._lock:
+            n = self.stats["calls"] + 1
+        if self.rate_limit_every and n % self.rate_limit_every == 0:
+            status, out_headers, out = 429, {"x-rate-limit-reset": str(int(time.time() + self.reset_after))}, b'{"title":"Too Many Requests"}'
+            route = f"{method} (rate limited)"
+        else:
+            route, (status, out_headers, out) = self.handle(method, path, query, headers, body)
+        out_headers = {"Content-Type": "application/json", **out_headers}
+        self._record(route, status, len(body), len(out))
+        return status, out_headers, out
+
+    def handle(self, method, path, query, headers, body):
+        raise NotImplementedError
+
+
+def _json(status, obj, headers=None):
+    return status, headers or {}, json.dumps(obj).encode("utf-8")
+
+
+def _sha(*parts):
+    return hashlib.sha1(b"".join(p if isinstance(p, bytes) else str(p).encode() for p in parts)).hexdigest()
+
+
+# --- GITHUB ---
+class FakeGitHub(FakeServer):
+    """Just enough of one repo for GitHubQueueStore and GitHubMediaStore.
+
+    Commits are full snapshots (`{path: bytes}`), which is plenty for benchmarks. Reads honour
+    `If-None-Match`; `conflict_rate` makes that share of writes fail with a 409.
+    """
+
+    def __init__(self, owner="owner", repo="repo", branch="main", conflict_rate=0.0, **kw):
+        super().__init__(**kw)
+        self.prefix = f"/repos/{owner}/{repo}"
+        self.branch = branch
+        self.conflict_rate = conflict_rate
+        self.trees = {}    # tree sha -> {path: bytes}
+        self.blobs = {}    # blob sha -> bytes (POST /git/blobs)
+        self.commits = {}  # commit sha -> (tree sha, parent sha)
+        self.head = self._commit(self._tree({}), None)
+
+    # --- REPO STATE ---
+    def _tree(self, files):
+        sha = _sha(*sorted(f"{p}:{_sha(b)}" for p, b in files.items()))
+        self.trees[sha] = files
+        return sha
+
+    def _commit(self, tree, parent):
+        sha = _sha(tree, parent, time.time_ns())
+        self.commits[sha] = (tree, parent)
+        return sha
+
+    def files(self, ref=None):
+        return self.trees[self.commits[ref or self.head][0]]
+
+    def seed(self, files):
+        """Replaces the branch with one commit holding `files` ({path: bytes or str})."""
+        files = {p: b.encode("utf-8") if isinstance(b, str) else b for p, b in files.items()}
+        with self._lock:
+            self.head = self._commit(self._tree(files), self.head)
+
+    # --- ROUTES ---
+    def handle(self, method, path, query, headers, body):
+        if not path.startswith(self.prefix): return "404", _json(404, {"message": "Not Found"})
+        path = path[len(self.prefix):]
+        ref = (query.get("ref") or [None])[0]
+        if method in ("PUT", "POST", "PATCH", "DELETE") and self.random.random() < self.conflict_rate:
+            return f"{method} (conflict)", _json(409, {"message": "is at a different sha"})
+        with self._lock:
+            if method == "GET" and path == "":
+                return "GET repo", _json(200, {"default_branch": self.branch})
+            if method == "GET" and path == f"/git/ref/heads/{self.branch}":
+                return "GET ref", self._etagged(headers, json.dumps({"object": {"sha": self.head}}).encode())
+            if method == "GET" and path.startswith("/git/commits/"):
+                tree, _ = self.commits[path.rsplit("/", 1)[1]]
+                return "GET commit", _json(200, {"tree": {"sha": tree}})
+            if path.startswith("/contents/"):
+                return self._contents(method, path[len("/contents/"):], ref, headers, body)
+            if method == "POST" and path == "/git/blobs":
+                req = json.loads(body)
+                data = base64.b64decode(req["content"]) if req.get("encoding") == "base64" else req["content"].encode("utf-8")
+                self.blobs[_sha(data)] = data
+                return "POST blob", _json(201, {"sha": _sha(data)})
+            if method == "POST" and path == "/git/trees":
+                return "POST tree", self._post_tree(json.loads(body))
+            if method == "POST" and path == "/git/commits":
+                req = json.loads(body)
+                return "POST commit", _json(201, {"sha": self._commit(req["tree"], req["parents"][0])})
+            if method == "PATCH" and path == f"/git/refs/heads/{self.branch}":
+                req = json.loads(body)
+                if self.commits[req["sha"]][1] != self.head and not req.get("force"):
+                    return "PATCH ref (conflict)", _json(422, {"message": "Update is not a fast forward"})
+                self.head = req["sha"]
+                return "PATCH ref", _json(200, {"object": {"sha": self.head}})
+        return f"{method} unknown", _json(404, {"message": "Not Found"})
+
+    def _etagged(self, headers, out, content_type="application/json"):
+        etag = f'"{_sha(out)}"'
+        if headers.get("If-None-Match") == etag: return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag, "Content-Type": content_type}, out
+
+    def _contents(self, method, path, ref, headers, body):
+        files = self.files(ref)
+        if method in ("GET", "HEAD"):
+            route = f"{method} contents"
+            if path in files:
+                if method == "HEAD": return route, (200, {}, b"")
+                if "raw" in headers.get("Accept", ""): return route, self._etagged(headers, files[path], "application/octet-stream")
+                data = files[path]
+                return route, self._etagged(headers, json.dumps({"path": path, "sha": _sha(data), "content": base64.b64encode(data).decode()}).encode())
+            listing = [{"name": p[len(path) + 1:], "path": p, "type": "file", "sha": _sha(b)}
+                       for p, b in files.items() if p.startswith(path + "/") and "/" not in p[len(path) + 1:]]
+            if listing: return f"{method} contents (dir)", self._etagged(headers, json.dumps(listing).encode())
+            return route, _json(404, {"message": "Not Found"})
+        if method == "PUT":
+            req = json.loads(body)
+            if path in files and req.get("sha") != _sha(files[path]):
+                return "PUT contents (exists)", _json(422, {"message": "sha wasn't supplied"})
+            new = dict(files)
+            new[path] = base64.b64decode(req["content"])
+            self.head = self._commit(self._tree(new), self.head)
+            return "PUT contents", _json(201, {"content": {"path": path}, "commit": {"sha": self.head}})
+        return f"{method} contents", _json(405, {"message": "Method not allowed"})
+
+    def _post_tree(self, req):
+        files = dict(self.trees[req["base_tree"]])
+        for entry in req["tree"]:
+            if entry.get("sha", "") is None: files.pop(entry["path"], None)
+            elif "sha" in entry: files[entry["path"]] = self.blobs[entry["sha"]]
+            else: files[entry["path"]] = entry["content"].encode("utf-8")
+        return _json(201, {"sha": self._tree(files)})
+
+
+# --- X ---
+class FakeX(FakeServer):
+    """`POST /2/tweets` (tweepy.Client) and `POST /1.1/media/upload.json` (tweepy.API)."""
+
+    def __init__(self, **kw):
+        super().__init__(**kw)
+        self._ids = itertools.count(10 ** 18)
+        self.tweets = []  # (tweet id, request body) in the order they were accepted
+
+    def handle(self, method, path, query, headers, body):
+        if method == "POST" and path == "/2/tweets":
+            tweet_id = str(next(self._ids))
+            with self._lock:
+                self.tweets.append((tweet_id, json.loads(body)))
+            return "POST tweet", _json(201, {"data": {"id": tweet_id, "text": json.loads(body).get("text", "")}})
+        if method == "POST" and path == "/1.1/media/upload.json":
+            media_id = next(self._ids)
+            return "POST media", _json(200, {"media_id": media_id, "media_id_string": str(media_id), "size": len(body), "expires_after_secs": 86400})
+        return f"{method} unknown", _json(404, {"errors": [{"message": "Not Found"}]})
+
+
+class LocalAdapter(HTTPAdapter):
+    """Sends every request to `base_url`, keeping path and query.
+
+    tweepy.Client hardcodes https://api.twitter.com, so mount this on `client.session`
+    (and `api.session` for uploads) instead of changing hosts.
+    """
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = f"{self.base_url}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+        return super().send(request, **kwargs)
+
+
+def route_to(fake, *sessions):
+    for session in sessions:
+        session.mount("https://", LocalAdapter(fake.url))
@@ -0,0 +1,69 @@
+"""Synthetic queues for the benchmarks: 1k-100k posts, optionally with images and threads."""
+import io
+import json
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from queue_shards import MANIFEST, SHARD_DIR, digest, empty_manifest, encode, partition, shard_path
+
+SIZES = (1_000, 10_000, 100_000)
+VARIANTS = {
+    "singles": {"threads": False, "images": False},
+    "threads+images": {"threads": True, "images": True},
+}
+
+
+def make_images(count=8, px=64, seed=7):
+    """`count` distinct small PNGs (needs Pillow), as raw bytes."""
+    from PIL import Image
+
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(count):
+        buf = io.BytesIO()
+        Image.new("RGB", (px, px), tuple(rnd.randrange(256) for _ in range(3))).save(buf, format="PNG")
+        out.append(buf.getvalue())
+    return out
+
+
+def make_queue(n, threads=True, images=False, due=20, image_refs=(), thread_share=0.3, image_share=0.2, seed=7):
+    """`n` posts over the next 30 days, `due` of which (roughly, whole threads) are already due.
+
+    Threads have 3-8 parts a minute apart. With `images`, about `image_share` of posts get one
+    of `image_refs` (see `make_images` / `MediaStore.put`).
+    """
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    posts = []
+    while len(posts) < n:
+        if len(posts) < due: t = now - timedelta(minutes=rnd.randrange(10, 60))
+        else: t = now + timedelta(minutes=rnd.randrange(5, 60 * 24 * 30))
+        parts = rnd.randint(3, 8) if threads and rnd.random() < thread_share else 1
+        thread_id = str(uuid.UUID(int=rnd.getrandbits(128))) if parts > 1 else None
+        for i in range(parts):
+            post = {
+                "id": uuid.UUID(int=rnd.getrandbits(128)).hex,
+                "text": f"{'Part %d: ' % (i + 1) if thread_id else ''}Benchmark post {len(posts)} " + "lorem ipsum " * rnd.randint(2, 15),
+                "schedule_time": (t + timedelta(minutes=i)).isoformat(),
+                "thread_id": thread_id,
+            }
+            if images and image_refs and rnd.random() < image_share:
+                post.update({"image_ref": rnd.choice(image_refs), "image_type": "image/png"})
+            posts.append(post)
+    return posts[:n]
+
+
+def queue_json(posts):
+    return json.dumps(posts, separators=(",", ":"))
+
+
+def queue_files(posts):
+    """{path: bytes} of `posts` in the sharded layout (one file per UTC day plus the manifest)."""
+    files, manifest = {}, empty_manifest()
+    for day, items in sorted(partition(posts).items()):
+        data = encode(items)
+        files[shard_path(day)] = data
+        manifest["shards"][day] = {"count": len(items), "sha": digest(data)}
+    files[f"{SHARD_DIR}/{MANIFEST}"] = json.dumps(manifest, indent=1)
+    return files
@@ -0,0 +1,237 @@
+import argparse
+import csv
+import io
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytz
+
+from accounts import DEFAULT_ACCOUNT, names as account_names
+from image_ingest import ingest_many, sniff_mime
+from media_store import make_ref, open_media_store, DEFAULT_MEDIA_DIR
+from queue_store import new_id, open_store, DEFAULT_DB_PATH
+from tweet_text import MAX_TWEET_LENGTH, weighted_length
+
+# --- CONFIGURATION ---
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
+GITHUB_OWNER = os.environ.get("GITHUB_OWNER")
+GITHUB_REPO = os.environ.get("GITHUB_REPO")
+QUEUE_BACKEND = os.environ.get("QUEUE_BACKEND", "github")
+QUEUE_DB_PATH = os.environ.get("QUEUE_DB_PATH", DEFAULT_DB_PATH)
+MEDIA_DIR = os.environ.get("MEDIA_DIR", DEFAULT_MEDIA_DIR)
+
+PKT = pytz.timezone("Asia/Karachi")  # times without an offset are PKT, like in the app's forms
+THREAD_GAP = timedelta(minutes=1)    # a thread part without its own time goes out a minute after the one before
+TIME_FORMATS = ("%Y-%m-%d %I:%M %p", "%Y-%m-%d %I:%M%p", "%d/%m/%Y %H:%M", "%d/%m/%Y %I:%M %p")
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+# One row per post. CSV columns / JSONL keys:
+#   text    the tweet (required)
+#   time    when to post, e.g. "2026-10-20 09:30" or "2026-10-20 9:30 PM" (PKT), or ISO with an offset
+#   thread  any label; rows sharing it become one thread (leave empty for a single)
+#   part    1, 2, 3... order within the thread (optional: file order otherwise)
+#   image   image file name (relative to the import file, or one of the uploaded images)
+#   account which X account posts it (see accounts.py; empty = "default"), the same for every part of a thread
+# A JSONL line can also hold a whole thread: {"thread": "launch", "time": "...", "parts": ["1/ ...", {"text": "2/ ...", "image": "b.png"}]}
+
+
+class InvalidImport(ValueError):
+    """Every problem found in an import file, as (line, message). Nothing has been written."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("\n".join(f"line {line}: {message}" for line, message in errors))
+
+
+# --- PARSING ---
+def format_of(name):
+    fmt = FORMATS.get(os.path.splitext(name)[1].lower())
+    if not fmt: raise ValueError(f"Unsupported import file {name} (use {', '.join(FORMATS)})")
+    return fmt
+
+
+def read_rows(data, fmt):
+    """CSV or JSONL bytes -> [(line number, {field: value})]. A JSONL thread becomes one row per part."""
+    text = data.decode("utf-8-sig")
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        return [(reader.line_num, {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}) for row in reader]
+
+    rows, errors = [], []
+    for n, line in enumerate(text.splitlines(), 1):
+        if not line.strip(): continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            errors.append((n, f"not valid JSON ({e})"))
+            continue
+        if not isinstance(obj, dict):
+            errors.append((n, "expected a JSON object"))
+        elif "parts" in obj:
+            label = obj.get("thread") or f"line {n}"
+            for i, part in enumerate(obj["parts"], 1):
+                part = {"text": part} if isinstance(part, str) else dict(part)
+                if i == 1: part.setdefault("time", obj.get("time"))
+                rows.append((n, {**part, "thread": label, "part": i}))
+        else:
+            rows.append((n, obj))
+    if errors: raise InvalidImport(errors)
+    return rows
+
+
+def parse_time(value):
+    """Schedule time -> aware UTC datetime. Without an offset the time is read as PKT."""
+    value = str(value).strip()
+    try:
+        dt = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    except ValueError:
+        for fmt in TIME_FORMATS:
+            try:
+                dt = datetime.strptime(value.upper(), fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"unrecognised time {value!r} (e.g. 2026-10-20 09:30 or 2026-10-20 9:30 PM)")
+    if dt.tzinfo is None: dt = PKT.localize(dt)
+    return dt.astimezone(pytz.utc)
+
+
+# --- VALIDATION ---
+def plan(rows, read_image, now=None, accounts=None):
+    """Checks every row and returns (posts, images) for `QueueStore.bulk_add`.
+
+    Posts have the same shape as the app's (UTC `schedule_time`, `thread_id`, `image_ref`, `account`);
+    `images` is [(ref, bytes)], each file optimized once. `read_image(name)` returns the bytes of
+    an image named in the file, or None; `accounts` lists the account names to accept (None =
+    any). Raises InvalidImport listing every problem at once.
+    """
+    now = now or datetime.now(pytz.utc)
+    errors, units, threads = [], [], {}
+    for line, row in rows:
+        text = str(row.get("text") or "").strip()
+        length = weighted_length(text)
+        if not text: errors.append((line, "empty text"))
+        elif length > MAX_TWEET_LENGTH: errors.append((line, f"{length}/{MAX_TWEET_LENGTH} characters (weighted): trim it or make it a thread"))
+        when = None
+        if row.get("time"):
+            try:
+                when = parse_time(row["time"])
+            except ValueError as e:
+                errors.append((line, str(e)))
+        account = str(row.get("account") or "").strip() or DEFAULT_ACCOUNT
+        if accounts is not None and account not in accounts: errors.append((line, f"unknown account {account!r} (configured: {', '.join(accounts)})"))
+        item = {"line": line, "text": text, "time": when, "timed": bool(row.get("time")), "account": account,
+                "image": str(row.get("image") or "").strip(), "part": row.get("part")}
+        label = str(row.get("thread") or "").strip()
+        if label:
+            if label not in threads:
+                threads[label] = []
+                units.append((label, threads[label]))
+            threads[label].append(item)
+        else:
+            if not item["timed"]: errors.append((line, "missing time"))
+            units.append((None, [item]))
+
+    # Threads: one account, parts in order, each after the one before
+    for label, parts in threads.items():
+        if len({p["account"] for p in parts}) > 1:
+            errors.append((parts[0]["line"], f"thread {label!r}: parts name different accounts"))
+        numbers = [p["part"] for p in parts]
+        if any(str(n or "").strip() for n in numbers):
+            try:
+                numbers = [int(n) for n in numbers]
+            except (TypeError, ValueError):
+                errors.append((parts[0]["line"], f"thread {label!r}: every part needs a whole-number `part`, or none of them"))
+                continue
+            if sorted(numbers) != list(range(1, len(parts) + 1)):
+                errors.append((parts[0]["line"], f"thread {label!r}: parts must be numbered 1..{len(parts)}, got {sorted(numbers)}"))
+                continue
+            parts.sort(key=lambda p: int(p["part"]))
+        if parts[0]["time"] is None:
+            if not parts[0]["timed"]: errors.append((parts[0]["line"], f"thread {label!r}: first part needs a time"))
+            continue
+        for prev, part in zip(parts, parts[1:]):
+            if part["time"] is None: part["time"] = prev["time"] + THREAD_GAP
+            elif part["time"] <= prev["time"]:
+                errors.append((part["line"], f"thread {label!r}: part scheduled at or before the part before it"))
+
+    items = [item for _, unit in units for item in unit]
+    for _, unit in units:
+        if unit[0]["time"] is not None and unit[0]["time"] <= now:
+            errors.append((unit[0]["line"], f"{unit[0]['time'].astimezone(PKT):%Y-%m-%d %I:%M %p} PKT is in the past"))
+
+    # Images: each file read, checked and optimized once, however many posts use it
+    raw = {}
+    for name in sorted({item["image"] for item in items if item["image"]}):
+        data = read_image(name)
+        first = min(item["line"] for item in items if item["image"] == name)
+        if data is None: errors.append((first, f"image {name!r} not found"))
+        elif not sniff_mime(data).startswith("image/"): errors.append((first, f"{name!r} is not a PNG, JPEG, GIF or WebP image"))
+        else: raw[name] = data
+    if errors: raise InvalidImport(sorted(errors))
+
+    fields, images = {}, []
+    for name, (data, mime) in zip(raw, ingest_many(list(raw.values()))):
+        fields[name] = {"image_ref": make_ref(data), "image_type": mime}
+        images.append((fields[name]["image_ref"], data))
+    posts = []
+    for label, unit in units:
+        thread_id = str(uuid.uuid4()) if label else None
+        for item in unit:
+            posts.append({
+                "id": new_id(),
+                "text": item["text"],
+                "schedule_time": item["time"].isoformat(),
+                **fields.get(item["image"], {"image_ref": None, "image_type": None}),
+                "thread_id": thread_id,
+                "account": item["account"],
+            })
+    return posts, images
+
+
+# --- CLI ---
+def files_next_to(path):
+    """`read_image` for the CLI: image names are paths relative to the import file."""
+    base = os.path.dirname(os.path.abspath(path))
+
+    def read(name):
+        full = os.path.join(base, name)
+        if not os.path.isfile(full): return None
+        with open(full, "rb") as f:
+            return f.read()
+    return read
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Schedules a CSV/JSONL file of posts and threads in one commit.")
+    parser.add_argument("file", help="Import file (.csv, .jsonl)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and show what would be scheduled, write nothing")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with open(args.file, "rb") as f:
+        data = f.read()
+    try:
+        posts, images = plan(read_rows(data, format_of(args.file)), files_next_to(args.file), accounts=account_names())
+    except InvalidImport as e:
+        print(f"❌ {len(e.errors)} problem(s), nothing scheduled:\n{e}")
+        raise SystemExit(1)
+    threads = len({p["thread_id"] for p in posts if p["thread_id"]})
+    print(f"✅ {len(posts)} posts ({threads} threads, {len(images)} images) look good.")
+    if args.dry_run: return
+
+    t0 = time.perf_counter()
+    store = open_store(QUEUE_BACKEND, token=GITHUB_TOKEN, owner=GITHUB_OWNER, repo=GITHUB_REPO, db_path=QUEUE_DB_PATH)
+    media = open_media_store(QUEUE_BACKEND, token=GITHUB_TOKEN, owner=GITHUB_OWNER, repo=GITHUB_REPO, media_dir=MEDIA_DIR)
+    store.bulk_add(posts, images, media)
+    print(f"📦 Scheduled in {time.perf_counter() - t0:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
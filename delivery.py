@@ -0,0 +1,64 @@
+import time
+
+# --- CONFIGURATION ---
+RETRY_BASE = 60            # first retry a minute after a failure...
+RETRY_MAX = 6 * 60 * 60    # ...doubling each time, capped at six hours
+
+# A post's delivery state lives in the queue next to the post, under "delivery":
+#   {"tweet_id": "...", "media_id": 123, "media_expires": 1700000000.0,
+#    "attempts": 2, "next_retry": 1700000000.0, "error": "..."}
+# Parts of an unfinished thread stay queued with their tweet_id so a rerun replies to the
+# last one that went out instead of starting a new thread.
+
+
+def state(post):
+    return post.get("delivery") or {}
+
+
+def tweet_id(post):
+    return state(post).get("tweet_id")
+
+
+def is_posted(post):
+    return bool(tweet_id(post))
+
+
+def retry_at(post):
+    """Epoch seconds before which the post shouldn't be tried again (0 = any time)."""
+    return state(post).get("next_retry", 0)
+
+
+def backoff(attempts):
+    return min(RETRY_BASE * 2 ** max(0, attempts - 1), RETRY_MAX)
+
+
+def staged_media(post):
+    """(media_id, expires_at) of an upload kept from an earlier run, or None."""
+    st = state(post)
+    return (st["media_id"], st["media_expires"]) if st.get("media_id") and st.get("media_expires") else None
+
+
+def posted(post, new_tweet_id):
+    return {**state(post), "tweet_id": new_tweet_id, "next_retry": 0, "error": None}
+
+
+def with_media(post, media):
+    """State keeping an upload, `(media_id, expires_at)`, for the post's next attempt."""
+    return {**state(post), "media_id": media[0], "media_expires": media[1]}
+
+
+def failed(post, error, media=None, now=None, not_before=None):
+    """State after a failed attempt: one more attempt, the next one pushed out exponentially.
+
+    `not_before` (epoch seconds) holds the retry back further, e.g. until X's rate-limit reset.
+    """
+    now = time.time() if now is None else now
+    st = with_media(post, media) if media else state(post)
+    attempts = st.get("attempts", 0) + 1
+    return {**st, "attempts": attempts, "next_retry": max(now + backoff(attempts), not_before or 0), "error": str(error)[:300]}
+
+
+def pending(group):
+    """Parts of a group that still have to go out, in order."""
+    return [p for p in group["items"] if not is_posted(p)]
+
@@ -0,0 +1,141 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tweepy
+
+import metrics
+
+# --- CONFIGURATION ---
+# X API v2 `POST /2/tweets` allows a fixed number of writes per user per window; tune to your tier.
+DEFAULT_WRITE_LIMIT = 200
+DEFAULT_WRITE_WINDOW = 15 * 60
+DEFAULT_BURST = None  # None = the whole window's allowance may go out back-to-back, like X allows
+DEFAULT_UPLOAD_LIMIT = 400  # media uploads per window and user; they count separately from tweets
+DEFAULT_WORKERS = 8
+
+
+# --- RATE LIMITER ---
+class RateLimited(Exception):
+    """X refused a write (429) and the bucket doesn't wait; `reset` is when X says the window reopens."""
+
+    def __init__(self, reset):
+        self.reset = reset
+        super().__init__(f"Rate limited by X until {time.strftime('%H:%M:%S', time.gmtime(reset))} UTC")
+
+
+class TokenBucket:
+    """Classic token bucket shared by every posting thread.
+
+    Tokens refill at `rate` per second up to `capacity`; each API write takes one.
+    A 429 drains the bucket and blocks everyone until X says the window resets, then starts it full.
+    With `wait=False` (single cron runs, which must not outlive their 5-minute slot) writes
+    raise RateLimited until then instead of sleeping.
+    """
+
+    def __init__(self, rate, capacity, wait=True):
+        self.rate = rate
+        self.capacity = capacity
+        self.wait = wait
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0  # wall-clock epoch seconds, as sent in x-rate-limit-reset
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_window(cls, limit=DEFAULT_WRITE_LIMIT, window=DEFAULT_WRITE_WINDOW, burst=DEFAULT_BURST, wait=True):
+        """`limit` writes per `window` seconds, allowing `burst` (default: all of them) back-to-back."""
+        return cls(rate=limit / window, capacity=min(burst or limit, limit), wait=wait)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Blocks until a write is allowed."""
+        while True:
+            with self._lock:
+                wait = self.paused_until - time.time()
+                if wait > 0 and not self.wait: raise RateLimited(self.paused_until)
+                if wait <= 0:
+                    if self.paused_until:
+                        # X's window has reset since the 429
+                        self.paused_until, self.tokens, self.updated = 0.0, self.capacity, time.monotonic()
+                    self._refill()
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause_until(self, reset_ts):
+        """Called on a 429: nothing goes out until `reset_ts`, and the bucket restarts empty."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, reset_ts)
+            self.tokens = 0
+            self.updated = time.monotonic()
+
+
+def reset_time(error, fallback=60):
+    """Epoch seconds from a 429's `x-rate-limit-reset` header (or `fallback` seconds from now)."""
+    response = getattr(error, "response", None)
+    header = response.headers.get("x-rate-limit-reset") if response is not None else None
+    return float(header) if header else time.time() + fallback
+
+
+def call_limited(bucket, fn, *args, retries=3, **kwargs):
+    """Runs one X API write through the bucket, waiting out 429s up to `retries` times.
+
+    A bucket that doesn't wait is paused until the reset and RateLimited is raised instead.
+    """
+    name = f"x.{getattr(fn, '__name__', 'call')}"
+    for attempt in range(retries + 1):
+        if bucket:
+            with metrics.span("x.wait"): bucket.acquire()
+        try:
+            with metrics.span(name, attempt=attempt):
+                return fn(*args, **kwargs)
+        except tweepy.TooManyRequests as e:
+            metrics.incr("x_rate_limited")
+            reset = reset_time(e)
+            if bucket and not bucket.wait:
+                bucket.pause_until(reset)
+                raise RateLimited(reset) from e
+            if attempt == retries: raise
+            metrics.incr("x_retries")
+            print(f"⏳ Rate limited, waiting {max(0, int(reset - time.time()))}s...")
+            if bucket: bucket.pause_until(reset)
+            else:
+                with metrics.span("x.wait"): time.sleep(max(0, reset - time.time()))
+
+
+# --- DISPATCHER ---
+def dispatch(groups, worker, max_workers=DEFAULT_WORKERS):
+    """Runs `worker(group)` for independent groups (singles / whole threads) concurrently.
+
+    Parts inside a group are the worker's job to keep in order. Returns [(group, result)] in input order.
+    """
+    if not groups: return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(groups))) as pool:
+        return list(zip(groups, pool.map(worker, groups)))
+
+
+def dispatch_by(groups, key, worker, max_workers=DEFAULT_WORKERS):
+    """`dispatch` with a separate pool of up to `max_workers` per `key(group)` (the account).
+
+    All lanes run at once, so a lane stuck waiting on its rate limit only holds its own threads.
+    Returns [(group, result)] in input order.
+    """
+    lanes = {}
+    for i, group in enumerate(groups): lanes.setdefault(key(group), []).append(i)
+    results = [None] * len(groups)
+
+    def run_lane(indices):
+        for i, (_, result) in zip(indices, dispatch([groups[i] for i in indices], worker, max_workers)):
+            results[i] = result
+
+    if lanes:
+        with ThreadPoolExecutor(max_workers=len(lanes)) as pool:
+            list(pool.map(run_lane, lanes.values()))
+    return list(zip(groups, results))
@@ -0,0 +1,159 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import feedparser
+
+# --- CONFIGURATION ---
+DEFAULT_CACHE_PATH = "feed_cache.db"
+USER_AGENT = "x-automations/1.0 (feed fetcher)"
+MAX_WORKERS = 8
+
+# kind: which page uses the source. ttl: seconds before the cached copy is refetched.
+# Override with a JSON file of the same shape via FEEDS_CONFIG.
+DEFAULT_SOURCES = [
+    {"name": f"r/{sub}", "kind": "lead", "ttl": 3600, "url": f"https://www.reddit.com/r/{sub}/top.rss?t=week&limit=25"}
+    for sub in ("SaaS", "Entrepreneur", "Marketing", "Agency")
+] + [
+    {"name": f"r/{sub}", "kind": "news", "ttl": 900, "url": f"https://www.reddit.com/r/{sub}/top.rss?t=day&limit=25"}
+    for sub in ("LocalLLaMA", "LangChain", "OpenAI", "ArtificialIntelligence")
+]
+
+
+def load_sources(path=None):
+    path = path or os.environ.get("FEEDS_CONFIG")
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return DEFAULT_SOURCES
+
+
+class FeedCache:
+    """Fetches RSS sources concurrently with conditional GETs and keeps parsed entries in SQLite.
+
+    Reads never wait on the network once the cache is warm: a background thread refreshes
+    each source when its TTL runs out. Per-source latency and failure counters live in `stats`.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS feeds (
+        name TEXT PRIMARY KEY,
+        etag TEXT,
+        modified TEXT,
+        fetched_at REAL NOT NULL,
+        entries TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, sources=None, path=DEFAULT_CACHE_PATH):
+        self.sources = {s["name"]: s for s in (sources or load_sources())}
+        self.stats = {name: {"fetches": 0, "not_modified": 0, "failures": 0, "last_ms": None, "avg_ms": None, "last_error": None}
+                      for name in self.sources}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        self._pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        self._worker = None
+
+    # --- CACHE ROWS ---
+    def _row(self, name):
+        with self._lock:
+            return self._conn.execute("SELECT etag, modified, fetched_at, entries FROM feeds WHERE name = ?", (name,)).fetchone()
+
+    def _save(self, name, etag, modified, entries):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds (name, etag, modified, fetched_at, entries) VALUES (?, ?, ?, ?, ?)",
+                (name, etag, modified, time.time(), json.dumps(entries)),
+            )
+
+    def _touch(self, name):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE feeds SET fetched_at = ? WHERE name = ?", (time.time(), name))
+
+    def _stale(self, name):
+        row = self._row(name)
+        return row is None or time.time() - row[2] > self.sources[name].get("ttl", 900)
+
+    # --- FETCHING ---
+    def _record(self, name, elapsed_ms, error=None, not_modified=False):
+        with self._lock:
+            st = self.stats[name]
+            st["fetches"] += 1
+            st["last_ms"] = round(elapsed_ms, 1)
+            st["avg_ms"] = round(elapsed_ms if st["avg_ms"] is None else 0.8 * st["avg_ms"] + 0.2 * elapsed_ms, 1)
+            if not_modified: st["not_modified"] += 1
+            if error:
+                st["failures"] += 1
+                st["last_error"] = error
+
+    def fetch(self, name):
+        """Conditional GET of one source. A 304 just bumps the cached copy's timestamp."""
+        source = self.sources[name]
+        row = self._row(name)
+        etag, modified = (row[0], row[1]) if row else (None, None)
+        started = time.perf_counter()
+        try:
+            feed = feedparser.parse(source["url"], etag=etag, modified=modified, agent=USER_AGENT)
+            status = feed.get("status")
+            if status == 304 and row:
+                self._record(name, (time.perf_counter() - started) * 1000, not_modified=True)
+                self._touch(name)
+                return
+            if status is None or status >= 400 or (feed.bozo and not feed.entries):
+                raise RuntimeError(f"HTTP {status}: {feed.get('bozo_exception', 'no entries')}")
+            entries = [{"title": e.get("title", ""), "link": e.get("link", ""), "published": e.get("published", ""), "source": name}
+                       for e in feed.entries]
+            self._save(name, feed.get("etag"), feed.get("modified"), entries)
+            self._record(name, (time.perf_counter() - started) * 1000)
+        except Exception as e:
+            self._record(name, (time.perf_counter() - started) * 1000, error=str(e))
+            print(f"❌ Feed {name} failed: {e}")
+
+    def refresh(self, kind=None, force=False):
+        """Refetches every stale source (of `kind`) in parallel and waits for them."""
+        names = [n for n, s in self.sources.items() if (kind is None or s["kind"] == kind) and (force or self._stale(n))]
+        list(self._pool.map(self.fetch, names))
+
+    def start_background(self, interval=60):
+        """Keeps the cache warm from a daemon thread. Safe to call more than once."""
+        if self._worker and self._worker.is_alive(): return
+
+        def loop():
+            while True:
+                self.refresh()
+                time.sleep(interval)
+
+        self._worker = threading.Thread(target=loop, name="feed-refresh", daemon=True)
+        self._worker.start()
+
+    # --- READING ---
+    def entries(self, kind):
+        """Cached entries for every source of `kind`. Only sources never fetched before are fetched now."""
+        names = [n for n, s in self.sources.items() if s["kind"] == kind]
+        cold = [n for n in names if self._row(n) is None]
+        if cold: list(self._pool.map(self.fetch, cold))
+        out = []
+        for name in names:
+            row = self._row(name)
+            if row: out += json.loads(row[3])
+        return out
+
+
+# --- FETCHERS ---
+def fetch_reddit_viral_lead_gen(feeds):
+    entries = feeds.entries("lead")
+    random.shuffle(entries)
+    return [f"Title: {e['title']}\nLink: {e['link']}" for e in entries[:15]]
+
+
+def fetch_reddit_tech_news(feeds):
+    entries = feeds.entries("news")
+    clean_entries = [e for e in entries if "help" not in e["title"].lower() and "?" not in e["title"]]
+    random.shuffle(clean_entries)
+    return [f"Headline: {e['title']}\nLink: {e['link']}" for e in clean_entries[:15]]
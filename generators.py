@@ -0,0 +1,273 @@
+import os
+import threading
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import RunnableLambda
+
+from llm_cache import LLMCache, cache_key, DEFAULT_CACHE_PATH
+from tweet_text import split_thread
+
+# --- CONFIGURATION ---
+MODEL = "gemini-2.5-flash"
+GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 4))
+CHUNK_CHARS = 6000      # remix input per call
+CHUNK_ITEMS = 15        # headlines per lead / news call
+
+_models = {}
+_lock = threading.Lock()
+_cache = None
+
+
+def configure(api_key=None, cache_path=None):
+    """Lets the Streamlit app pass its secrets in instead of environment variables."""
+    global GOOGLE_API_KEY, LLM_CACHE_PATH, _cache
+    if api_key and api_key != GOOGLE_API_KEY:
+        GOOGLE_API_KEY = api_key
+        _models.clear()
+    if cache_path and cache_path != LLM_CACHE_PATH:
+        LLM_CACHE_PATH, _cache = cache_path, None
+
+
+def get_gemini_model(temp=0.7):
+    """One shared client per temperature instead of a new one per call."""
+    with _lock:
+        if temp not in _models:
+            _models[temp] = ChatGoogleGenerativeAI(model=MODEL, google_api_key=GOOGLE_API_KEY, temperature=temp)
+        return _models[temp]
+
+
+def get_cache():
+    global _cache
+    with _lock:
+        if _cache is None: _cache = LLMCache(LLM_CACHE_PATH)
+        return _cache
+
+
+def run_chain(template, temp, inputs, use_cache=True):
+    """`prompt | llm | JsonOutputParser()` with the result cached on disk.
+
+    Identical template + model + temperature + input comes back from the cache without spending tokens.
+    Only a non-empty list is cached: an empty or malformed answer is asked again next time.
+    """
+    key = cache_key(template, MODEL, temp, inputs)
+    if use_cache:
+        cached = get_cache().get(key)
+        if cached: return cached
+    prompt = ChatPromptTemplate.from_template(template)
+    chain = prompt | get_gemini_model(temp) | JsonOutputParser()
+    result = chain.invoke(inputs)
+    if isinstance(result, list) and result: get_cache().set(key, result)
+    return result
+
+
+def stream_chain(template, temp, inputs, use_cache=True):
+    """Like `run_chain`, but yields each item of the JSON array as soon as it is complete.
+
+    JsonOutputParser streams the whole partially-parsed array on every chunk; every item
+    before the last one is finished, so those are safe to hand out. The full result is cached.
+    """
+    key = cache_key(template, MODEL, temp, inputs)
+    if use_cache:
+        cached = get_cache().get(key)
+        if cached:
+            yield from cached
+            return
+    prompt = ChatPromptTemplate.from_template(template)
+    chain = prompt | get_gemini_model(temp) | JsonOutputParser()
+    sent, latest = 0, []
+    for partial in chain.stream(inputs):
+        if not isinstance(partial, list): continue
+        latest = partial
+        while sent < len(latest) - 1:
+            yield latest[sent]
+            sent += 1
+    yield from latest[sent:]
+    if latest: get_cache().set(key, latest)
+
+
+def run_batch(jobs, max_concurrency=None, use_cache=True):
+    """Runs many `(template, temp, inputs)` jobs at once through a single `batch` call.
+
+    At most `max_concurrency` calls are in flight, so the total wall time is about the
+    slowest call rather than the sum. Results come back in job order; a failed job
+    returns its exception instead of failing the whole batch. Cached jobs skip the model.
+    """
+    if not jobs: return []
+    runner = RunnableLambda(lambda job: run_chain(*job, use_cache=use_cache))
+    return runner.batch(list(jobs), config={"max_concurrency": max_concurrency or MAX_CONCURRENCY}, return_exceptions=True)
+
+
+# --- CHUNKING ---
+def chunk_text(text, max_chars=CHUNK_CHARS):
+    """Splits on blank lines into pieces of at most `max_chars` (a longer single paragraph stays whole)."""
+    chunks, current = [], ""
+    for para in (p.strip() for p in text.split("\n\n")):
+        if not para: continue
+        if current and len(current) + len(para) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{para}" if current else para
+    return chunks + [current] if current else chunks
+
+
+def chunk_items(items, size=CHUNK_ITEMS):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def merge_results(results):
+    """Flattens per-chunk outputs in order, dropping failed chunks and repeated tweets."""
+    merged, seen = [], set()
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"❌ Chunk failed: {result}")
+            continue
+        for item in result or []:
+            text = item.get("tweet") if isinstance(item, dict) else item
+            if text in seen: continue
+            seen.add(text)
+            merged.append(item)
+    return merged
+
+
+def generate_all(requests, max_concurrency=None, use_cache=True, thread_text=None):
+    """`{name: [job, ...]}` -> `{name: merged results}`, with every job of every name in one batch.
+
+    Build the jobs with the `*_jobs` helpers below, e.g.
+    `generate_all({"lead": lead_jobs(leads), "news": news_jobs(news), "remix": remix_jobs(text)})`.
+    With `thread_text`, the thread is split locally and its rewrites join the same batch;
+    the finished tweets come back under "thread".
+    """
+    segments = split_thread(thread_text) if thread_text else []
+    flat = [(name, job) for name, jobs in requests.items() for job in jobs]
+    results = run_batch([job for _, job in flat] + thread_rewrite_jobs(segments), max_concurrency, use_cache)
+    out = {name: [] for name in requests}
+    for (name, _), result in zip(flat, results):
+        out[name].append(result)
+    out = {name: merge_results(chunks) for name, chunks in out.items()}
+    if thread_text: out["thread"] = join_thread(segments, results[len(flat):])
+    return out
+
+
+# --- PROMPTS ---
+THREAD_TEMPLATE = """
+    You are a Twitter Thread Editor.
+    TASK: Split text into tweets. If >280 chars, rewrite to shorter.
+    RAW TEXT: {raw_text}
+    OUTPUT JSON: ["Tweet 1", "Tweet 2"]
+    """
+
+REMIX_TEMPLATE = """
+    You are a Viral Social Media Architect.
+    Extract stories from this raw text and rewrite them into 10 unique tweets.
+    STRICT RULES:
+    1. LENGTH: Must be under 280 chars.
+    2. HOOKS: Start with a strong hook.
+    RAW INPUT: {raw_text}
+    OUTPUT JSON: [{{ "category": "Value", "tweet": "...", "source": "Extracted Topic" }}]
+    """
+
+LEAD_TEMPLATE = """
+    You are a Viral B2B Ghostwriter. Create 10 DISTINCT "Lead Gen" tweets.
+    STRICT RULES:
+    1. LENGTH: MUST be under 280 chars.
+    2. STYLE: Hook -> Pain Point -> Solution -> CTA.
+    INPUT: {reddit_data}
+    OUTPUT JSON: [{{ "topic": "...", "tweet": "...", "source": "..." }}]
+    """
+
+NEWS_TEMPLATE = """
+    You are a Tech Influencer. Create 10 News Tweets.
+    STRICT RULES:
+    1. LENGTH: MUST be under 280 chars.
+    INPUT: {reddit_data}
+    OUTPUT JSON: [{{ "topic": "AI News", "tweet": "...", "source": "..." }}]
+    """
+
+
+# --- JOBS (template, temperature, inputs) ---
+def thread_job(raw_text):
+    return (THREAD_TEMPLATE, 0.3, {"raw_text": raw_text})
+
+
+def remix_job(raw_text):
+    return (REMIX_TEMPLATE, 0.8, {"raw_text": raw_text})
+
+
+def lead_job(reddit_data):
+    return (LEAD_TEMPLATE, 0.8, {"reddit_data": "\n\n".join(reddit_data)})
+
+
+def news_job(reddit_data):
+    return (NEWS_TEMPLATE, 0.6, {"reddit_data": "\n\n".join(reddit_data)})
+
+
+def remix_jobs(raw_text, max_chars=CHUNK_CHARS):
+    return [remix_job(c) for c in chunk_text(raw_text, max_chars)]
+
+
+def lead_jobs(reddit_data, size=CHUNK_ITEMS):
+    return [lead_job(c) for c in chunk_items(reddit_data, size)]
+
+
+def news_jobs(reddit_data, size=CHUNK_ITEMS):
+    return [news_job(c) for c in chunk_items(reddit_data, size)]
+
+
+# --- AI GENERATORS ---
+def thread_rewrite_jobs(segments):
+    """Jobs for the `split_thread` segments that don't fit in a tweet."""
+    return [thread_job(s) for s, ok in segments if not ok]
+
+
+def join_thread(segments, rewrites):
+    """Tweets of a thread: segments that fit as they are, the others replaced by their rewrites (in job order)."""
+    rewrites = iter(rewrites)
+    tweets = []
+    for segment, ok in segments:
+        result = segment if ok else next(rewrites)
+        if isinstance(result, Exception):
+            print(f"❌ Rewrite failed: {result}")
+            result = segment
+        tweets += [result] if isinstance(result, str) else result
+    return tweets
+
+
+def process_thread_text(raw_text, use_cache=True):
+    """Splits locally; only the pieces that can't fit in a tweet are sent to the model to rewrite."""
+    segments = split_thread(raw_text)
+    return join_thread(segments, run_batch(thread_rewrite_jobs(segments), use_cache=use_cache))
+
+
+def generate_remix_batch(raw_text, use_cache=True):
+    return run_chain(*remix_job(raw_text), use_cache)
+
+
+def generate_lead_posts_batch(reddit_data, use_cache=True):
+    return run_chain(*lead_job(reddit_data), use_cache)
+
+
+def generate_news_posts_batch(reddit_data, use_cache=True):
+    return run_chain(*news_job(reddit_data), use_cache)
+
+
+# --- STREAMING VARIANTS (yield one tweet at a time) ---
+def stream_thread_text(raw_text, use_cache=True):
+    for segment, ok in split_thread(raw_text):
+        if ok: yield segment
+        else: yield from stream_chain(*thread_job(segment), use_cache)
+
+
+def stream_remix_batch(raw_text, use_cache=True):
+    return stream_chain(*remix_job(raw_text), use_cache)
+
+
+def stream_lead_posts_batch(reddit_data, use_cache=True):
+    return stream_chain(*lead_job(reddit_data), use_cache)
+
+
+def stream_news_posts_batch(reddit_data, use_cache=True):
+    return stream_chain(*news_job(reddit_data), use_cache)
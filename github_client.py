@@ -0,0 +1,133 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# --- CONFIGURATION ---
+BASE_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")  # also set by GitHub Actions
+POOL_SIZE = 16
+CACHE_BYTES = 8 * 2 ** 20  # bodies kept for ETag revalidation, least recently used dropped first
+_SHA = re.compile(r"[0-9a-f]{40}")
+
+
+class ConflictError(Exception):
+    """GitHub rejected a write because the branch moved underneath us (409/422)."""
+
+
+class GitHubClient:
+    """One pooled, keep-alive session per repo with ETag-aware GETs.
+
+    GETs remember the response's ETag. The next identical GET sends `If-None-Match`; a 304
+    returns the cached body without downloading or decoding anything, and GitHub doesn't
+    count it against the rate limit. Any write through the client drops the cache.
+
+    Only reads that can change are cached (the branch ref, unpinned files), in an LRU bounded
+    by `cache_bytes`. Reads pinned to a commit sha and immutable blobs never change, so their
+    callers keep what they need themselves (`cache=False`, or a `ref` that is a sha).
+    """
+
+    def __init__(self, token, owner, repo, base_url=BASE_URL, cache_bytes=CACHE_BYTES):
+        self.repo_url = f"{base_url}/repos/{owner}/{repo}"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28"
+        })
+        self._cache = OrderedDict()  # (url, params, accept) -> (etag, status, body, size), oldest first
+        self._cache_size = 0
+        self.cache_bytes = cache_bytes
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "not_modified": 0}
+
+    def url(self, path=""):
+        return f"{self.repo_url}{path}"
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+            self._cache_size = 0
+
+    def _remember(self, key, etag, status, body, size):
+        with self._lock:
+            if key in self._cache: self._cache_size -= self._cache.pop(key)[3]
+            if size > self.cache_bytes: return
+            self._cache[key] = (etag, status, body, size)
+            self._cache_size += size
+            while self._cache_size > self.cache_bytes:
+                self._cache_size -= self._cache.popitem(last=False)[1][3]
+
+    def get(self, path, params=None, accept=None, ok=(200,), cache=True):
+        """GET `path` (relative to the repo). Returns (status, body); body is JSON, or bytes for raw media types.
+
+        `cache=False` for reads that can't change (blobs by hash, commits); reads with a sha `ref` are never cached.
+        """
+        cache = cache and not _SHA.fullmatch(str((params or {}).get("ref", "")))
+        key = (path, tuple(sorted((params or {}).items())), accept)
+        headers = {"Accept": accept} if accept else {}
+        cached = None
+        if cache:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached: self._cache.move_to_end(key)
+        if cached: headers["If-None-Match"] = cached[0]
+
+        with metrics.span("github.get", path=path) as span:
+            resp = self.session.get(self.url(path), params=params, headers=headers)
+            span.fields["status"] = resp.status_code
+        self.stats["requests"] += 1
+        metrics.incr("github_requests")
+        metrics.incr("github_bytes_read", len(resp.content))
+        if resp.status_code == 304 and cached:
+            self.stats["not_modified"] += 1
+            metrics.incr("github_not_modified")
+            return cached[1], cached[2]
+        if resp.status_code not in ok:
+            raise RuntimeError(f"GitHub GET {path} failed ({resp.status_code}): {resp.text[:200]}")
+        body = resp.content if accept and accept.endswith(".raw") else (resp.json() if resp.content else None)
+        if cache and resp.headers.get("ETag"):
+            self._remember(key, resp.headers["ETag"], resp.status_code, body, len(resp.content))
+        return resp.status_code, body
+
+    def get_json(self, path, params=None, cache=True):
+        """JSON body of `path`, or None when it doesn't exist."""
+        status, body = self.get(path, params=params, ok=(200, 404), cache=cache)
+        return body if status == 200 else None
+
+    def write(self, method, path, ok=(200, 201), **kwargs):
+        """PUT/POST/PATCH/DELETE. Raises ConflictError on 409/422 so callers can rebase and retry."""
+        self.invalidate()
+        with metrics.span(f"github.{method.lower()}", path=path) as span:
+            resp = self.session.request(method, self.url(path), **kwargs)
+            span.fields["status"] = resp.status_code
+        self.stats["requests"] += 1
+        metrics.incr("github_requests")
+        metrics.incr("github_bytes_written", len(resp.request.body or b""))
+        if resp.status_code in (409, 422):
+            metrics.incr("github_conflicts")
+            raise ConflictError(f"{method} {path} -> {resp.status_code}: {resp.text[:200]}")
+        if resp.status_code not in ok:
+            raise RuntimeError(f"GitHub {method} {path} failed ({resp.status_code}): {resp.text[:200]}")
+        return resp.json() if resp.content else None
+
+
+# --- SHARED CLIENTS ---
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(token, owner, repo):
+    """Process-wide client per repo, so the Streamlit app and the scheduler helpers share pools and caches."""
+    key = (token, owner, repo)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = GitHubClient(token, owner, repo, base_url=BASE_URL)
+        return _clients[key]
@@ -0,0 +1,71 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# --- CONFIGURATION ---
+# X serves photos at most 2048px on the long edge in the timeline ("large"); anything bigger is wasted bytes.
+MAX_PX = int(os.environ.get("IMAGE_MAX_PX", 2048))
+JPEG_QUALITY = 85
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+MAGIC = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def sniff_mime(data):
+    """MIME type from the file's magic bytes, not from its name or the browser's guess."""
+    for magic, mime in MAGIC:
+        if data.startswith(magic): return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP": return "image/webp"
+    return "application/octet-stream"
+
+
+def _has_alpha(img):
+    if img.mode in ("RGBA", "LA"): return img.getchannel("A").getextrema()[0] < 255
+    return img.mode == "P" and "transparency" in img.info
+
+
+def ingest(data, max_px=MAX_PX):
+    """Real format in, (optimized bytes, MIME type) out.
+
+    Applies the EXIF rotation, shrinks to `max_px` on the long edge and re-encodes without
+    EXIF/XMP (GPS, camera serials): photos as progressive JPEG, images with transparency as
+    optimized PNG. Animated GIFs pass through untouched. Without Pillow the bytes are kept and
+    only the MIME type is fixed.
+    """
+    mime = sniff_mime(data)
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return data, mime
+    img = Image.open(io.BytesIO(data))
+    if getattr(img, "is_animated", False): return data, mime
+
+    icc = img.info.get("icc_profile")  # colour, not metadata: keep it so colours don't shift
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((max_px, max_px), Image.LANCZOS)
+    out = io.BytesIO()
+    if _has_alpha(img):
+        img.convert("RGBA").save(out, "PNG", optimize=True, icc_profile=icc)
+        mime = "image/png"
+    else:
+        img.convert("RGB").save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True, icc_profile=icc)
+        mime = "image/jpeg"
+    return out.getvalue(), mime
+
+
+def ingest_many(images, max_px=MAX_PX, max_workers=MAX_WORKERS):
+    """`ingest` for several images; a thread's images are decoded and re-encoded in parallel processes."""
+    if len(images) < 2 or max_workers < 2:
+        return [ingest(data, max_px) for data in images]
+    try:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(images))) as pool:
+            return list(pool.map(ingest, images, [max_px] * len(images)))
+    except (BrokenProcessPool, OSError):
+        # Hosts that can't fork (some sandboxes) still get the images, just one at a time
+        return [ingest(data, max_px) for data in images]
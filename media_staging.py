@@ -0,0 +1,116 @@
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import metrics
+from dispatcher import RateLimited, call_limited
+from delivery import staged_media
+from media_store import post_image_bytes, has_image
+
+# --- CONFIGURATION ---
+DEFAULT_STAGE_AHEAD = 10 * 60   # seconds before a post is due that its image gets uploaded
+DEFAULT_MEDIA_TTL = 24 * 60 * 60  # X keeps unattached media around ~24h when it doesn't say otherwise
+EXPIRY_MARGIN = 5 * 60          # don't attach a media_id this close to its expiry
+
+
+def upload_bytes(api, data, mime_type=None, limiter=None):
+    """Uploads image bytes straight from memory (v1.1 API). Returns the tweepy Media object."""
+    ext = (mime_type or "image/png").split("/")[-1]
+    metrics.incr("x_bytes_uploaded", len(data))
+    # tweepy only uses the filename to guess the MIME type when a file object is given
+    return call_limited(limiter, api.media_upload, filename=f"image.{ext}", file=io.BytesIO(data))
+
+
+class MediaStager:
+    """Uploads images ahead of time so posting only has to attach `media_ids`.
+
+    Uploads are keyed by post id (a media_id is attached to one tweet), images are read
+    from memory via the media store. Ready ids are cached with their expiry; failures are
+    counted per post.
+    """
+
+    def __init__(self, api, media, limiter=None, max_workers=4):
+        self.api = api
+        self.media = media
+        self.limiter = limiter
+        self.ready = {}     # key -> (media_id, expires_at)
+        self.failures = {}  # key -> {"count": n, "error": "..."}
+        self._jobs = {}     # key -> Future for uploads in flight
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    @staticmethod
+    def key(post):
+        return post["id"]
+
+    def _fresh(self, key):
+        entry = self.ready.get(key)
+        return entry is not None and entry[1] - EXPIRY_MARGIN > time.time()
+
+    def _upload(self, key, post):
+        try:
+            data = post_image_bytes(post, self.media)
+            uploaded = upload_bytes(self.api, data, post.get("image_type"), self.limiter)
+            ttl = getattr(uploaded, "expires_after_secs", None) or DEFAULT_MEDIA_TTL
+            with self._lock:
+                self.ready[key] = (uploaded.media_id, time.time() + ttl)
+                self.failures.pop(key, None)
+            return uploaded.media_id
+        except Exception as e:
+            with self._lock:
+                failure = self.failures.setdefault(key, {"count": 0, "error": None})
+                failure["count"] += 1
+                failure["error"] = str(e)
+            raise
+        finally:
+            with self._lock:
+                self._jobs.pop(key, None)
+
+    def _submit(self, post):
+        """Starts (or joins) the upload for a post's image. Caller holds the lock."""
+        key = self.key(post)
+        if key not in self._jobs:
+            self._jobs[key] = self._pool.submit(self._upload, key, post)
+        return self._jobs[key]
+
+    def staged(self, post):
+        """(media_id, expires_at) of the post's upload, if it's done; saved in its delivery state."""
+        with self._lock:
+            return self.ready.get(self.key(post))
+
+    def stage(self, posts):
+        """Starts background uploads for any of `posts` whose image isn't ready yet. Returns immediately.
+
+        Uploads recorded in a post's delivery state by an earlier run are reused while they're fresh.
+        """
+        with self._lock:
+            for post in posts:
+                kept = staged_media(post)
+                if kept and self.key(post) not in self.ready: self.ready[self.key(post)] = tuple(kept)
+                if has_image(post) and not self._fresh(self.key(post)):
+                    self._submit(post)
+
+    def wait(self, posts):
+        """Blocks until the uploads in flight for `posts` are done; failed ones are in `failures`."""
+        with self._lock:
+            jobs = [self._jobs[key] for key in map(self.key, posts) if key in self._jobs]
+        wait(jobs)
+
+    def media_ids(self, post):
+        """`media_ids` for create_tweet: the staged id, waiting on (or starting) the upload if needed."""
+        if not has_image(post): return None
+        key = self.key(post)
+        with self._lock:
+            if self._fresh(key): return [self.ready[key][0]]
+            job = self._submit(post)
+        try:
+            return [job.result()]
+        except RateLimited:
+            raise  # as is: its `reset` holds the post back until X's upload window reopens
+        except Exception as e:
+            # Fail the post rather than publish it without its image; it is retried with backoff
+            raise RuntimeError(f"Image upload failed: {e}") from e
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
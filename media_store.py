@@ -0,0 +1,176 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from github_client import ConflictError, get_client
+
+# --- CONFIGURATION ---
+MEDIA_PATH = "media"
+DEFAULT_MEDIA_DIR = "media"
+REF_PREFIX = "sha256:"
+THUMB_PX = 160
+
+
+def make_ref(data):
+    """Content address of an image: the same bytes always get the same ref."""
+    return REF_PREFIX + hashlib.sha256(data).hexdigest()
+
+
+def _digest(ref):
+    if not ref.startswith(REF_PREFIX):
+        raise ValueError(f"Not a media ref: {ref}")
+    return ref[len(REF_PREFIX):]
+
+
+# --- STORE INTERFACE ---
+class MediaStore:
+    """Hash-keyed image blobs. Posts keep only `image_ref`; bytes are fetched when actually needed."""
+
+    def __init__(self, cache_size=32):
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def put(self, data):
+        """Stores `data` once and returns its ref. Identical images share a single blob."""
+        ref = make_ref(data)
+        if not self._exists(_digest(ref)):
+            self._write(_digest(ref), data)
+        self._remember(ref, data)
+        return ref
+
+    def get(self, ref):
+        """Bytes behind `ref`, served from a small in-memory LRU when possible."""
+        with self._lock:
+            if ref in self._cache:
+                self._cache.move_to_end(ref)
+                return self._cache[ref]
+        data = self._read(_digest(ref))
+        self._remember(ref, data)
+        return data
+
+    def _remember(self, ref, data):
+        with self._lock:
+            self._cache[ref] = data
+            self._cache.move_to_end(ref)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _exists(self, digest):
+        raise NotImplementedError
+
+    def _read(self, digest):
+        raise NotImplementedError
+
+    def _write(self, digest, data):
+        raise NotImplementedError
+
+
+# --- LOCAL BACKEND ---
+class LocalMediaStore(MediaStore):
+    """Blobs on disk as `<root>/<ab>/<abcdef...>`, next to the SQLite queue."""
+
+    def __init__(self, root=DEFAULT_MEDIA_DIR, cache_size=32):
+        super().__init__(cache_size)
+        self.root = root
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _exists(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def _read(self, digest):
+        with open(self._path(digest), "rb") as f:
+            return f.read()
+
+    def _write(self, digest, data):
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+# --- GITHUB BACKEND ---
+class GitHubMediaStore(MediaStore):
+    """Blobs as files under `media/` in the repo. Written once, never rewritten."""
+
+    def __init__(self, token, owner, repo, path=MEDIA_PATH, cache_size=32):
+        super().__init__(cache_size)
+        self.client = get_client(token, owner, repo)
+        self.path = path
+        self.base = f"/contents/{path}"
+
+    def path_of(self, ref):
+        """Repo path of a blob, for writers that commit images together with other files."""
+        return f"{self.path}/{_digest(ref)}"
+
+    def _exists(self, digest):
+        return self.client.session.head(self.client.url(f"{self.base}/{digest}")).status_code == 200
+
+    def _read(self, digest):
+        # The raw media type skips the base64 JSON envelope (and works past the 1 MB contents limit).
+        # Blobs never change, so the client doesn't keep a copy: the LRU above is the only cache.
+        status, body = self.client.get(f"{self.base}/{digest}", accept="application/vnd.github.raw", ok=(200, 404), cache=False)
+        if status != 200:
+            raise KeyError(f"Media blob not found: {digest}")
+        return body
+
+    def _write(self, digest, data):
+        body = {"message": f"Add media {digest[:12]}", "content": base64.b64encode(data).decode("utf-8")}
+        for attempt in range(3):
+            try:
+                self.client.write("PUT", f"{self.base}/{digest}", json=body)
+                return
+            except ConflictError:
+                # Someone stored the same blob first (fine for content-addressed data), or the branch just moved
+                if self._exists(digest): return
+                metrics.incr("github_retries")
+                time.sleep(0.5 * 2 ** attempt)
+        raise RuntimeError(f"Media upload to GitHub kept conflicting: {digest}")
+
+
+# --- POST HELPERS ---
+def post_image_bytes(post, media):
+    """Image bytes for a post, or None. Handles both `image_ref` and legacy inline `image_data`."""
+    if post.get("image_ref"):
+        return media.get(post["image_ref"])
+    if post.get("image_data"):
+        encoded = post["image_data"].split(",", 1)[-1]
+        return base64.b64decode(encoded)
+    return None
+
+
+def has_image(post):
+    return bool(post.get("image_ref") or post.get("image_data"))
+
+
+def make_thumbnail(data, max_px=THUMB_PX):
+    """Small JPEG preview of image bytes for the queue view. Returns the bytes untouched without Pillow."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+    img = Image.open(io.BytesIO(data))
+    img.thumbnail((max_px, max_px))
+    if img.mode not in ("RGB", "L"): img = img.convert("RGB")
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=80)
+    return out.getvalue()
+
+
+# --- FACTORY ---
+def open_media_store(backend="github", token=None, owner=None, repo=None, media_dir=DEFAULT_MEDIA_DIR):
+    """Pairs with `queue_store.open_store`: GitHub queue -> GitHub blobs, SQLite queue -> local blobs."""
+    if backend == "sqlite":
+        return LocalMediaStore(media_dir)
+    if backend == "github":
+        return GitHubMediaStore(token, owner, repo)
+    raise ValueError(f"Unknown media backend: {backend}")
@@ -0,0 +1,142 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# --- CONFIGURATION ---
+# METRICS_LOG: file for one JSON line per span/event ("-" = stderr, unset = off).
+# METRICS_TEXTFILE: Prometheus textfile (e.g. for node_exporter's textfile collector), rewritten on flush().
+# METRICS_OPENMETRICS=1 writes the textfile in OpenMetrics format instead.
+METRICS_LOG = os.environ.get("METRICS_LOG")
+METRICS_TEXTFILE = os.environ.get("METRICS_TEXTFILE")
+METRICS_OPENMETRICS = os.environ.get("METRICS_OPENMETRICS") == "1"
+PREFIX = "x_automations"
+
+
+class Span:
+    """Times a block; cheap enough to wrap every HTTP call."""
+
+    __slots__ = ("recorder", "name", "fields", "started")
+
+    def __init__(self, recorder, name, fields):
+        self.recorder, self.name, self.fields = recorder, name, fields
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None: self.fields["error"] = exc_type.__name__
+        self.recorder.record_span(self.name, time.perf_counter() - self.started, self.fields)
+        return False
+
+
+class Recorder:
+    """In-memory span timings, counters, gauges and summaries, plus the JSON-lines stream.
+
+    Aggregates are plain dict updates under a lock; a JSON line is only formatted when a log
+    is configured. `flush()` writes the Prometheus textfile (atomically) and the run summary.
+    """
+
+    def __init__(self, log_path=None, textfile=None, openmetrics=False):
+        self._lock = threading.Lock()
+        self._log = None
+        self.textfile = textfile
+        self.openmetrics = openmetrics
+        if log_path: self._log = sys.stderr if log_path == "-" else open(log_path, "a", encoding="utf-8", buffering=1)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.spans = {}      # name -> [count, total seconds, max seconds]
+            self.counters = {}   # name -> value
+            self.gauges = {}     # name -> value
+            self.summaries = {}  # name -> [count, sum, max]
+
+    # --- RECORDING ---
+    def span(self, name, **fields):
+        return Span(self, name, fields)
+
+    def record_span(self, name, seconds, fields):
+        with self._lock:
+            agg = self.spans.setdefault(name, [0, 0.0, 0.0])
+            agg[0] += 1
+            agg[1] += seconds
+            agg[2] = max(agg[2], seconds)
+        if self._log: self._write({"span": name, "ms": round(seconds * 1000, 2), **fields})
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name, value):
+        with self._lock:
+            agg = self.summaries.setdefault(name, [0, 0.0, float("-inf")])
+            agg[0] += 1
+            agg[1] += value
+            agg[2] = max(agg[2], value)
+
+    def event(self, name, **fields):
+        if self._log: self._write({"event": name, **fields})
+
+    def _write(self, record):
+        line = json.dumps({"ts": round(time.time(), 3), **record}, default=str)
+        with self._lock:
+            self._log.write(line + "\n")
+
+    # --- OUTPUT ---
+    def summary(self):
+        with self._lock:
+            return {
+                "spans": {n: {"count": c, "ms": round(t * 1000, 1), "max_ms": round(m * 1000, 1)} for n, (c, t, m) in self.spans.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "summaries": {n: {"count": c, "sum": round(s, 3), "max": round(m, 3)} for n, (c, s, m) in self.summaries.items()},
+            }
+
+    def prometheus(self):
+        """Text exposition format (or OpenMetrics) of everything recorded so far."""
+        om = self.openmetrics
+        lines = []
+        with self._lock:
+            lines += [f"# TYPE {PREFIX}_span_seconds summary"]
+            for name, (count, total, _) in sorted(self.spans.items()):
+                lines += [f'{PREFIX}_span_seconds_count{{span="{name}"}} {count}', f'{PREFIX}_span_seconds_sum{{span="{name}"}} {total:.6f}']
+            lines += [f"# TYPE {PREFIX}_span_max_seconds gauge"]
+            lines += [f'{PREFIX}_span_max_seconds{{span="{name}"}} {agg[2]:.6f}' for name, agg in sorted(self.spans.items())]
+            for name, value in sorted(self.counters.items()):
+                metric = f"{PREFIX}_{name}"
+                lines += [f"# TYPE {metric if om else metric + '_total'} counter", f"{metric}_total {value}"]
+            for name, value in sorted(self.gauges.items()):
+                lines += [f"# TYPE {PREFIX}_{name} gauge", f"{PREFIX}_{name} {value}"]
+            for name, (count, total, peak) in sorted(self.summaries.items()):
+                metric = f"{PREFIX}_{name}"
+                lines += [f"# TYPE {metric} summary", f"{metric}_count {count}", f"{metric}_sum {total:.6f}",
+                          f"# TYPE {metric}_max gauge", f"{metric}_max {peak:.6f}"]
+        lines += [f"# TYPE {PREFIX}_last_flush_timestamp_seconds gauge", f"{PREFIX}_last_flush_timestamp_seconds {time.time():.0f}"]
+        if om: lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def flush(self, event="run"):
+        """Writes the summary as one JSON line and refreshes the textfile. Call at the end of a run."""
+        self.event(event, **self.summary())
+        if self.textfile:
+            tmp = f"{self.textfile}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            os.replace(tmp, self.textfile)  # the collector never sees a half-written file
+
+
+# --- PROCESS-WIDE RECORDER ---
+recorder = Recorder(METRICS_LOG, METRICS_TEXTFILE, METRICS_OPENMETRICS)
+span = recorder.span
+incr = recorder.incr
+gauge = recorder.gauge
+observe = recorder.observe
+event = recorder.event
+flush = recorder.flush
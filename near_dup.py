@@ -0,0 +1,135 @@
+import hashlib
+import html
+import random
+import re
+import sqlite3
+import threading
+import time
+
+# --- CONFIGURATION ---
+DEFAULT_INDEX_PATH = "news_index.db"
+NUM_PERM = 64             # MinHash values per text
+BANDS = 32                # LSH: 32 bands of 2 values; texts at Jaccard 0.5 share a band with ~99.99% probability
+THRESHOLD = 0.5           # word-set Jaccard at or above which two texts tell the same story (rewordings score 0.6+, different stories under 0.45)
+MAX_AGE = 90 * 24 * 60 * 60
+
+STOPWORDS = set("a an and are as at be by for from has have how i in is it its of on or that the this to was what with you your".split())
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_AMOUNT = re.compile(r"\$?(\d+(?:\.\d+)?)\s?(k|m|mn|b|bn|t|tn)\b")  # "$5B", "5bn" -> "5 billion"
+_SCALE = {"k": "thousand", "m": "million", "mn": "million", "b": "billion", "bn": "billion", "t": "trillion", "tn": "trillion"}
+
+# Universal hashes (a*x + b) mod p standing in for NUM_PERM random permutations; seeded, so
+# signatures stored in the index stay comparable across runs
+_PRIME = (1 << 61) - 1
+_rnd = random.Random(13)
+_PERMS = [(_rnd.randrange(1, _PRIME), _rnd.randrange(_PRIME)) for _ in range(NUM_PERM)]
+
+
+def _stem(word):
+    # Plurals and third-person "s" only: "releases" / "release", "raises" / "raise"
+    return word[:-1] if len(word) > 4 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def normalize_text(text):
+    """Lowercase words without markup, tags like [D] or (2024), and stopwords; amounts spelled out."""
+    text = html.unescape(text or "").lower()
+    text = re.sub(r"\[[^\]]*\]|\([^)]*\)|https?://\S+", " ", text)
+    text = _AMOUNT.sub(lambda m: f"{m.group(1)} {_SCALE[m.group(2)]}", text)
+    return [_stem(w) for w in _WORD.findall(text) if w not in STOPWORDS]
+
+
+def shingles(text):
+    """The word set of a text. Single words: headlines are too short for longer shingles to survive a one-word edit."""
+    return frozenset(normalize_text(text))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def minhash(words):
+    """MinHash signature of a word set: NUM_PERM 32-bit values, or None for an empty set."""
+    if not words: return None
+    hashes = [int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "big") for w in words]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) & 0xFFFFFFFF for a, b in _PERMS)
+
+
+def _bands(signature):
+    rows = NUM_PERM // BANDS
+    return [(i, signature[i * rows:(i + 1) * rows]) for i in range(BANDS)]
+
+
+def _encode(signature):
+    return "".join(f"{v:08x}" for v in signature)
+
+
+def _decode(value):
+    return tuple(int(value[i:i + 8], 16) for i in range(0, len(value), 8))
+
+
+class MinHashIndex:
+    """Persistent near-duplicate index over past headlines and tweets.
+
+    Two texts are the same story when their word sets overlap by at least `threshold`
+    (Jaccard). Signatures live in SQLite and are bucketed in memory by LSH band, so a lookup
+    only checks the few past items sharing a band, and those are confirmed on their exact
+    word sets.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS fingerprints (
+        hash TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        text TEXT NOT NULL,
+        added REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_fingerprints_added ON fingerprints (added);
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, threshold=THRESHOLD, max_age=MAX_AGE):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+        with self._conn:
+            self._conn.execute("DELETE FROM fingerprints WHERE added < ?", (time.time() - max_age,))
+        self._texts = []   # row -> (text, word set)
+        self._buckets = {}  # (band, values) -> [row, ...]
+        for h, text in self._conn.execute("SELECT hash, text FROM fingerprints"):
+            self._remember(text, shingles(text), _decode(h))
+
+    @property
+    def size(self):
+        return len(self._texts)
+
+    def _remember(self, text, words, signature):
+        row = len(self._texts)
+        self._texts.append((text, words))
+        for band in _bands(signature):
+            self._buckets.setdefault(band, []).append(row)
+
+    def match(self, text, extra=()):
+        """The most similar stored text (or one of `extra`) at or above the threshold, or None."""
+        words = shingles(text)
+        if not words: return None
+        candidates = [(other, shingles(other)) for other in extra]
+        rows = set()
+        for band in _bands(minhash(words)):
+            rows.update(self._buckets.get(band, ()))
+        candidates += [self._texts[row] for row in rows]
+        score, best = max(((jaccard(words, other_words), other) for other, other_words in candidates), default=(0, None))
+        return best if score >= self.threshold else None
+
+    def is_duplicate(self, text, extra=()):
+        return self.match(text, extra) is not None
+
+    def add(self, texts, kind):
+        rows = []
+        for text in (t[:500] for t in texts):
+            words = shingles(text)
+            if not words: continue
+            signature = minhash(words)
+            self._remember(text, words, signature)
+            rows.append((_encode(signature), kind, text, time.time()))
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO fingerprints (hash, kind, text, added) VALUES (?, ?, ?, ?)", rows)
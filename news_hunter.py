@@ -0,0 +1,143 @@
+import argparse
+import base64
+import html
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+import generators
+from feeds import FeedCache, DEFAULT_CACHE_PATH as DEFAULT_FEED_CACHE_PATH
+from github_client import get_client
+from near_dup import MinHashIndex, DEFAULT_INDEX_PATH
+
+# --- CONFIGURATION ---
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
+GITHUB_OWNER = os.environ.get("GITHUB_OWNER")
+GITHUB_REPO = os.environ.get("GITHUB_REPO")
+
+FEED_CACHE_PATH = os.environ.get("FEED_CACHE_PATH", DEFAULT_FEED_CACHE_PATH)
+NEWS_INDEX_PATH = os.environ.get("NEWS_INDEX_PATH", DEFAULT_INDEX_PATH)
+DRAFTS_DIR = os.environ.get("DRAFTS_DIR", "drafts")
+BATCH_SIZE = 15  # headlines per LLM call, same as the Streamlit pages
+MAX_ITEMS = int(os.environ.get("NEWS_MAX_ITEMS", 45))  # per kind and run, i.e. 3 calls
+
+JOBS = {
+    "lead": generators.lead_job,
+    "news": generators.news_job,
+}
+FORMATS = {
+    "lead": "Title: {title}\nLink: {link}",
+    "news": "Headline: {title}\nLink: {link}",
+}
+
+
+# --- PIPELINE STAGES ---
+def normalize(entries, kind):
+    """Cleans titles, drops exact repeats (same link) and, for news, the help/question posts."""
+    out, links = [], set()
+    for e in entries:
+        title = re.sub(r"\s+", " ", html.unescape(e.get("title", ""))).strip()
+        link = e.get("link", "").split("?")[0]
+        if not title or link in links: continue
+        if kind == "news" and ("help" in title.lower() or "?" in title): continue
+        links.add(link)
+        out.append({"title": title, "link": link, "source": e.get("source")})
+    return out
+
+
+def dedup(entries, index):
+    """Drops anything close to a story we've already covered, or to another entry in this batch."""
+    fresh, batch = [], []
+    for e in entries:
+        if index.is_duplicate(e["title"], extra=batch): continue
+        batch.append(e["title"])
+        fresh.append(e)
+    return fresh
+
+
+def generate(batches):
+    """Every chunk of every kind in one concurrent `run_batch`. Yields (kind, chunk, result or exception)."""
+    chunks = [(kind, chunk) for kind, entries in batches.items() for chunk in generators.chunk_items(entries, BATCH_SIZE)]
+    jobs = [JOBS[kind]([FORMATS[kind].format(**e) for e in chunk]) for kind, chunk in chunks]
+    for (kind, chunk), result in zip(chunks, generators.run_batch(jobs)):
+        yield kind, chunk, result
+
+
+def fresh_tweets(result, index, seen):
+    """Generated tweets minus the ones that repeat past tweets (or each other)."""
+    tweets = []
+    for t in result or []:
+        text = t.get("tweet", "") if isinstance(t, dict) else str(t)
+        if not text or index.is_duplicate(text, extra=seen): continue
+        seen.append(text)
+        tweets.append(t if isinstance(t, dict) else {"tweet": text})
+    return tweets
+
+
+def stage(drafts, push=False):
+    """Writes the drafts to drafts/<timestamp>.json locally, or commits it to the repo with --push."""
+    name = f"{datetime.now(timezone.utc).strftime('%Y-%m-%dT%H%M%SZ')}.json"
+    content = json.dumps(drafts, indent=2, ensure_ascii=False)
+    if push:
+        client = get_client(GITHUB_TOKEN, GITHUB_OWNER, GITHUB_REPO)
+        body = {"message": f"Stage {len(drafts)} drafts", "content": base64.b64encode(content.encode("utf-8")).decode("utf-8")}
+        client.write("PUT", f"/contents/{DRAFTS_DIR}/{name}", json=body)
+        return f"{DRAFTS_DIR}/{name} (pushed)"
+    os.makedirs(DRAFTS_DIR, exist_ok=True)
+    path = os.path.join(DRAFTS_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+# --- MAIN LOGIC ---
+def run(kinds=("lead", "news"), dry_run=False, push=False):
+    """fetch -> normalize -> dedup -> batch generate -> stage drafts."""
+    print("--- News Hunter ---")
+    feeds = FeedCache(path=FEED_CACHE_PATH)
+    feeds.refresh()
+    index = MinHashIndex(NEWS_INDEX_PATH)
+    print(f"📚 Index holds {index.size} past headlines/tweets")
+
+    batches = {}
+    for kind in kinds:
+        entries = normalize(feeds.entries(kind), kind)
+        fresh = dedup(entries, index)
+        print(f"📰 {kind}: {len(entries)} entries, {len(fresh)} new after near-duplicate filtering")
+        if dry_run:
+            for e in fresh[:MAX_ITEMS]: print(f"   - {e['title']}")
+        elif fresh:
+            batches[kind] = fresh[:MAX_ITEMS]
+
+    drafts, seen = [], []
+    now = datetime.now(timezone.utc).isoformat()
+    for kind, chunk, result in generate(batches):
+        if isinstance(result, Exception):
+            print(f"❌ Generation failed for a {kind} chunk: {result}")
+            continue
+        tweets = fresh_tweets(result, index, seen)
+        # Only mark stories as covered once tweets for them exist
+        index.add([e["title"] for e in chunk], kind="headline")
+        index.add([t["tweet"] for t in tweets], kind="tweet")
+        drafts += [{"kind": kind, "created": now, **t} for t in tweets]
+        print(f"✍️ {kind}: {len(tweets)} drafts from {len(chunk)} headlines")
+
+    if drafts:
+        print(f"📝 Staged {len(drafts)} drafts -> {stage(drafts, push)}")
+    else:
+        print("💤 Nothing new to draft.")
+    return drafts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Headless news / lead-gen drafting pipeline.")
+    parser.add_argument("--kinds", nargs="+", default=["lead", "news"], choices=sorted(JOBS), help="Which feeds to process")
+    parser.add_argument("--dry-run", action="store_true", help="Fetch and dedup only; don't call the LLM or mark anything seen")
+    parser.add_argument("--push", action="store_true", help="Commit the drafts file to the repo instead of writing it locally")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.kinds, dry_run=args.dry_run, push=args.push)
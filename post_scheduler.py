@@ -1,176 +1,483 @@
-import requests
-import base64
-import json
+import argparse
+import heapq
 import os
+import threading
 import tweepy
 import time
-import tempfile
 from datetime import datetime, timezone
+import delivery
+import metrics
+from accounts import DEFAULT_ACCOUNT, Account, AccountPool, UnknownAccount, account_keys, account_of, group_account
+from queue_store import open_store, DEFAULT_DB_PATH
+from queue_model import QueueIndex, to_epoch
+from media_store import has_image, open_media_store, DEFAULT_MEDIA_DIR
+from media_staging import MediaStager, DEFAULT_STAGE_AHEAD
+from dispatcher import TokenBucket, call_limited, dispatch_by, DEFAULT_WRITE_LIMIT, DEFAULT_WRITE_WINDOW, DEFAULT_BURST, DEFAULT_UPLOAD_LIMIT, DEFAULT_WORKERS
 
 # --- CONFIGURATION ---
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
 GITHUB_OWNER = os.environ.get("GITHUB_OWNER")
 GITHUB_REPO = os.environ.get("GITHUB_REPO")
-FILE_PATH = "scheduled_posts.json"
 
-# KEYS
+# KEYS (the "default" account; more accounts via X_ACCOUNTS, see accounts.py)
 CONSUMER_KEY = os.environ.get("TWITTER_CONSUMER_KEY")
 CONSUMER_SECRET = os.environ.get("TWITTER_CONSUMER_SECRET")
 ACCESS_TOKEN = os.environ.get("TWITTER_ACCESS_TOKEN")
 ACCESS_SECRET = os.environ.get("TWITTER_ACCESS_TOKEN_SECRET")
 
-BASE_URL = "https://api.github.com"
-HEADERS = {
-    "Authorization": f"Bearer {GITHUB_TOKEN}",
-    "Accept": "application/vnd.github+json",
-    "X-GitHub-Api-Version": "2022-11-28"
-}
-
-# --- GITHUB HELPER FUNCTIONS ---
-def get_posts():
-    url = f"{BASE_URL}/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents/{FILE_PATH}"
-    resp = requests.get(url, headers=HEADERS)
-    if resp.status_code != 200: return [], None
-    data = resp.json()
-    content = base64.b64decode(data["content"]).decode("utf-8")
-    return json.loads(content) if content.strip() else [], data["sha"]
-
-def update_file(posts, sha):
-    url = f"{BASE_URL}/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents/{FILE_PATH}"
-    content = base64.b64encode(json.dumps(posts, indent=2).encode("utf-8")).decode("utf-8")
-    body = {"message": "Updated queue via Scheduler", "content": content, "sha": sha}
-    requests.put(url, headers=HEADERS, json=body)
-
-# --- IMAGE HELPER FUNCTION ---
-def upload_image(api, base64_string):
-    """Decodes base64 string and uploads to Twitter. Returns Media ID."""
-    try:
-        if not base64_string: return None
-        
-        # Split header "data:image/png;base64," from the actual data
-        if "," in base64_string:
-            header, encoded = base64_string.split(",", 1)
-        else:
-            encoded = base64_string
-
-        # Create a temporary file to save the image
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as temp_file:
-            temp_file.write(base64.b64decode(encoded))
-            temp_filename = temp_file.name
-
-        # Upload using v1.1 API (Required for Media)
-        media = api.media_upload(filename=temp_filename)
-        
-        # Clean up temp file
-        os.remove(temp_filename)
-        
-        return media.media_id
-    except Exception as e:
-        print(f"❌ Image Upload Error: {e}")
-        return None
+QUEUE_BACKEND = os.environ.get("QUEUE_BACKEND", "github")  # "github" or "sqlite"
+QUEUE_DB_PATH = os.environ.get("QUEUE_DB_PATH", DEFAULT_DB_PATH)
+MEDIA_DIR = os.environ.get("MEDIA_DIR", DEFAULT_MEDIA_DIR)
 
-# --- MAIN LOGIC ---
-def main():
-    print("--- Checking Schedule ---")
-    posts, sha = get_posts()
-    if not posts: return
+# POSTING (match these to your X API tier's write limits)
+# Empty counts as unset: the workflow passes unset repository variables as ""
+X_WRITE_LIMIT = int(os.environ.get("X_WRITE_LIMIT") or DEFAULT_WRITE_LIMIT)     # tweets per window
+X_WRITE_WINDOW = int(os.environ.get("X_WRITE_WINDOW") or DEFAULT_WRITE_WINDOW)  # window in seconds
+X_WRITE_BURST = int(os.environ.get("X_WRITE_BURST") or 0) or DEFAULT_BURST  # 0/unset = whole window
+X_UPLOAD_LIMIT = int(os.environ.get("X_UPLOAD_LIMIT") or DEFAULT_UPLOAD_LIMIT)  # image uploads per X_WRITE_WINDOW
+POST_WORKERS = int(os.environ.get("POST_WORKERS") or DEFAULT_WORKERS)  # per account
+STAGE_AHEAD = int(os.environ.get("STAGE_AHEAD_SECONDS") or DEFAULT_STAGE_AHEAD)  # upload images this early (cron: past the next tick)
+LOOKAHEAD = 24 * 60 * 60  # daemon: how far ahead the queue is held in memory
+
+# --- QUEUE STORE ---
+def get_store():
+    return open_store(
+        QUEUE_BACKEND, token=GITHUB_TOKEN, owner=GITHUB_OWNER, repo=GITHUB_REPO,
+        db_path=QUEUE_DB_PATH, message="Updated queue via Scheduler"
+    )
+
+def get_media_store():
+    return open_media_store(QUEUE_BACKEND, token=GITHUB_TOKEN, owner=GITHUB_OWNER, repo=GITHUB_REPO, media_dir=MEDIA_DIR)
 
-    # 1. SETUP TWITTER AUTH (Need BOTH Client for text and API for images)
+# --- TWITTER HELPERS ---
+def make_clients(keys=None):
+    """Need BOTH Client for text and API for images. `keys` as from `account_keys` (default: the TWITTER_* ones)."""
+    consumer_key, consumer_secret, access_token, access_secret = keys or (CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_SECRET)
     # V2 Client (For Posting)
     client = tweepy.Client(
-        consumer_key=CONSUMER_KEY, consumer_secret=CONSUMER_SECRET,
-        access_token=ACCESS_TOKEN, access_token_secret=ACCESS_SECRET
+        consumer_key=consumer_key, consumer_secret=consumer_secret,
+        access_token=access_token, access_token_secret=access_secret
     )
     # V1.1 API (For Image Uploads - Tweepy requirement)
     auth = tweepy.OAuth1UserHandler(
-        CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_SECRET
+        consumer_key, consumer_secret, access_token, access_secret
     )
     api = tweepy.API(auth)
+    return client, api
+
+def make_limiter(wait=True):
+    return TokenBucket.for_window(X_WRITE_LIMIT, X_WRITE_WINDOW, X_WRITE_BURST, wait=wait)
+
+def make_upload_limiter(wait=True):
+    return TokenBucket.for_window(X_UPLOAD_LIMIT, X_WRITE_WINDOW, wait=wait)
+
+def make_accounts(media, wait=True):
+    """Clients per account, each with its own rate-limit bucket (X's write limits are per user) and image stager.
+
+    The stager has a bucket of its own, as uploads have their own limit. `wait=False` makes a 429
+    on either fail the post until X's reset instead of sleeping (see TokenBucket).
+    """
+    def factory(name):
+        keys = account_keys(name, (CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_SECRET))
+        if keys is None: raise UnknownAccount(f"No X credentials for account {name!r} (see X_ACCOUNTS)")
+        with metrics.span("phase.clients", account=name):
+            client, api = make_clients(keys)
+        return Account(name, client, api, make_limiter(wait), MediaStager(api, media, limiter=make_upload_limiter(wait)))
+    return AccountPool(factory)
+
+def publish(client, stager, post, reply_to=None, limiter=None):
+    """Posts one tweet (with its image, if any). Returns the new tweet id."""
+    # Normally already uploaded by the stager; otherwise this waits for the upload
+    media_ids = stager.media_ids(post)
+
+    # in_reply_to_tweet_id=None posts a normal tweet
+    resp = call_limited(limiter, client.create_tweet, text=post['text'], media_ids=media_ids, in_reply_to_tweet_id=reply_to)
+    tweet_id = resp.data['id']
+    lag = time.time() - to_epoch(post["schedule_time"])
+    metrics.incr("posts_published")
+    metrics.observe("publish_lag_seconds", lag)
+    metrics.event("published", post_id=post["id"], tweet_id=tweet_id, account=post.get("account"), lag_s=round(lag, 1))
+    return tweet_id
+
+def post_group(client, stager, group, limiter, reply_to=None, on_posted=None):
+    """Posts a single or a thread's parts strictly in order, each replying to the one before.
+
+    Parts that went out in an earlier run (see `delivery`) are skipped and the next part replies
+    to the last of them. Stops at the first failure. `on_posted(part, tweet_id)` is called as
+    each part goes out. Returns ([(post_id, tweet_id), ...] posted now, error or None).
+    """
+    posted = []
+    try:
+        for part in group["items"]:
+            if delivery.is_posted(part):
+                reply_to = delivery.tweet_id(part)
+                continue
+            print(f"   -> Posting: {part['text'][:20]}...")
+            reply_to = publish(client, stager, part, reply_to=reply_to, limiter=limiter)
+            posted.append((part["id"], reply_to))
+            if on_posted: on_posted(part, reply_to)
+    except Exception as e:
+        return posted, e
+    return posted, None
+
+def post_for(accounts, group, reply_to=None, recorder=None):
+    """`post_group` on the clients of the group's account. An account without credentials fails the group.
+
+    With a `recorder`, each thread part's tweet id is saved as soon as it is out, so a run that
+    dies mid-thread doesn't post the thread again from the start.
+    """
+    try:
+        account = accounts.get(group_account(group))
+    except UnknownAccount as e:
+        return [], e
+
+    def save(part, tweet_id):
+        if part is group["items"][-1]: return  # the group's own checkpoint follows right away
+        recorder.record({part["id"]: {"delivery": delivery.posted(part, tweet_id)}})
+        recorder.flush()
+
+    return post_group(account.client, account.stager, group, account.limiter, reply_to=reply_to,
+                      on_posted=save if recorder and group["thread_id"] else None)
+
+def checkpoint(group, posted, error, stager):
+    """Delivery state to save after a group ran, as `{post_id: {"delivery": ...}}`.
+
+    Parts that went out get their tweet id; the part that failed gets one more attempt, its
+    next retry time and its uploaded media id, and the parts after it keep their uploads too,
+    so the retry neither reposts nor re-uploads. `stager` is anything with `staged(post)`: a
+    MediaStager or the AccountPool.
+    """
+    parts = {p["id"]: p for p in group["items"]}
+    changes = {post_id: {"delivery": delivery.posted(parts[post_id], tweet_id)} for post_id, tweet_id in posted}
+    if error:
+        done = {post_id for post_id, _ in posted}
+        failed = next((p for p in delivery.pending(group) if p["id"] not in done), None)
+        if failed:
+            # A 429 comes back as RateLimited: don't retry before X's window resets
+            changes[failed["id"]] = {"delivery": delivery.failed(failed, error, stager.staged(failed), not_before=getattr(error, "reset", None))}
+            metrics.incr("post_retries_scheduled")
+        for part in delivery.pending(group):
+            media = stager.staged(part)
+            if part["id"] in done or part["id"] in changes or not media or media == delivery.staged_media(part): continue
+            changes[part["id"]] = {"delivery": delivery.with_media(part, media)}
+    return changes
+
+class Recorder:
+    """Saves delivery outcomes as each group finishes instead of once at the end of a run.
+
+    Workers `record` a group's checkpoint plus, once it is complete, its ids, and `flush` straight
+    away, so a crash later in the run can't lose tweet ids that are already out. Whoever holds
+    the write lock saves everything queued so far, so groups finishing together share one
+    `mark_posted` and one `update`. Finished posts are removed first; if that fails their tweet
+    ids go out with the `update` instead, so the next run knows they're posted. A failed write
+    is reported and stays queued for the next flush.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.changes, self.done = {}, set()
+        self.updated, self.cleaned = 0, 0  # posts saved so far
+        self._queued = threading.Lock()
+        self._writing = threading.Lock()
+
+    def record(self, changes=None, done=()):
+        with self._queued:
+            self.changes.update(changes or {})
+            self.done.update(done)
+
+    def _requeue(self, changes=None, done=()):
+        # Anything recorded since the failed write is newer and wins
+        with self._queued:
+            self.changes = {**(changes or {}), **self.changes}
+            self.done.update(done)
+
+    def flush(self):
+        """Writes what is queued. Returns False if something is still unsaved."""
+        with self._writing:
+            with self._queued:
+                changes, self.changes = self.changes, {}
+                done, self.done = self.done, set()
+            ok = True
+            if done:
+                try:
+                    with metrics.span("phase.writeback", posts=len(done)):
+                        self.store.mark_posted(done)
+                    self.cleaned += len(done)
+                    changes = {i: c for i, c in changes.items() if i not in done}
+                except Exception as e:
+                    ok = False
+                    metrics.incr("checkpoint_failures")
+                    print(f"⚠️ Couldn't remove {len(done)} posted posts from the queue (will retry): {e}")
+                    self._requeue(done=done)
+            if changes:
+                try:
+                    with metrics.span("phase.checkpoint", posts=len(changes)):
+                        self.store.update(changes)
+                    self.updated += len(changes)
+                except Exception as e:
+                    ok = False
+                    metrics.incr("checkpoint_failures")
+                    print(f"⚠️ Couldn't save delivery state for {len(changes)} posts (will retry): {e}")
+                    self._requeue(changes=changes)
+            return ok
+
+# --- MAIN LOGIC ---
+def main():
+    """Single pass for cron: post everything due, clean the queue, exit. Timings go to `metrics`."""
+    try:
+        with metrics.span("run"):
+            post_due()
+    finally:
+        metrics.flush()
 
+def post_due():
+    print("--- Checking Schedule ---")
     now = datetime.now(timezone.utc)
-    processed_indices = set()
-    
-    # Sort by time so threads are ordered (1/, 2/, 3/)
-    posts.sort(key=lambda x: x['schedule_time'])
-
-    for i, post in enumerate(posts):
-        if i in processed_indices: continue
-
-        scheduled = datetime.fromisoformat(post['schedule_time'])
-        
-        # IF POST IS DUE
-        if scheduled <= now:
-            try:
-                # CHECK: Is this part of a Thread?
-                thread_id = post.get("thread_id")
-                
-                if thread_id:
-                    print(f"🧵 Found Thread Chain: {thread_id}")
-                    # Find all parts of this thread
-                    thread_parts = [p for p in posts if p.get("thread_id") == thread_id]
-                    
-                    last_tweet_id = None
-                    
-                    # POST LOOP
-                    for part in thread_parts:
-                        print(f"   -> Posting Part: {part['text'][:20]}...")
-                        
-                        # A. Handle Image
-                        media_ids = None
-                        if part.get("image_data"):
-                            print("      Creating Image...")
-                            media_id = upload_image(api, part["image_data"])
-                            if media_id: media_ids = [media_id]
-
-                        # B. Post Tweet
-                        if last_tweet_id:
-                            # REPLY to previous
-                            resp = client.create_tweet(
-                                text=part['text'], 
-                                media_ids=media_ids,
-                                in_reply_to_tweet_id=last_tweet_id
-                            )
-                        else:
-                            # FIRST TWEET
-                            resp = client.create_tweet(
-                                text=part['text'],
-                                media_ids=media_ids
-                            )
-                        
-                        # Save ID for next loop
-                        last_tweet_id = resp.data['id']
-                        
-                        # Mark as done
-                        processed_indices.add(posts.index(part))
-                        time.sleep(2) # Safety pause
-                        
-                    print("✅ Thread Posted Successfully!")
-                    
-                else:
-                    # SINGLE POST LOGIC
-                    print(f"🚀 Posting Single: {post['text'][:20]}...")
-                    
-                    # Handle Image
-                    media_ids = None
-                    if post.get("image_data"):
-                        print("      Creating Image...")
-                        media_id = upload_image(api, post["image_data"])
-                        if media_id: media_ids = [media_id]
-                    
-                    client.create_tweet(text=post['text'], media_ids=media_ids)
-                    processed_indices.add(i)
 
+    # Only due posts (and the rest of any due thread) come back from the store
+    with metrics.span("phase.fetch"):
+        store = get_store()
+        posts = store.due(now)
+    metrics.gauge("queue_size", store.size())
+    metrics.gauge("due_posts", len(posts))
+
+    recorder = Recorder(store)
+    # A 429 fails the account's remaining groups until X's reset rather than sleeping past the next tick
+    accounts = make_accounts(get_media_store(), wait=False)
+    if posts: publish_due(posts, now, accounts, recorder)
+    else: print("💤 No posts due.")
+    try:
+        stage_ahead(store, accounts, recorder, now)
+    except Exception as e:
+        print(f"⚠️ Couldn't pre-upload images for the next run (they upload when posted): {e}")
+    accounts.shutdown()
+
+    # Whatever couldn't be written while posting gets one more try
+    if not recorder.flush():
+        print("⚠️ Some delivery state is unsaved; the affected posts may go out again on the next run.")
+    if recorder.updated: print(f"💾 Saved delivery state for {recorder.updated} posts.")
+    if recorder.cleaned: print("📝 Queue Cleaned.")
+
+def publish_due(posts, now, accounts, recorder):
+    """Posts the due `posts`, saving each group's outcome through `recorder` as soon as it finishes."""
+    # One pass groups the due posts into singles and threads (parts ordered 1/, 2/, 3/).
+    # Anything that failed before waits out its backoff, then resumes from the part that failed.
+    processed_ids = set()
+    groups = []
+    for group in QueueIndex(posts).due_groups(int(now.timestamp())):
+        pending = delivery.pending(group)
+        if not pending: processed_ids.update(p["id"] for p in group["items"])  # finished, but never cleaned up
+        elif delivery.retry_at(pending[0]) <= now.timestamp(): groups.append(group)
+    if not groups and not processed_ids:
+        print("⏳ Everything due is waiting for a retry.")
+        return
+    recorder.record(done=processed_ids)
+
+    # Every due image starts uploading now (unless an earlier run did), in parallel, straight from memory
+    accounts.stage([p for g in groups for p in delivery.pending(g)])
+
+    # Accounts post side by side, each with its own workers and token bucket, so one
+    # throttled account doesn't hold up the rest. Each group's outcome is saved as soon as
+    # it finishes: tweet ids of unfinished threads, retry state of failures, finished posts out.
+    def worker(group):
+        posted, error = post_for(accounts, group, recorder=recorder)
+        done = [] if error else [p["id"] for p in group["items"]]
+        recorder.record(checkpoint(group, posted, error, accounts), done)
+        recorder.flush()
+        return posted, error
+
+    with metrics.span("phase.post", groups=len(groups)):
+        results = dispatch_by(groups, group_account, worker, max_workers=POST_WORKERS)
+    for group, (posted, error) in results:
+        label = f"🧵 Thread {group['thread_id']}" if group["thread_id"] else "🚀 Single"
+        if group_account(group) != DEFAULT_ACCOUNT: label += f" @{group_account(group)}"
+        if error:
+            metrics.incr("groups_failed")
+            print(f"❌ Error ({label}, {len(posted)} more posted, {len(delivery.pending(group)) - len(posted)} left): {error}")
+        else:
+            print(f"✅ {label} posted ({len(posted)} tweets)")
+
+def stage_ahead(store, accounts, recorder, now):
+    """Uploads images of posts due within STAGE_AHEAD seconds and saves their media ids in their delivery state.
+
+    The run that posts them only attaches the ids, so an upload is never on the posting path.
+    Uploads an earlier run saved are kept while they're fresh (see MediaStager.stage).
+    """
+    start = now.timestamp()
+    upcoming = [p for p in store.load(start, start + STAGE_AHEAD)
+                if has_image(p) and not delivery.is_posted(p) and to_epoch(p["schedule_time"]) > start]
+    if not upcoming: return
+    with metrics.span("phase.stage", posts=len(upcoming)):
+        accounts.stage(upcoming)
+        accounts.wait(upcoming)
+    changes = {}
+    for p in upcoming:
+        media = accounts.staged(p)
+        if media and media != delivery.staged_media(p): changes[p["id"]] = {"delivery": delivery.with_media(p, media)}
+    if changes:
+        recorder.record(changes)
+        print(f"🖼️ Pre-uploaded {len(changes)} images for the next run.")
+
+# --- DAEMON MODE ---
+class Daemon:
+    """Long-running scheduler: clients, store and queue stay in memory between posts.
+
+    Every queued post sits on a min-heap keyed by its schedule time, so the loop sleeps
+    exactly until the next post is due. Thread parts fire at their own times (1 minute
+    apart) and reply to the part before them.
+    """
+
+    def __init__(self, poll_interval=60, retry_delay=60):
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.store = get_store()
+        # A 429 fails fast: `fire` holds the account's posts back until X's reset while the other accounts keep posting
+        self.accounts = make_accounts(get_media_store(), wait=False)
+        self.recorder = Recorder(self.store)  # writes that failed are retried on the next fire
+        self.posts = {}         # id -> post, the in-memory queue
+        self.heap = []          # (due_ts, seq, post_id); stale entries are skipped when popped
+        self.thread_tails = {}  # thread_id -> id of the last tweet posted for that thread
+        self.seq = 0
+        self.next_refresh = 0
+        self.reload_at = 0      # the lookahead window is re-read at least this often
+
+    def push(self, ts, post_id):
+        self.seq += 1
+        heapq.heappush(self.heap, (ts, self.seq, post_id))
+
+    def refresh(self):
+        """Diffs the next LOOKAHEAD seconds of the queue against memory: new or rescheduled posts go on the heap, deleted ones drop out."""
+        now = time.time()
+        self.next_refresh = now + self.poll_interval
+        self.recorder.flush()  # anything a failed write left behind, before reading the queue back
+        if not self.store.changed() and now < self.reload_at: return
+        self.reload_at = now + LOOKAHEAD / 2
+
+        fresh = {}
+        with metrics.span("phase.fetch"):
+            records = QueueIndex(self.store.load(end=now + LOOKAHEAD)).records
+        for r in records:
+            fresh[r.id] = r.post
+            if delivery.is_posted(r.post):
+                # Part of an unfinished thread that already went out: the next part replies to it
+                if r.thread_id: self.thread_tails[r.thread_id] = delivery.tweet_id(r.post)
+                continue
+            old = self.posts.get(r.id)
+            if old is None or old["schedule_time"] != r.post["schedule_time"]:
+                self.push(max(r.ts, delivery.retry_at(r.post)), r.id)
+        added, dropped = fresh.keys() - self.posts.keys(), self.posts.keys() - fresh.keys()
+        metrics.gauge("queue_size", self.store.size())
+        if added or dropped: print(f"🔄 Queue synced: +{len(added)} / -{len(dropped)} ({len(fresh)} in the next {LOOKAHEAD // 3600}h)")
+        self.posts = fresh
+
+    def stage_upcoming(self):
+        """Pre-uploads images for posts due within STAGE_AHEAD seconds."""
+        horizon = time.time() + STAGE_AHEAD
+        self.accounts.stage([p for p in self.posts.values() if to_epoch(p["schedule_time"]) <= horizon and not delivery.is_posted(p)])
+
+    def thread_predecessor(self, post, batch_ids=()):
+        """The still-queued part (outside this batch) that must go out before `post`, if any."""
+        earlier = [p for p in self.posts.values()
+                   if p.get("thread_id") == post["thread_id"] and p["schedule_time"] < post["schedule_time"]
+                   and p["id"] not in batch_ids and not delivery.is_posted(p)]
+        return min(earlier, key=lambda p: p["schedule_time"]) if earlier else None
+
+    def fire(self, due):
+        """Posts a batch of due posts: independent singles/threads concurrently, parts of a thread in order."""
+        batch_ids = {p["id"] for p in due}
+        ready = []
+        for post in due:
+            paused = self.accounts.paused_until(account_of(post))
+            if paused > time.time():
+                # The account is rate limited; come back when X says its window resets, the others carry on
+                self.push(paused, post["id"])
+            elif post.get("thread_id") and self.thread_predecessor(post, batch_ids):
+                # An earlier part is still waiting (e.g. it failed); keep the thread in order
+                self.push(time.time() + self.retry_delay, post["id"])
+            else:
+                ready.append(post)
+
+        def worker(group):
+            return post_for(self.accounts, group, reply_to=self.thread_tails.get(group["thread_id"]), recorder=self.recorder)
+
+        changes, done = {}, []
+        with metrics.span("phase.post", posts=len(ready)):
+            results = dispatch_by(QueueIndex(ready).groups(), group_account, worker, max_workers=POST_WORKERS)
+        for group, (posted, error) in results:
+            group_changes = checkpoint(group, posted, error, self.accounts)
+            for post_id, fields in group_changes.items():
+                self.posts[post_id] = {**self.posts[post_id], **fields}
+            changes.update(group_changes)
+            thread_id = group["thread_id"]
+            if posted and thread_id: self.thread_tails[thread_id] = posted[-1][1]
+            if error:
+                metrics.incr("groups_failed")
+                print(f"❌ Error: {error}")
+                retry = delivery.retry_at(self.posts[group["items"][len(posted)]["id"]])
+                for part in group["items"][len(posted):]:
+                    self.push(retry, part["id"])
+            # A single, or a thread whose every part is out, leaves the queue; an unfinished thread keeps its tweet ids there
+            members = [p for p in self.posts.values() if p.get("thread_id") == thread_id] if thread_id else [self.posts[i] for i, _ in posted]
+            if members and all(delivery.is_posted(p) for p in members):
+                done += [p["id"] for p in members]
+                self.thread_tails.pop(thread_id, None)
+        self.recorder.record(changes, done)
+        self.recorder.flush()
+        for post_id in done: del self.posts[post_id]
+        metrics.flush("fire")
+
+    def run_once(self):
+        """Fires everything due, then returns how long it is safe to sleep."""
+        if time.time() >= self.next_refresh:
+            self.refresh()
+            self.stage_upcoming()
+        due = {}
+        while self.heap and self.heap[0][0] <= time.time():
+            ts, _, post_id = heapq.heappop(self.heap)
+            post = self.posts.get(post_id)
+            # Skip entries for posts deleted, rescheduled or already posted since they were pushed
+            if post is None or ts < to_epoch(post["schedule_time"]) or delivery.is_posted(post): continue
+            due[post_id] = post
+        if due: self.fire(list(due.values()))
+        wake = self.next_refresh if not self.heap else min(self.heap[0][0], self.next_refresh)
+        return max(0.0, wake - time.time())
+
+    def recover(self):
+        """After a failed pass: rebuild the heap from the posts in memory and re-read the queue on the next one.
+
+        Posts popped for a `fire` that broke off would otherwise never come back; the in-memory
+        copies keep tweet ids a failed write didn't get into the store yet.
+        """
+        self.heap = []
+        for post in self.posts.values():
+            if not delivery.is_posted(post): self.push(max(to_epoch(post["schedule_time"]), delivery.retry_at(post)), post["id"])
+        self.next_refresh = self.reload_at = 0
+
+    def run(self):
+        """Loops until interrupted. A failed pass (GitHub down, a dropped connection) is logged and retried after `poll_interval`."""
+        print(f"--- Scheduler daemon started (sync every {self.poll_interval}s) ---")
+        while True:
+            try:
+                delay = self.run_once()
             except Exception as e:
-                print(f"❌ Error: {e}")
-    
-    # Update GitHub File (Delete processed posts)
-    final_queue = [p for i, p in enumerate(posts) if i not in processed_indices]
-
-    if len(final_queue) < len(posts):
-        update_file(final_queue, sha)
-        print("📝 Queue Cleaned.")
-    else:
-        print("💤 No posts due.")
+                metrics.incr("daemon_errors")
+                print(f"⚠️ Scheduler pass failed, retrying in {self.poll_interval}s: {e!r}")
+                self.recover()
+                delay = self.poll_interval
+            time.sleep(delay)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Posts scheduled tweets from the queue.")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and post each tweet at its exact time")
+    parser.add_argument("--poll-interval", type=int, default=60, help="Seconds between queue syncs in daemon mode")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.daemon:
+        try:
+            Daemon(poll_interval=args.poll_interval).run()
+        except KeyboardInterrupt:
+            print("👋 Scheduler daemon stopped.")
+    else:
+        main()
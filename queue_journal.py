@@ -0,0 +1,60 @@
+import time
+import uuid
+
+# --- CONFIGURATION ---
+JOURNAL_DIR = "queue_journal"
+COMPACT_EVERY = 20  # fold the journal into the snapshot once this many ops pile up
+
+# Op records are tiny JSON documents, one per change:
+#   {"op": "schedule",    "posts": [...]}   new posts (replaces any post with the same id)
+#   {"op": "delete",      "ids": [...]}     removed from the UI
+#   {"op": "mark_posted", "ids": [...]}     published by the scheduler
+#   {"op": "update",      "changes": {id: {...}}}  fields merged into queued posts (delivery checkpoints)
+REMOVING_OPS = ("delete", "mark_posted")
+
+
+def schedule_op(posts):
+    return {"op": "schedule", "posts": posts, "at": time.time()}
+
+
+def delete_op(post_ids):
+    return {"op": "delete", "ids": list(post_ids), "at": time.time()}
+
+
+def mark_posted_op(post_ids):
+    return {"op": "mark_posted", "ids": list(post_ids), "at": time.time()}
+
+
+def update_op(changes):
+    return {"op": "update", "changes": changes, "at": time.time()}
+
+
+def op_name(after=None):
+    """Unique, time-ordered file name for a new op. Writers never touch each other's files.
+
+    `after` is the newest op name the writer has read: the new op sorts after it even when this
+    machine's clock is behind, so a delete always replays after the schedule it saw.
+    """
+    ms = int(time.time() * 1000)
+    if after: ms = max(ms, int(after.split("-", 1)[0]) + 1)
+    return f"{ms:013d}-{uuid.uuid4().hex[:8]}.json"
+
+
+def replay(snapshot, ops):
+    """Applies `ops` in journal order on top of `snapshot` and returns the queue sorted by time.
+
+    A removal only drops what was scheduled before it, so a post scheduled again after a delete
+    is back in the queue. Writers name their ops after the newest one they read (`op_name`), so
+    a delete can't sort before the schedule it removes.
+    """
+    posts = {p["id"]: p for p in snapshot}
+    for op in ops:
+        if op["op"] == "schedule":
+            for p in op["posts"]: posts[p["id"]] = p
+        elif op["op"] in REMOVING_OPS:
+            for post_id in op["ids"]: posts.pop(post_id, None)
+        elif op["op"] == "update":
+            # Updates land on whatever the post looked like at that point
+            for post_id, fields in op["changes"].items():
+                if post_id in posts: posts[post_id] = {**posts[post_id], **fields}
+    return sorted(posts.values(), key=lambda x: x["schedule_time"])
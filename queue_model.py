@@ -0,0 +1,61 @@
+from array import array
+from bisect import bisect_right
+from operator import attrgetter
+from datetime import datetime
+
+
+def to_epoch(iso_string):
+    """ISO timestamp (as stored in `schedule_time`) -> epoch seconds."""
+    return int(datetime.fromisoformat(iso_string).timestamp())
+
+
+class PostRecord:
+    """One queued post, parsed once. `ts` is the schedule time in epoch seconds; `post` is the raw dict."""
+
+    __slots__ = ("id", "ts", "thread_id", "post")
+
+    def __init__(self, post):
+        self.id = post.get("id")
+        self.ts = to_epoch(post["schedule_time"])
+        self.thread_id = post.get("thread_id")
+        self.post = post
+
+
+class QueueIndex:
+    """Time-sorted view of the queue, built in a single pass.
+
+    - `times` is an array of epoch seconds parallel to `records`, so due posts are a bisect away.
+    - `threads` maps thread_id -> parts in posting order.
+    """
+
+    def __init__(self, posts):
+        self.records = sorted((PostRecord(p) for p in posts), key=attrgetter("ts"))
+        self.times = array("q", (r.ts for r in self.records))
+        self.threads = {}
+        for r in self.records:
+            if r.thread_id: self.threads.setdefault(r.thread_id, []).append(r)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _group(self, r):
+        if r.thread_id:
+            return {"type": "thread", "thread_id": r.thread_id, "start": r.ts, "items": [x.post for x in self.threads[r.thread_id]]}
+        return {"type": "single", "thread_id": None, "start": r.ts, "items": [r.post]}
+
+    def groups(self, records=None):
+        """Singles and whole threads, ordered by their first part's time."""
+        out, seen = [], set()
+        for r in self.records if records is None else records:
+            if r.thread_id:
+                if r.thread_id in seen: continue
+                seen.add(r.thread_id)
+            out.append(self._group(r))
+        return out
+
+    def due_groups(self, now_ts):
+        """Groups whose first part is due at `now_ts`. A due thread comes back with all its parts."""
+        return self.groups(self.records[:bisect_right(self.times, now_ts)])
+
+    def due_posts(self, now_ts):
+        return [p for g in self.due_groups(now_ts) for p in g["items"]]
@@ -0,0 +1,43 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from queue_model import QueueIndex
+
+# --- CONFIGURATION ---
+SHARD_DIR = "queue"
+MANIFEST = "manifest.json"
+
+# The queue is split into one file per UTC day, `queue/YYYY-MM-DD.json`. A shard holds the singles
+# and whole threads whose first part is scheduled that day, so a thread never straddles two shards.
+# `queue/manifest.json` lists the shards and a hash of each, so readers know what changed:
+#   {"version": 1, "shards": {"2026-10-17": {"count": 12, "sha": "<sha1 of the shard file>"}}}
+
+
+def empty_manifest():
+    return {"version": 1, "shards": {}}
+
+
+def day_of(ts):
+    """Epoch seconds -> the UTC day ("YYYY-MM-DD") naming its shard."""
+    return datetime.fromtimestamp(ts, timezone.utc).date().isoformat()
+
+
+def shard_path(day, shard_dir=SHARD_DIR):
+    return f"{shard_dir}/{day}.json"
+
+
+def encode(posts):
+    return json.dumps(posts, separators=(",", ":")).encode("utf-8")
+
+
+def digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def partition(posts):
+    """{day: posts}, each single or thread filed under the day of its first part, in time order."""
+    out = {}
+    for group in QueueIndex(posts).groups():
+        out.setdefault(day_of(group["start"]), []).extend(group["items"])
+    return out
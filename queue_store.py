@@ -0,0 +1,517 @@
+import base64
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+import metrics
+from github_client import ConflictError, get_client
+from media_store import GitHubMediaStore
+from queue_model import QueueIndex, to_epoch
+from queue_journal import JOURNAL_DIR, COMPACT_EVERY, schedule_op, delete_op, mark_posted_op, update_op, op_name, replay
+from queue_shards import SHARD_DIR, MANIFEST, empty_manifest, day_of, shard_path, encode, digest, partition
+
+# --- CONFIGURATION ---
+RAW = "application/vnd.github.raw"
+FILE_PATH = "scheduled_posts.json"
+DEFAULT_DB_PATH = "scheduled_posts.db"
+
+
+# --- POST HELPERS ---
+def new_id():
+    """Id for a post being created. Random, so the same text scheduled twice for the same time is two posts."""
+    return uuid.uuid4().hex
+
+
+def assign_id(post):
+    """Gives a new post a random `id` unless its creator already did."""
+    if not post.get("id"): post["id"] = new_id()
+    return post
+
+
+def ensure_id(post):
+    """Gives a legacy queue entry a stable `id`. Those never had one, so it is derived from the content (same on every read)."""
+    if not post.get("id"):
+        raw = json.dumps(post, sort_keys=True).encode("utf-8")
+        post["id"] = hashlib.sha1(raw).hexdigest()[:16]
+    return post
+
+
+def select_due(posts, now):
+    """Posts due at `now` plus every part of any thread whose first part is due, ordered by time."""
+    return QueueIndex(posts).due_posts(int(now.timestamp()))
+
+
+def select_window(posts, start=None, end=None):
+    """Singles and whole threads whose first part falls in [start, end) (epoch seconds, None = open), ordered by time."""
+    if start is None and end is None: return posts
+    picked = [p for g in QueueIndex(posts).groups()
+              if (start is None or g["start"] >= start) and (end is None or g["start"] < end) for p in g["items"]]
+    return sorted(picked, key=lambda x: x["schedule_time"])
+
+
+# --- STORE INTERFACE ---
+class QueueStore:
+    """Where the queue lives. post_scheduler.py and streamlit_app.py only talk to this."""
+
+    def load(self, start=None, end=None):
+        """Every queued post, sorted by `schedule_time`.
+
+        With `start`/`end` (epoch seconds) only singles and threads whose first part falls in
+        [start, end), so a view of a few days doesn't read the whole schedule.
+        """
+        raise NotImplementedError
+
+    def due(self, now):
+        """Posts due at `now` (an aware datetime), with all parts of due threads."""
+        raise NotImplementedError
+
+    def add(self, posts):
+        """Appends new posts to the queue."""
+        raise NotImplementedError
+
+    def remove(self, post_ids):
+        """Deletes posts by `id`."""
+        raise NotImplementedError
+
+    def mark_posted(self, post_ids):
+        """Drops posts the scheduler has published. Backends that keep history can record it separately."""
+        self.remove(post_ids)
+
+    def update(self, changes):
+        """Merges `{post_id: {field: value}}` into queued posts; used for the scheduler's delivery checkpoints."""
+        raise NotImplementedError
+
+    def changed(self):
+        """False when the queue is known to be unchanged since the last call. Backends that can't tell say True."""
+        return True
+
+    def size(self):
+        """Number of queued posts."""
+        return len(self.load())
+
+    def bulk_add(self, posts, images=(), media=None):
+        """Schedules a batch in one write: `images` ([(ref, bytes)]) go to `media`, then every post at once."""
+        for _, data in images: media.put(data)
+        self.add(posts)
+
+    def day_counts(self):
+        """{UTC day "YYYY-MM-DD": number of posts}, threads counted on the day of their first part."""
+        return {day: len(items) for day, items in partition(self.load()).items()}
+
+
+# --- GITHUB BACKEND ---
+class GitHubQueueStore(QueueStore):
+    """Queue in the repo as per-day shards (`queue/YYYY-MM-DD.json` + `queue/manifest.json`) plus an append-only journal.
+
+    Every change is written as its own small file under `queue_journal/`, so a write costs the
+    size of the change and two writers never fight over the same file. Once the journal grows
+    past COMPACT_EVERY ops it is folded into the shards it touches in a single Git Data API
+    commit; if the branch moved meanwhile we re-read, replay and try again.
+
+    Reads fetch only the shards they need (the scheduler: today and earlier), and a shard is
+    downloaded again only when its hash in the manifest changes, so a tick costs the same however
+    far ahead the schedule goes. A queue still in the old single `scheduled_posts.json` is read
+    whole and split into shards by the first compaction.
+
+    All HTTP goes through the shared GitHubClient, and the decoded queue is kept in memory
+    per head commit, so a rerun with nothing new costs one 304 on the branch ref.
+    """
+
+    def __init__(self, token, owner, repo, path=FILE_PATH, message="Update schedule", branch=None,
+                 journal_dir=JOURNAL_DIR, shard_dir=SHARD_DIR, compact_every=COMPACT_EVERY, retries=5):
+        self.client = get_client(token, owner, repo)
+        self.path = path
+        self.message = message
+        self.journal_dir = journal_dir
+        self.shard_dir = shard_dir
+        self.compact_every = compact_every
+        self.retries = retries
+        self._branch = branch
+        self._head = None       # commit sha the last read came from
+        self._op_count = 0      # journal length at the last read
+        self._op_cache = {}     # op file name -> op; op files are immutable
+        self._listing = None    # (head, [(op file name, op), ...]) of the last journal read
+        self._manifest = None   # (head, manifest, legacy posts) of the last manifest read
+        self._last_op = None    # newest op file name read or written, so our next op sorts after it
+        self._shards = {}       # day -> (sha, posts) of every shard read so far
+        self._where = {}        # post id / thread id -> day of its shard, for everything read or written so far
+        self._counts = None     # (head, exact, {day: number of posts}) as of the last read
+        self._queue = None      # ((head, first day, last day), decoded posts) from the last read
+        self._lock = threading.Lock()
+
+    # --- HTTP ---
+    @property
+    def branch(self):
+        if self._branch is None:
+            self._branch = self.client.get_json("")["default_branch"]
+        return self._branch
+
+    def _head_sha(self):
+        return self.client.get_json(f"/git/ref/heads/{self.branch}")["object"]["sha"]
+
+    def _raw(self, path, ref):
+        """File bytes at `ref` (raw media type: no base64 envelope, no 1 MB limit), or None."""
+        status, body = self.client.get(f"/contents/{path}", params={"ref": ref}, accept=RAW, ok=(200, 404))
+        return body if status == 200 else None
+
+    # --- READ ---
+    def _manifest_at(self, head):
+        """(manifest, None), or (None, every post) while the queue is still the legacy single file."""
+        # Reads pinned to a commit never change, and the client doesn't cache them: we do, per head
+        if self._manifest and self._manifest[0] == head: return self._manifest[1:]
+        data = self._raw(f"{self.shard_dir}/{MANIFEST}", head)
+        if data is not None:
+            manifest, legacy = json.loads(data), None
+        else:
+            content = (self._raw(self.path, head) or b"").decode("utf-8")
+            manifest, legacy = empty_manifest(), None
+            if content.strip():
+                with metrics.span("queue.decode", bytes=len(content)):
+                    manifest, legacy = None, [ensure_id(p) for p in json.loads(content)]
+        self._manifest = (head, manifest, legacy)
+        return manifest, legacy
+
+    def _shards_at(self, head, shards, days):
+        """Posts of the shards for `days`. A shard whose hash we have seen before isn't downloaded again."""
+        for day in self._shards.keys() - shards.keys(): del self._shards[day]  # folded away since we read it
+        posts = []
+        for day in sorted(days):
+            sha = shards[day]["sha"]
+            if self._shards.get(day, (None,))[0] != sha:
+                data = self._raw(shard_path(day, self.shard_dir), head) or b"[]"
+                with metrics.span("queue.decode", bytes=len(data), shard=day):
+                    self._shards[day] = (sha, json.loads(data))
+            posts += self._shards[day][1]
+        return posts
+
+    def _ops_at(self, head):
+        """[(op file name, op), ...] in journal order as of commit `head`."""
+        if self._listing and self._listing[0] == head: return list(self._listing[1])
+        ops = []
+        listing = self.client.get_json(f"/contents/{self.journal_dir}", params={"ref": head}) or []
+        for entry in sorted(listing, key=lambda e: e["name"]):
+            name = entry["name"]
+            if name not in self._op_cache:
+                self._op_cache[name] = json.loads(self._raw(f"{self.journal_dir}/{name}", head))
+            ops.append((name, self._op_cache[name]))
+        if ops and ops[-1][0] > (self._last_op or ""): self._last_op = ops[-1][0]
+        self._listing = (head, ops)
+        return list(ops)
+
+    def _remember(self, parts):
+        for day, items in parts.items():
+            for p in items:
+                self._where[p["id"]] = day
+                if p.get("thread_id"): self._where[p["thread_id"]] = day
+
+    @staticmethod
+    def _touched(shards, hints):
+        """Shards the ops with these `shards` hints change: all of them if one op has no hint."""
+        return set(shards) if None in hints else set().union(*hints) & set(shards)
+
+    def _fetch(self, first=None, last=None, counted=False):
+        """Queued posts filed under the UTC days `first`..`last` ("YYYY-MM-DD", None = open-ended).
+
+        Per-day counts come along: shards outside the range count as the manifest says, plus what
+        the journal adds to them. `counted` also reads the shards the journal touches, so its
+        deletes and moves show up in the counts too.
+        """
+        in_range = lambda day: (first is None or day >= first) and (last is None or day <= last)
+        with self._lock:
+            self._head = self._head_sha()
+            key = (self._head, first, last)
+            if self._queue and self._queue[0] == key and not counted:
+                return list(self._queue[1])
+            manifest, legacy = self._manifest_at(self._head)
+            shards = manifest["shards"] if manifest else {}
+            ops = [op for _, op in self._ops_at(self._head)]
+            self._op_count = len(ops)
+            touched = self._touched(shards, [op.get("shards") for op in ops])
+            days = set(filter(in_range, shards)) | (touched if counted else set())
+            base = legacy if legacy is not None else self._shards_at(self._head, shards, days)
+            with metrics.span("queue.replay", ops=len(ops)):
+                parts = partition(replay(base, ops))
+            self._remember(parts)
+
+            # The journal can schedule posts on days we didn't read: they are counted, not returned
+            read = (lambda day: day in days) if legacy is None else (lambda day: True)
+            counts = {day: meta["count"] for day, meta in shards.items() if not read(day)}
+            for day, items in parts.items(): counts[day] = counts.get(day, 0) + len(items)
+            exact = legacy is not None or touched <= days
+            self._counts = (self._head, exact, {day: n for day, n in sorted(counts.items()) if n})
+            posts = sorted((p for day, items in parts.items() if in_range(day) for p in items), key=lambda x: x["schedule_time"])
+            self._queue = (key, posts)
+        # Readers (the scheduler every tick) keep the journal short
+        if self._op_count >= self.compact_every: self.compact()
+        return list(posts)
+
+    # --- WRITE ---
+    def _days(self, post_ids=(), posts=()):
+        """Shards an op touches, or None when one of `post_ids` was never read (compaction then reads them all)."""
+        days = set(partition(posts))
+        for p in posts:
+            for key in (p["id"], p.get("thread_id")):
+                if key in self._where: days.add(self._where[key])
+        for post_id in post_ids:
+            if post_id not in self._where: return None
+            days.add(self._where[post_id])
+        return sorted(days)
+
+    def _append(self, op, days):
+        """Adds one op file. Creating a new file can only clash with a concurrent commit, so just retry."""
+        op["shards"] = days
+        content = base64.b64encode(json.dumps(op, separators=(",", ":")).encode("utf-8")).decode("utf-8")
+        body = {"message": self.message, "content": content, "branch": self.branch}
+        self._queue = self._counts = None
+        for attempt in range(self.retries):
+            name = op_name(after=self._last_op)
+            try:
+                self.client.write("PUT", f"/contents/{self.journal_dir}/{name}", json=body)
+                self._last_op = name
+                break
+            except ConflictError:
+                if attempt == self.retries - 1: raise
+                metrics.incr("github_retries")
+                time.sleep(0.5 * 2 ** attempt)
+        self._op_count += 1
+        if self._op_count >= self.compact_every: self.compact()
+
+    def compact(self):
+        """Folds the journal into the shards it touched and deletes the folded op files, all in one commit."""
+        if not self._fold():
+            print("⚠️ Queue compaction gave up after repeated conflicts; the journal is intact and will be retried.")
+
+    def _fold(self, new_ops=(), blobs=None, message=None):
+        """One Git Data API commit: the journal plus `new_ops` folded into the shards, `blobs` ({path: blob sha}) added.
+
+        Only shards named by the ops are read and rewritten (all of them for ops without that hint,
+        and when splitting the legacy file); the manifest is rewritten with their new hashes.
+        Returns False if the branch kept moving under us.
+        """
+        for attempt in range(self.retries):
+            head = self._head_sha()
+            manifest, legacy = self._manifest_at(head)
+            ops = self._ops_at(head)
+            if not ops and not new_ops and legacy is None: return True
+            shards = manifest["shards"] if manifest else {}
+            days = self._touched(shards, [op.get("shards") for _, op in ops] + [op.get("shards") for op in new_ops])
+            while True:
+                all_ops = [op for _, op in ops] + list(new_ops)
+                parts = partition(replay((legacy or []) + self._shards_at(head, shards, days), all_ops))
+                unread = (parts.keys() & shards.keys()) - days
+                if not unread: break
+                days |= unread  # a post moved into a shard we haven't read; read it so it isn't overwritten
+
+            new_shards, tree, written = dict(shards), [], {}
+            for day in sorted(days | parts.keys()):
+                path = shard_path(day, self.shard_dir)
+                if parts.get(day):
+                    data = encode(parts[day])
+                    new_shards[day] = {"count": len(parts[day]), "sha": digest(data)}
+                    written[day] = (new_shards[day]["sha"], parts[day])
+                    if shards.get(day, {}).get("sha") != new_shards[day]["sha"]:
+                        tree.append({"path": path, "mode": "100644", "type": "blob", "content": data.decode("utf-8")})
+                elif day in shards:
+                    del new_shards[day]
+                    tree.append({"path": path, "mode": "100644", "type": "blob", "sha": None})
+            manifest = {**empty_manifest(), "shards": dict(sorted(new_shards.items()))}
+            tree.append({"path": f"{self.shard_dir}/{MANIFEST}", "mode": "100644", "type": "blob", "content": json.dumps(manifest, indent=1)})
+            if legacy is not None: tree.append({"path": self.path, "mode": "100644", "type": "blob", "sha": None})
+            tree += [{"path": f"{self.journal_dir}/{name}", "mode": "100644", "type": "blob", "sha": None} for name, _ in ops]
+            tree += [{"path": path, "mode": "100644", "type": "blob", "sha": sha} for path, sha in (blobs or {}).items()]
+            try:
+                base_tree = self.client.get_json(f"/git/commits/{head}", cache=False)["tree"]["sha"]
+                new_tree = self.client.write("POST", "/git/trees", json={"base_tree": base_tree, "tree": tree})["sha"]
+                commit = self.client.write("POST", "/git/commits", json={
+                    "message": message or f"Compact queue journal ({len(ops)} ops, {len(days | parts.keys())} shards)", "tree": new_tree, "parents": [head]
+                })["sha"]
+                # Not a force push: fails with 422 if anyone committed since `head`, and we rebase
+                self.client.write("PATCH", f"/git/refs/heads/{self.branch}", json={"sha": commit, "force": False})
+            except ConflictError:
+                metrics.incr("github_retries")
+                time.sleep(0.5 * 2 ** attempt)
+                continue
+            for name, _ in ops: self._op_cache.pop(name, None)
+            self._shards.update(written)  # what we just wrote needn't be downloaded again
+            self._remember(parts)
+            self._op_count = 0
+            self._queue = self._counts = None
+            return True
+        return False
+
+    # --- QUEUE STORE API ---
+    def load(self, start=None, end=None):
+        first = None if start is None else day_of(start)
+        last = None if end is None else day_of(end)
+        return select_window(self._fetch(first, last), start, end)
+
+    def due(self, now):
+        # Today's shard and the overdue ones; everything later isn't touched
+        return select_due(self._fetch(last=day_of(now.timestamp())), now)
+
+    def add(self, posts):
+        posts = [assign_id(p) for p in posts]
+        days = self._days(posts=posts)
+        self._append(schedule_op(posts), days)
+        self._remember(partition(posts))
+
+    def remove(self, post_ids):
+        if post_ids: self._append(delete_op(post_ids), self._days(post_ids))
+
+    def mark_posted(self, post_ids):
+        if post_ids: self._append(mark_posted_op(post_ids), self._days(post_ids))
+
+    def update(self, changes):
+        if changes: self._append(update_op(changes), self._days(changes))
+
+    def bulk_add(self, posts, images=(), media=None):
+        """Posts, their images (when `media` lives in this repo) and a journal fold, all in a single commit."""
+        posts = [assign_id(p) for p in posts]
+        op = schedule_op(posts)
+        op["shards"] = self._days(posts=posts)
+        if not (isinstance(media, GitHubMediaStore) and media.client is self.client):
+            for _, data in images: media.put(data)
+            images = ()
+        # Images go up as blobs first (content-addressed, so a retry reuses them); the tree just points at them
+        blobs = {}
+        for ref, data in images:
+            path = media.path_of(ref)
+            if path not in blobs:
+                blobs[path] = self.client.write("POST", "/git/blobs", json={"content": base64.b64encode(data).decode("utf-8"), "encoding": "base64"})["sha"]
+        threads = len({p["thread_id"] for p in posts if p.get("thread_id")})
+        if not self._fold([op], blobs, message=f"Import {len(posts)} posts ({threads} threads, {len(blobs)} images)"):
+            raise RuntimeError("Bulk import kept conflicting with other writes; nothing was scheduled.")
+
+    def day_counts(self):
+        # The manifest, plus the shards that journal ops not yet folded in touch (today's as well, for the scheduler)
+        if self._counts is None or self.changed() or not self._counts[1]:
+            today = day_of(time.time())
+            self._fetch(today, today, counted=True)
+            if self._counts is None: self._fetch(today, today, counted=True)  # that read compacted the journal
+        return dict(self._counts[2])
+
+    def size(self):
+        return sum(self.day_counts().values())
+
+    def changed(self):
+        # A ref lookup is far cheaper than re-reading the queue
+        return self._head is None or self._head_sha() != self._head
+
+
+# --- SQLITE BACKEND ---
+class SQLiteQueueStore(QueueStore):
+    """Local queue with indexes on `schedule_time` (epoch seconds) and `thread_id`.
+
+    "What is due now" becomes an index range scan, so a tick costs the same however long the queue is.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS posts (
+        id TEXT PRIMARY KEY,
+        schedule_time INTEGER NOT NULL,
+        thread_id TEXT,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_posts_schedule_time ON posts (schedule_time);
+    CREATE INDEX IF NOT EXISTS idx_posts_thread_id ON posts (thread_id);
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        # Streamlit reruns scripts on worker threads, so one connection is shared behind a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        self._data_version = None
+
+    def _rows(self, sql, params=()):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def load(self, start=None, end=None):
+        if start is None and end is None:
+            return self._rows("SELECT data FROM posts ORDER BY schedule_time, rowid")
+        # Parts of threads that start in the window come along, even when they spill past its end
+        return select_window(self._rows(
+            """
+            SELECT data FROM posts
+            WHERE schedule_time >= ? AND schedule_time < ?
+               OR thread_id IN (SELECT DISTINCT thread_id FROM posts
+                                WHERE schedule_time >= ? AND schedule_time < ? AND thread_id IS NOT NULL)
+            ORDER BY schedule_time, rowid
+            """,
+            (start or 0, end or 2 ** 62, start or 0, end or 2 ** 62),
+        ), start, end)
+
+    def due(self, now):
+        now_ts = int(now.timestamp())
+        return self._rows(
+            """
+            SELECT data FROM posts
+            WHERE schedule_time <= ?
+               OR thread_id IN (SELECT DISTINCT thread_id FROM posts
+                                WHERE schedule_time <= ? AND thread_id IS NOT NULL)
+            ORDER BY schedule_time, rowid
+            """,
+            (now_ts, now_ts),
+        )
+
+    def add(self, posts):
+        rows = []
+        for p in posts:
+            assign_id(p)
+            rows.append((p["id"], to_epoch(p["schedule_time"]), p.get("thread_id"), json.dumps(p)))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO posts (id, schedule_time, thread_id, data) VALUES (?, ?, ?, ?)", rows
+            )
+
+    def remove(self, post_ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM posts WHERE id = ?", [(i,) for i in post_ids])
+
+    def update(self, changes):
+        with self._lock, self._conn:
+            for post_id, fields in changes.items():
+                row = self._conn.execute("SELECT data FROM posts WHERE id = ?", (post_id,)).fetchone()
+                if row is None: continue
+                self._conn.execute("UPDATE posts SET data = ? WHERE id = ?", (json.dumps({**json.loads(row[0]), **fields}), post_id))
+
+    def size(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def day_counts(self):
+        # Singles and threads grouped in SQL, each on the day of its first part; no post is decoded
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT day, SUM(n) FROM (
+                    SELECT date(MIN(schedule_time), 'unixepoch') AS day, COUNT(*) AS n
+                    FROM posts GROUP BY COALESCE(thread_id, ':' || id)
+                ) GROUP BY day ORDER BY day
+                """
+            ).fetchall()
+        return dict(rows)
+
+    def changed(self):
+        # data_version only moves when *another* connection commits, i.e. the UI edited the queue
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        changed, self._data_version = version != self._data_version, version
+        return changed
+
+
+# --- FACTORY ---
+def open_store(backend="github", token=None, owner=None, repo=None, db_path=DEFAULT_DB_PATH, message="Update schedule"):
+    """Builds the configured backend. `backend` is "github" (default) or "sqlite"."""
+    if backend == "sqlite":
+        return SQLiteQueueStore(db_path)
+    if backend == "github":
+        return GitHubQueueStore(token, owner, repo, message=message)
+    raise ValueError(f"Unknown queue backend: {backend}")
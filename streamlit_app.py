@@ -1,15 +1,19 @@
 import streamlit as st
-import requests
-import base64
-import json
 import pytz
-import feedparser
-import random
 import uuid # <--- NEW: To track threads
 from datetime import datetime, time, timedelta
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from queue_store import new_id, open_store, DEFAULT_DB_PATH
+from queue_model import QueueIndex
+from media_store import open_media_store, make_thumbnail, post_image_bytes, DEFAULT_MEDIA_DIR
+from image_ingest import ingest_many
+import delivery
+import generators
+from generators import stream_thread_text, stream_remix_batch, stream_lead_posts_batch, stream_news_posts_batch
+from llm_cache import DEFAULT_CACHE_PATH
+from tweet_text import counter, fits
+from bulk_import import InvalidImport, format_of, plan, read_rows
+import accounts
+from feeds import FeedCache, fetch_reddit_viral_lead_gen, fetch_reddit_tech_news, DEFAULT_CACHE_PATH as DEFAULT_FEED_CACHE_PATH
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Agency Command Center", page_icon="🇵🇰", layout="wide")
@@ -40,10 +44,18 @@ try:
     GITHUB_OWNER = st.secrets["github"]["owner"]
     GITHUB_REPO = st.secrets["github"]["repo"]
     GOOGLE_API_KEY = st.secrets["GOOGLE_API_KEY"]
+    QUEUE_BACKEND = st.secrets.get("QUEUE_BACKEND", "github")
+    QUEUE_DB_PATH = st.secrets.get("QUEUE_DB_PATH", DEFAULT_DB_PATH)
+    MEDIA_DIR = st.secrets.get("MEDIA_DIR", DEFAULT_MEDIA_DIR)
+    LLM_CACHE_PATH = st.secrets.get("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+    ACCOUNTS = accounts.names({"X_ACCOUNTS": st.secrets.get("X_ACCOUNTS", "")})  # credentials live with the scheduler
+    FEED_CACHE_PATH = st.secrets.get("FEED_CACHE_PATH", DEFAULT_FEED_CACHE_PATH)
 except Exception:
     st.error("❌ Secrets missing! Check Streamlit Settings.")
     st.stop()
 
+generators.configure(api_key=GOOGLE_API_KEY, cache_path=LLM_CACHE_PATH)
+
 # Initialize Session State
 if "tweet_content" not in st.session_state: st.session_state.tweet_content = ""
 if "page_selection" not in st.session_state: st.session_state.page_selection = "Post Scheduler"
@@ -54,29 +66,62 @@ if "thread_drafts" not in st.session_state: st.session_state.thread_drafts = []
 
 # --- HELPER FUNCTIONS ---
 
-def get_gemini_model(temp=0.7):
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        google_api_key=GOOGLE_API_KEY,
-        temperature=temp
-    )
-
-def get_github_data():
-    url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents/scheduled_posts.json"
-    headers = {"Authorization": f"Bearer {GITHUB_TOKEN}", "Accept": "application/vnd.github+json"}
-    resp = requests.get(url, headers=headers)
-    if resp.status_code == 200:
-        data = resp.json()
-        content = base64.b64decode(data["content"]).decode("utf-8")
-        return json.loads(content) if content.strip() else [], data["sha"]
-    return [], None
-
-def save_to_github(posts, sha):
-    url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents/scheduled_posts.json"
-    headers = {"Authorization": f"Bearer {GITHUB_TOKEN}", "Accept": "application/vnd.github+json"}
-    content = base64.b64encode(json.dumps(posts, indent=2).encode("utf-8")).decode("utf-8")
-    body = {"message": "Update schedule", "content": content, "sha": sha}
-    requests.put(url, headers=headers, json=body)
+@st.cache_resource
+def get_store():
+    return open_store(QUEUE_BACKEND, token=GITHUB_TOKEN, owner=GITHUB_OWNER, repo=GITHUB_REPO, db_path=QUEUE_DB_PATH)
+
+@st.cache_resource
+def get_media_store():
+    return open_media_store(QUEUE_BACKEND, token=GITHUB_TOKEN, owner=GITHUB_OWNER, repo=GITHUB_REPO, media_dir=MEDIA_DIR)
+
+IMAGE_TYPES = ["png", "jpg", "jpeg", "webp", "gif"]
+
+def store_images(uploaded_files):
+    """Optimizes uploads (resize, re-encode, strip EXIF; in parallel for a thread) and puts them in the blob store.
+
+    Returns, per upload (or None), the fields a post keeps instead of the bytes.
+    """
+    present = [f for f in uploaded_files if f]
+    optimized = iter(ingest_many([f.getvalue() for f in present]))
+    fields = []
+    for f in uploaded_files:
+        if not f:
+            fields.append({"image_ref": None, "image_type": None})
+            continue
+        data, mime = next(optimized)
+        fields.append({"image_ref": get_media_store().put(data), "image_type": mime})
+    return fields
+
+def store_image(uploaded_file):
+    return store_images([uploaded_file])[0]
+
+@st.cache_data(show_spinner=False, max_entries=500)
+def thumbnail(ref, max_px):
+    """Small preview of a blob. Refs are content hashes, so the cache never goes stale."""
+    return make_thumbnail(get_media_store().get(ref), max_px)
+
+@st.cache_data(show_spinner=False, max_entries=500)
+def legacy_thumbnail(post_id, max_px, _image_data):
+    """Same for old posts with inline base64 (keyed by post id so the big string isn't hashed every rerun)."""
+    return make_thumbnail(post_image_bytes({"image_data": _image_data}, None), max_px)
+
+def post_thumbnail(post, max_px=150):
+    """Thumbnail bytes for `st.image`, or None. Only called for posts on the visible page."""
+    if post.get("image_ref"): return thumbnail(post["image_ref"], max_px)
+    if post.get("image_data"): return legacy_thumbnail(post["id"], max_px, post["image_data"])
+    return None
+
+def delivery_caption(post):
+    """One line on where a post stands with the scheduler (posted part of an unfinished thread, failed retries)."""
+    state = delivery.state(post)
+    if delivery.is_posted(post): st.caption(f"✅ Posted (tweet {state['tweet_id']})")
+    elif state.get("error"):
+        retry = datetime.fromtimestamp(state["next_retry"], pytz.timezone('Asia/Karachi')).strftime('%I:%M %p')
+        st.caption(f"⚠️ Attempt {state['attempts']} failed: {state['error'][:120]} - retrying at {retry}")
+
+def account_label(post):
+    """Queue row suffix naming the account, when more than one is configured."""
+    return f" @{accounts.account_of(post)}" if len(ACCOUNTS) > 1 else ""
 
 def switch_to_scheduler(text):
     """Teleports text to the scheduler page."""
@@ -84,84 +129,42 @@ def switch_to_scheduler(text):
     st.session_state.page_selection = "Post Scheduler"
     st.rerun()
 
-# --- FETCHERS ---
-def fetch_reddit_viral_lead_gen():
-    rss_url = "https://www.reddit.com/r/SaaS+Entrepreneur+Marketing+Agency/top.rss?t=week&limit=50"
-    try:
-        feed = feedparser.parse(rss_url)
-        entries = feed.entries
-        random.shuffle(entries)
-        return [f"Title: {e.title}\nLink: {e.link}" for e in entries[:15]]
-    except: return []
-
-def fetch_reddit_tech_news():
-    rss_url = "https://www.reddit.com/r/LocalLLaMA+LangChain+OpenAI+ArtificialIntelligence/top.rss?t=day&limit=50"
-    try:
-        feed = feedparser.parse(rss_url)
-        entries = feed.entries
-        clean_entries = [e for e in entries if "help" not in e.title.lower() and "?" not in e.title]
-        random.shuffle(clean_entries)
-        return [f"Headline: {e.title}\nLink: {e.link}" for e in clean_entries[:15]]
-    except: return []
-
-# --- AI GENERATORS ---
-def process_thread_text(raw_text):
-    llm = get_gemini_model(temp=0.3)
-    template = """
-    You are a Twitter Thread Editor.
-    TASK: Split text into tweets. If >280 chars, rewrite to shorter.
-    RAW TEXT: {raw_text}
-    OUTPUT JSON: ["Tweet 1", "Tweet 2"]
-    """
-    prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | llm | JsonOutputParser()
-    return chain.invoke({"raw_text": raw_text})
-
-def generate_remix_batch(raw_text):
-    llm = get_gemini_model(temp=0.8)
-    template = """
-    You are a Viral Social Media Architect.
-    Extract stories from this raw text and rewrite them into 10 unique tweets.
-    STRICT RULES:
-    1. LENGTH: Must be under 280 chars.
-    2. HOOKS: Start with a strong hook.
-    RAW INPUT: {raw_text}
-    OUTPUT JSON: [{{ "category": "Value", "tweet": "...", "source": "Extracted Topic" }}]
-    """
-    prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | llm | JsonOutputParser()
-    return chain.invoke({"raw_text": raw_text})
-
-def generate_lead_posts_batch(reddit_data):
-    llm = get_gemini_model(temp=0.8)
-    template = """
-    You are a Viral B2B Ghostwriter. Create 10 DISTINCT "Lead Gen" tweets.
-    STRICT RULES:
-    1. LENGTH: MUST be under 280 chars.
-    2. STYLE: Hook -> Pain Point -> Solution -> CTA.
-    INPUT: {reddit_data}
-    OUTPUT JSON: [{{ "topic": "...", "tweet": "...", "source": "..." }}]
-    """
-    prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | llm | JsonOutputParser()
-    return chain.invoke({"reddit_data": "\n\n".join(reddit_data)})
-
-def generate_news_posts_batch(reddit_data):
-    llm = get_gemini_model(temp=0.6)
-    template = """
-    You are a Tech Influencer. Create 10 News Tweets.
-    STRICT RULES:
-    1. LENGTH: MUST be under 280 chars.
-    INPUT: {reddit_data}
-    OUTPUT JSON: [{{ "topic": "AI News", "tweet": "...", "source": "..." }}]
-    """
-    prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | llm | JsonOutputParser()
-    return chain.invoke({"reddit_data": "\n\n".join(reddit_data)})
+def suggestion_card(p, key):
+    with st.container(border=True):
+        st.write(p['tweet'])
+        if st.button("🚀 Use", key=key): switch_to_scheduler(p['tweet'])
+
+def show_suggestions(state_key, prefix, stream=None):
+    """Renders the suggestion cards. With a `stream`, replaces them card by card as tweets arrive."""
+    if stream is not None:
+        # Saved as we go, so a "Use" click mid-stream still finds its tweet after the rerun
+        st.session_state[state_key] = []
+        with st.spinner("Writing tweets..."):
+            for item in stream:
+                st.session_state[state_key].append(item)
+                suggestion_card(item, f"{prefix}_{len(st.session_state[state_key]) - 1}")
+        return
+    for idx, p in enumerate(st.session_state[state_key]):
+        suggestion_card(p, f"{prefix}_{idx}")
+
+# --- FEEDS ---
+@st.cache_resource
+def get_feeds():
+    """One warm feed cache per process; a background thread keeps refreshing it."""
+    feeds = FeedCache(path=FEED_CACHE_PATH)
+    feeds.start_background()
+    return feeds
+
+def show_feed_stats():
+    with st.expander("📡 Feed health"):
+        st.dataframe([{"source": name, **stats} for name, stats in get_feeds().stats.items()], use_container_width=True)
 
 # --- NAVIGATION ---
 st.sidebar.title("🚀 Agency Panel")
-selection = st.sidebar.radio("Go to:", ["Post Scheduler", "Thread Creator (New)", "Feed Remix", "Lead Gen", "Tech News"], key="nav_radio")
+selection = st.sidebar.radio("Go to:", ["Post Scheduler", "Thread Creator (New)", "Feed Remix", "Lead Gen", "Tech News", "Generate All"], key="nav_radio")
+
+cache_stats = generators.get_cache().stats()
+st.sidebar.caption(f"🧠 AI cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['entries']} saved)")
 
 if st.session_state.page_selection != selection:
     st.session_state.page_selection = selection
@@ -170,17 +173,18 @@ if st.session_state.page_selection != selection:
 # --- PAGE 1: POST SCHEDULER ---
 if selection == "Post Scheduler":
     st.title("📅 Post Scheduler")
-    posts, sha = get_github_data()
+    store = get_store()
     pkt_zone = pytz.timezone('Asia/Karachi')
     utc_zone = pytz.utc
 
     # --- 1. NEW TWEET FORM ---
     with st.form("schedule_form", clear_on_submit=True):
-        text_input = st.text_area("Tweet Content", value=st.session_state.tweet_content, height=150, max_chars=280)
-        st.caption(f"Chars: {len(text_input)}/280")
+        text_input = st.text_area("Tweet Content", value=st.session_state.tweet_content, height=150)
+        st.caption(counter(text_input))
         
-        uploaded_file = st.file_uploader("📷 Attach Image (Optional)", type=["png", "jpg", "jpeg"])
+        uploaded_file = st.file_uploader("📷 Attach Image (Optional)", type=IMAGE_TYPES)
         
+        account = st.selectbox("Account", ACCOUNTS) if len(ACCOUNTS) > 1 else accounts.DEFAULT_ACCOUNT
         st.write("**Schedule Time (PKT)**")
         c1, c2, c3, c4 = st.columns([2,1,1,1])
         date_val = c1.date_input("Date")
@@ -190,6 +194,7 @@ if selection == "Post Scheduler":
         
         if st.form_submit_button("🚀 Schedule Post"):
             if not text_input: st.warning("Write something first!")
+            elif not fits(text_input): st.warning("Too long for one tweet - trim it or use the Thread Creator.")
             else:
                 h24 = hour_val
                 if ampm == "PM" and hour_val != 12: h24 += 12
@@ -198,88 +203,108 @@ if selection == "Post Scheduler":
                 dt_pkt = pkt_zone.localize(dt_naive)
                 dt_utc = dt_pkt.astimezone(utc_zone)
                 
-                image_data = None
-                if uploaded_file:
-                    bytes_data = uploaded_file.getvalue()
-                    b64 = base64.b64encode(bytes_data).decode('utf-8')
-                    image_data = f"data:image/png;base64,{b64}"
-
                 # No thread_id for single posts
-                posts.append({"text": text_input, "schedule_time": dt_utc.isoformat(), "image_data": image_data, "thread_id": None})
-                save_to_github(posts, sha)
+                store.add([{"id": new_id(), "text": text_input, "schedule_time": dt_utc.isoformat(), **store_image(uploaded_file), "thread_id": None, "account": account}])
                 st.session_state.tweet_content = "" 
                 st.success("Scheduled!")
                 st.rerun()
 
+    # --- BULK IMPORT (one commit for the whole file) ---
+    with st.expander("📥 Bulk Import (CSV / JSONL)"):
+        st.caption("One row per post: `text`, `time` (PKT), `thread` (rows sharing it form a thread), `part`, `image` (file name of an image uploaded below), `account`.")
+        import_file = st.file_uploader("Posts file", type=["csv", "jsonl", "ndjson"], key="import_file")
+        import_images = st.file_uploader("Images used in the file", type=IMAGE_TYPES, accept_multiple_files=True, key="import_images")
+        if import_file and st.button("📦 Import"):
+            uploaded = {f.name: f.getvalue() for f in import_images or []}
+            try:
+                rows = read_rows(import_file.getvalue(), format_of(import_file.name))
+                new_posts, new_images = plan(rows, lambda name: uploaded.get(name.replace("\\", "/").rsplit("/", 1)[-1]), accounts=ACCOUNTS)
+            except InvalidImport as e:
+                st.error(f"❌ {len(e.errors)} problem(s), nothing scheduled:")
+                st.code(str(e))
+            else:
+                with st.spinner(f"Scheduling {len(new_posts)} posts..."):
+                    store.bulk_add(new_posts, new_images, get_media_store())
+                st.success(f"✅ Imported {len(new_posts)} posts.")
+                st.rerun()
+
     st.divider()
     
     # --- 2. SMART QUEUE (GROUPED THREADS) ---
-    st.subheader(f"Queue ({len(posts)} Tweets)")
+    # Per-day counts are cheap (the GitHub store reads its manifest); only the dates on screen get loaded
+    day_counts = store.day_counts()
+    st.subheader(f"Queue ({sum(day_counts.values())} Tweets)")
     
-    if posts:
-        # Sort by time
-        posts.sort(key=lambda x: x['schedule_time'])
-        
-        # Group posts by thread_id
-        grouped_posts = []
-        processed_indices = set()
-        
-        for i, p in enumerate(posts):
-            if i in processed_indices: continue
-            
-            t_id = p.get("thread_id")
-            
-            # If it has a thread_id, find all siblings
-            if t_id:
-                thread_siblings = []
-                for j, sibling in enumerate(posts):
-                    if sibling.get("thread_id") == t_id:
-                        thread_siblings.append((j, sibling)) # Store index and post
-                        processed_indices.add(j)
-                grouped_posts.append({"type": "thread", "items": thread_siblings})
-            else:
-                # Normal single post
-                grouped_posts.append({"type": "single", "items": [(i, p)]})
-                processed_indices.add(i)
+    if day_counts:
+        # FILTERS (default: the first week of the queue; step through it with the arrows)
+        first_day = datetime.fromisoformat(min(day_counts)).date()
+        if "queue_dates" not in st.session_state:
+            st.session_state.queue_dates = (first_day, first_day + timedelta(days=6))
+
+        def shift_dates(direction):
+            start, end = st.session_state.queue_dates[0], st.session_state.queue_dates[-1]
+            step = timedelta(days=(end - start).days + 1) * direction
+            st.session_state.queue_dates = (start + step, end + step)
+
+        f1, f2, f3, f4, f5 = st.columns([2,1,1,1,1])
+        date_range = f1.date_input("Dates (PKT)", key="queue_dates")
+        f2.button("◀ Earlier", on_click=shift_dates, args=(-1,), use_container_width=True)
+        f3.button("Later ▶", on_click=shift_dates, args=(1,), use_container_width=True)
+        kind = f4.selectbox("Type", ["All", "Singles", "Threads"], key="queue_type")
+        page_size = f5.selectbox("Per page", [10, 25, 50], key="queue_page_size")
+
+        from_day, to_day = date_range[0], date_range[-1]
+        from_ts = pkt_zone.localize(datetime.combine(from_day, time.min)).timestamp()
+        to_ts = pkt_zone.localize(datetime.combine(to_day + timedelta(days=1), time.min)).timestamp()
+        # Group posts by thread_id in one pass (each timestamp is parsed once)
+        window = QueueIndex(store.load(from_ts, to_ts)).groups()
+        if kind != "All":
+            wanted = "single" if kind == "Singles" else "thread"
+            window = [g for g in window if g["type"] == wanted]
+
+        # PAGINATION: only the visible page gets rendered
+        pages = max(1, -(-len(window) // page_size))
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+        first = (page - 1) * page_size
+        grouped_posts = window[first:first + page_size]
+        st.caption(f"Showing {first + 1 if window else 0}-{first + len(grouped_posts)} of {len(window)} items (page {page}/{pages})")
 
         # RENDER THE QUEUE
         for group in grouped_posts:
             # --- RENDER SINGLE POST ---
             if group["type"] == "single":
-                idx, p = group["items"][0]
-                dt_utc = datetime.fromisoformat(p['schedule_time'])
-                dt_pkt = dt_utc.astimezone(pkt_zone)
+                p = group["items"][0]
+                dt_pkt = datetime.fromtimestamp(group["start"], pkt_zone)
                 
-                with st.expander(f"📝 {dt_pkt.strftime('%I:%M %p')} - {p['text'][:30]}..."):
+                with st.expander(f"📝 {dt_pkt.strftime('%I:%M %p')}{account_label(p)} - {p['text'][:30]}..."):
                     st.text(p['text'])
-                    if p.get("image_data"): st.image(p["image_data"], width=150)
-                    if st.button("Delete", key=f"del_{idx}"):
-                        posts.pop(idx)
-                        save_to_github(posts, sha)
+                    delivery_caption(p)
+                    thumb = post_thumbnail(p, 150)
+                    if thumb: st.image(thumb, width=150)
+                    if st.button("Delete", key=f"del_{p['id']}"):
+                        store.remove([p["id"]])
                         st.rerun()
             
             # --- RENDER THREAD ---
             elif group["type"] == "thread":
-                first_idx, first_p = group["items"][0]
-                dt_utc = datetime.fromisoformat(first_p['schedule_time'])
-                dt_pkt = dt_utc.astimezone(pkt_zone)
+                first_p = group["items"][0]
+                dt_pkt = datetime.fromtimestamp(group["start"], pkt_zone)
                 count = len(group["items"])
                 
-                with st.expander(f"🧵 THREAD ({count} Tweets) - Starts {dt_pkt.strftime('%I:%M %p')}"):
+                with st.expander(f"🧵 THREAD ({count} Tweets){account_label(first_p)} - Starts {dt_pkt.strftime('%I:%M %p')}"):
                     st.info("These tweets are linked and scheduled 1 minute apart.")
                     
-                    for sub_idx, sub_p in group["items"]:
+                    for sub_p in group["items"]:
                         st.markdown(f"**Tweet:**")
                         st.text(sub_p['text'])
-                        if sub_p.get("image_data"): st.image(sub_p["image_data"], width=100)
+                        delivery_caption(sub_p)
+                        thumb = post_thumbnail(sub_p, 100)
+                        if thumb: st.image(thumb, width=100)
                         st.divider()
                     
-                    if st.button(f"🗑️ Delete Entire Thread", key=f"del_thread_{first_idx}"):
-                        # Remove all items in this thread (reverse order to avoid index shift issues)
-                        indices_to_remove = sorted([x[0] for x in group["items"]], reverse=True)
-                        for rm_idx in indices_to_remove:
-                            posts.pop(rm_idx)
-                        save_to_github(posts, sha)
+                    if st.button(f"🗑️ Delete Entire Thread", key=f"del_thread_{first_p['id']}"):
+                        # Remove all items in this thread
+                        store.remove([x["id"] for x in group["items"]])
                         st.rerun()
 
 # --- PAGE 2: THREAD CREATOR ---
@@ -289,8 +314,15 @@ elif selection == "Thread Creator (New)":
 
     if st.button("✂️ Process"):
         if raw_thread:
+            # Show each tweet as the model produces it, then switch to the editable form
+            preview = st.empty()
+            drafts = []
             with st.spinner("Processing..."):
-                st.session_state.thread_drafts = process_thread_text(raw_thread)
+                for tweet in stream_thread_text(raw_thread):
+                    drafts.append(tweet)
+                    preview.markdown("\n\n".join(f"**{i+1}.** {t}" for i, t in enumerate(drafts)))
+            preview.empty()
+            st.session_state.thread_drafts = drafts
     
     if st.session_state.thread_drafts:
         st.divider()
@@ -300,13 +332,14 @@ elif selection == "Thread Creator (New)":
             for idx, draft in enumerate(st.session_state.thread_drafts):
                 st.markdown(f"**Tweet {idx+1}**")
                 txt = st.text_area(f"T{idx+1}", value=draft, height=100, key=f"t_{idx}")
-                img = st.file_uploader(f"Img {idx+1}", type=['png', 'jpg'], key=f"i_{idx}")
+                img = st.file_uploader(f"Img {idx+1}", type=IMAGE_TYPES, key=f"i_{idx}")
                 updated_texts.append(txt)
                 updated_images.append(img)
-                st.caption(f"Chars: {len(txt)}/280")
+                st.caption(counter(txt))
                 st.write("---")
 
             st.write("### 🕒 Schedule Start")
+            account = st.selectbox("Account", ACCOUNTS) if len(ACCOUNTS) > 1 else accounts.DEFAULT_ACCOUNT
             c1, c2, c3, c4 = st.columns([2,1,1,1])
             date_val = c1.date_input("Date")
             hour_val = c2.selectbox("Hour", range(1, 13))
@@ -314,72 +347,91 @@ elif selection == "Thread Creator (New)":
             ampm = c4.selectbox("AM/PM", ["AM", "PM"])
 
             if st.form_submit_button("🚀 Schedule Thread"):
-                h24 = hour_val
-                if ampm == "PM" and hour_val != 12: h24 += 12
-                if ampm == "AM" and hour_val == 12: h24 = 0
-                pkt_zone = pytz.timezone('Asia/Karachi')
-                utc_zone = pytz.utc
-                
-                dt_naive = datetime.combine(date_val, time(h24, min_val))
-                start_dt_pkt = pkt_zone.localize(dt_naive)
+                too_long = [str(n) for n, txt in enumerate(updated_texts, 1) if not fits(txt)]
+                if too_long: st.warning(f"Too long for one tweet: Tweet {', '.join(too_long)} - trim before scheduling.")
+                else:
+                    h24 = hour_val
+                    if ampm == "PM" and hour_val != 12: h24 += 12
+                    if ampm == "AM" and hour_val == 12: h24 = 0
+                    pkt_zone = pytz.timezone('Asia/Karachi')
+                    utc_zone = pytz.utc
                 
-                posts, sha = get_github_data()
+                    dt_naive = datetime.combine(date_val, time(h24, min_val))
+                    start_dt_pkt = pkt_zone.localize(dt_naive)
                 
-                # GENERATE A UNIQUE THREAD ID
-                new_thread_id = str(uuid.uuid4())
+                    # GENERATE A UNIQUE THREAD ID
+                    new_thread_id = str(uuid.uuid4())
+                    new_posts = []
+                    images = store_images(updated_images)
                 
-                for i, (txt, img_file) in enumerate(zip(updated_texts, updated_images)):
-                    post_time = start_dt_pkt + timedelta(minutes=i)
-                    post_time_utc = post_time.astimezone(utc_zone)
+                    for i, (txt, img_fields) in enumerate(zip(updated_texts, images)):
+                        post_time = start_dt_pkt + timedelta(minutes=i)
+                        post_time_utc = post_time.astimezone(utc_zone)
                     
-                    image_data = None
-                    if img_file:
-                        b64 = base64.b64encode(img_file.getvalue()).decode('utf-8')
-                        image_data = f"data:image/png;base64,{b64}"
-                    
-                    posts.append({
-                        "text": txt,
-                        "schedule_time": post_time_utc.isoformat(),
-                        "image_data": image_data,
-                        "thread_id": new_thread_id # <--- LINK THEM TOGETHER
-                    })
+                        new_posts.append({
+                            "id": new_id(),
+                            "text": txt,
+                            "schedule_time": post_time_utc.isoformat(),
+                            **img_fields, # identical images across parts are stored once
+                            "thread_id": new_thread_id, # <--- LINK THEM TOGETHER
+                            "account": account
+                        })
                 
-                save_to_github(posts, sha)
-                st.success("✅ Thread Scheduled!")
-                st.session_state.thread_drafts = []
-                st.rerun()
+                    get_store().add(new_posts)
+                    st.success("✅ Thread Scheduled!")
+                    st.session_state.thread_drafts = []
+                    st.rerun()
 
 # --- OTHER PAGES (FEED REMIX / LEAD GEN / NEWS) ---
 # (Keeping these simple and robust)
 elif selection == "Feed Remix":
     st.title("♻️ Feed Remix")
     raw = st.text_area("Paste Feed Text:", height=150)
-    if st.button("✨ Remix") and raw:
-        st.session_state.remix_suggestions = generate_remix_batch(raw)
-    if st.session_state.remix_suggestions:
-        for idx, p in enumerate(st.session_state.remix_suggestions):
-            with st.container(border=True):
-                st.write(p['tweet'])
-                if st.button("🚀 Use", key=f"rm_{idx}"): switch_to_scheduler(p['tweet'])
+    stream = stream_remix_batch(raw) if st.button("✨ Remix") and raw else None
+    show_suggestions("remix_suggestions", "rm", stream)
 
 elif selection == "Lead Gen":
     st.title("⚡ Lead Gen")
+    stream = None
     if st.button("🎲 Fetch"):
-        th = fetch_reddit_viral_lead_gen()
-        if th: st.session_state.lead_gen_suggestions = generate_lead_posts_batch(th)
-    if st.session_state.lead_gen_suggestions:
-        for idx, p in enumerate(st.session_state.lead_gen_suggestions):
-            with st.container(border=True):
-                st.write(p['tweet'])
-                if st.button("🚀 Use", key=f"lg_{idx}"): switch_to_scheduler(p['tweet'])
+        th = fetch_reddit_viral_lead_gen(get_feeds())
+        if th: stream = stream_lead_posts_batch(th)
+    show_suggestions("lead_gen_suggestions", "lg", stream)
+    show_feed_stats()
 
 elif selection == "Tech News":
     st.title("🤖 AI News")
+    stream = None
     if st.button("🔄 Fetch"):
-        th = fetch_reddit_tech_news()
-        if th: st.session_state.news_suggestions = generate_news_posts_batch(th)
-    if st.session_state.news_suggestions:
-        for idx, p in enumerate(st.session_state.news_suggestions):
-            with st.container(border=True):
-                st.write(p['tweet'])
-                if st.button("🚀 Use", key=f"nw_{idx}"): switch_to_scheduler(p['tweet'])
+        th = fetch_reddit_tech_news(get_feeds())
+        if th: stream = stream_news_posts_batch(th)
+    show_suggestions("news_suggestions", "nw", stream)
+    show_feed_stats()
+
+elif selection == "Generate All":
+    st.title("⚡ Generate All")
+    st.caption("Runs every generator at once; large inputs are split into chunks that are generated in parallel and merged.")
+    raw = st.text_area("Feed text to remix (optional):", height=120)
+    raw_thread = st.text_area("Thread text (optional):", height=120)
+    if st.button("⚡ Generate All"):
+        feeds = get_feeds()
+        requests = {
+            "lead": generators.lead_jobs(fetch_reddit_viral_lead_gen(feeds)),
+            "news": generators.news_jobs(fetch_reddit_tech_news(feeds)),
+        }
+        if raw: requests["remix"] = generators.remix_jobs(raw)
+        # The thread is split locally; the parts that don't fit are rewritten in the same batch
+        with st.spinner("Generating everything..."):
+            results = generators.generate_all(requests, thread_text=raw_thread or None)
+        st.session_state.lead_gen_suggestions = results["lead"]
+        st.session_state.news_suggestions = results["news"]
+        if "remix" in results: st.session_state.remix_suggestions = results["remix"]
+        if "thread" in results: st.session_state.thread_drafts = results["thread"]
+
+    if st.session_state.thread_drafts:
+        st.info(f"🧵 {len(st.session_state.thread_drafts)} thread tweets ready in Thread Creator.")
+    t1, t2, t3 = st.tabs(["⚡ Lead Gen", "🤖 AI News", "♻️ Feed Remix"])
+    with t1: show_suggestions("lead_gen_suggestions", "ga_lg")
+    with t2: show_suggestions("news_suggestions", "ga_nw")
+    with t3: show_suggestions("remix_suggestions", "ga_rm")
+    show_feed_stats()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules live at the repo root, the fake GitHub / X servers next to the benchmarks
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
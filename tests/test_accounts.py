@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from accounts import account_keys, names
+
+DEFAULT_KEYS = ("ck", "cs", "at", "as")
+
+
+def test_names_merge_the_list_and_the_json_secret():
+    env = {"X_ACCOUNTS": "acme, globex", "X_ACCOUNTS_JSON": json.dumps({"globex": {}, "initech": {}})}
+    assert names(env) == ["default", "acme", "globex", "initech"]
+
+
+def test_json_keys_fall_back_to_the_default_app():
+    env = {"X_ACCOUNTS_JSON": json.dumps({"acme": {"access_token": "a1", "access_token_secret": "s1"},
+                                          "globex": {"consumer_key": "k2", "consumer_secret": "c2",
+                                                     "access_token": "a2", "access_token_secret": "s2"}})}
+    assert account_keys("acme", DEFAULT_KEYS, env) == ("ck", "cs", "a1", "s1")
+    assert account_keys("globex", DEFAULT_KEYS, env) == ("k2", "c2", "a2", "s2")
+
+
+def test_accounts_without_tokens_are_not_configured():
+    env = {"X_ACCOUNTS": "acme", "X_ACCOUNTS_JSON": json.dumps({"globex": {"access_token": "a"}})}
+    assert account_keys("acme", DEFAULT_KEYS, env) is None
+    assert account_keys("globex", DEFAULT_KEYS, env) is None
+    env["TWITTER_ACME_ACCESS_TOKEN"], env["TWITTER_ACME_ACCESS_TOKEN_SECRET"] = "a", "s"
+    assert account_keys("acme", DEFAULT_KEYS, env) == ("ck", "cs", "a", "s")
+
+
+def test_empty_json_secret_is_unset_and_bad_json_is_an_error():
+    assert names({"X_ACCOUNTS_JSON": ""}) == ["default"]
+    with pytest.raises(ValueError, match="X_ACCOUNTS_JSON"):
+        names({"X_ACCOUNTS_JSON": "{acme"})
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from bulk_import import InvalidImport, plan, read_rows
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=pytz.utc)
+no_images = lambda name: None
+
+
+def test_threads_are_ordered_and_spaced_a_minute_apart():
+    rows = read_rows(
+        b'{"thread": "launch", "time": "2026-10-20 09:30", "parts": ["one", "two"]}\n'
+        b'{"text": "single", "time": "2026-10-21T08:00:00Z", "account": "acme"}\n',
+        "jsonl",
+    )
+    posts, images = plan(rows, no_images, now=NOW, accounts=["default", "acme"])
+    assert images == []
+    assert [(p["text"], p["schedule_time"], p["account"]) for p in posts] == [
+        ("one", "2026-10-20T04:30:00+00:00", "default"),  # 09:30 PKT
+        ("two", "2026-10-20T04:31:00+00:00", "default"),
+        ("single", "2026-10-21T08:00:00+00:00", "acme"),
+    ]
+    assert posts[0]["thread_id"] == posts[1]["thread_id"] and posts[2]["thread_id"] is None
+    assert len({p["id"] for p in posts}) == 3
+
+
+def test_csv_parts_follow_their_numbers():
+    rows = read_rows(b"text,time,thread,part\nsecond,,t,2\nfirst,2026-10-20 9:30 PM,t,1\n", "csv")
+    posts, _ = plan(rows, no_images, now=NOW)
+    assert [p["text"] for p in posts] == ["first", "second"]
+    assert datetime.fromisoformat(posts[1]["schedule_time"]) - datetime.fromisoformat(posts[0]["schedule_time"]) == timedelta(minutes=1)
+
+
+def test_every_problem_is_reported_at_once():
+    rows = read_rows(
+        b"text,time,account,image\n"
+        b",2026-10-20 09:30,,\n"
+        b"past,2026-10-01 09:30,,\n"
+        b"who,2026-10-20 09:30,globex,\n"
+        b"pic,2026-10-20 09:30,,missing.png\n"
+        + ("x" * 281).encode() + b",2026-10-20 09:30,,\n",
+        "csv",
+    )
+    with pytest.raises(InvalidImport) as e:
+        plan(rows, no_images, now=NOW, accounts=["default"])
+    assert [line for line, _ in e.value.errors] == [2, 3, 4, 5, 6]
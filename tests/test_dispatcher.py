@@ -0,0 +1,71 @@
+import time
+
+import pytest
+import requests
+import tweepy
+
+import delivery
+from dispatcher import RateLimited, TokenBucket, call_limited, dispatch_by
+
+
+def too_many_requests(reset):
+    response = requests.Response()
+    response.status_code = 429
+    response.headers["x-rate-limit-reset"] = str(reset)
+    response._content = b'{"title": "Too Many Requests"}'
+    return tweepy.TooManyRequests(response)
+
+
+def test_bucket_allows_a_burst_then_paces_at_the_rate():
+    bucket = TokenBucket(rate=20, capacity=3)
+    t0 = time.monotonic()
+    for _ in range(3): bucket.acquire()
+    assert time.monotonic() - t0 < 0.03
+    for _ in range(2): bucket.acquire()
+    assert time.monotonic() - t0 == pytest.approx(0.1, abs=0.04)
+
+
+def test_bucket_for_window_caps_the_burst():
+    bucket = TokenBucket.for_window(limit=300, window=900, burst=10)
+    assert bucket.capacity == 10 and bucket.rate == pytest.approx(1 / 3)
+
+
+def test_a_waiting_bucket_sleeps_until_the_reset_then_starts_full():
+    bucket = TokenBucket(rate=0.001, capacity=2)
+    bucket.pause_until(time.time() + 0.2)
+    t0 = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - t0 >= 0.15
+    bucket.acquire()  # full again after the reset: no second wait
+    assert time.monotonic() - t0 < 0.35
+
+
+def test_a_bucket_that_doesnt_wait_fails_fast_until_the_reset():
+    bucket = TokenBucket(rate=10, capacity=10, wait=False)
+    reset = time.time() + 900
+    calls = []
+
+    def create_tweet():
+        calls.append(1)
+        raise too_many_requests(int(reset))
+
+    t0 = time.monotonic()
+    with pytest.raises(RateLimited) as err:
+        call_limited(bucket, create_tweet)
+    assert err.value.reset == int(reset) and len(calls) == 1
+    # Everyone else on the account fails straight away too, without calling X
+    with pytest.raises(RateLimited):
+        call_limited(bucket, create_tweet)
+    assert len(calls) == 1 and time.monotonic() - t0 < 0.1
+
+
+def test_a_rate_limited_post_retries_after_the_reset():
+    reset = time.time() + 900
+    state = delivery.failed({"id": "a"}, RateLimited(reset), now=time.time(), not_before=reset)
+    assert state["next_retry"] == reset and state["attempts"] == 1
+
+
+def test_dispatch_by_keeps_input_order_across_lanes():
+    groups = [{"n": i, "account": "ab"[i % 2]} for i in range(6)]
+    results = dispatch_by(groups, lambda g: g["account"], lambda g: g["n"] * 10, max_workers=2)
+    assert [(g["n"], r) for g, r in results] == [(i, i * 10) for i in range(6)]
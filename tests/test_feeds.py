@@ -0,0 +1,106 @@
+import json
+
+import feedparser
+import pytest
+
+import feeds
+from feeds import FeedCache
+
+SOURCES = [
+    {"name": "lead", "kind": "lead", "ttl": 3600, "url": "https://example.com/lead.rss"},
+    {"name": "news", "kind": "news", "ttl": 60, "url": "https://example.com/news.rss"},
+]
+
+
+class FakeFeeds:
+    """Stands in for feedparser.parse: replies per URL and remembers the conditional headers sent."""
+
+    def __init__(self):
+        self.replies = {}
+        self.calls = []
+
+    def reply(self, url, status=200, entries=(), etag=None, modified=None, bozo=False, error=None):
+        self.replies[url] = feedparser.FeedParserDict(
+            status=status, entries=[feedparser.FeedParserDict(e) for e in entries], bozo=bozo,
+            **({"etag": etag} if etag else {}), **({"modified": modified} if modified else {}),
+            **({"bozo_exception": error} if error else {}),
+        )
+
+    def __call__(self, url, etag=None, modified=None, agent=None):
+        self.calls.append((url, etag, modified))
+        return self.replies[url]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(feeds.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def parse(monkeypatch):
+    fake = FakeFeeds()
+    monkeypatch.setattr(feeds.feedparser, "parse", fake)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FeedCache(SOURCES, path=str(tmp_path / "feeds.db"))
+
+
+def test_304_only_bumps_the_fetch_timestamp(cache, parse, clock):
+    url = SOURCES[0]["url"]
+    parse.reply(url, entries=[{"title": "Hello", "link": "https://x/1"}], etag='"v1"', modified="Mon, 01 Jan 2024")
+    cache.fetch("lead")
+    etag, modified, fetched_at, entries = cache._row("lead")
+
+    clock[0] += 10
+    parse.reply(url, status=304)
+    cache.fetch("lead")
+
+    assert parse.calls[-1] == (url, '"v1"', "Mon, 01 Jan 2024")
+    assert cache._row("lead") == (etag, modified, fetched_at + 10, entries)
+    assert json.loads(entries)[0]["title"] == "Hello"
+    assert cache.stats["lead"]["fetches"] == 2
+    assert cache.stats["lead"]["not_modified"] == 1
+    assert cache.stats["lead"]["failures"] == 0
+
+
+def test_refresh_refetches_each_source_once_its_own_ttl_runs_out(cache, parse, clock):
+    for s in SOURCES:
+        parse.reply(s["url"], entries=[{"title": s["name"]}])
+    cache.refresh()
+    assert len(parse.calls) == 2
+
+    clock[0] += 61
+    cache.refresh()
+    assert [c[0] for c in parse.calls[2:]] == [SOURCES[1]["url"]]
+
+    clock[0] += 3600
+    cache.refresh(kind="lead")
+    assert [c[0] for c in parse.calls[3:]] == [SOURCES[0]["url"]]
+
+    cache.refresh(kind="lead", force=True)
+    assert len(parse.calls) == 5
+
+
+def test_failures_are_counted_and_keep_the_cached_copy(cache, parse, clock):
+    url = SOURCES[1]["url"]
+    parse.reply(url, entries=[{"title": "Old"}])
+    cache.fetch("news")
+
+    parse.reply(url, status=503)
+    cache.fetch("news")
+    parse.reply(url, bozo=True, error="not well-formed")
+    cache.fetch("news")
+    assert "not well-formed" in cache.stats["news"]["last_error"]
+    parse.replies.clear()
+    cache.fetch("news")
+
+    st = cache.stats["news"]
+    assert (st["fetches"], st["failures"], st["not_modified"]) == (4, 3, 0)
+    assert "news.rss" in st["last_error"]
+    assert [e["title"] for e in cache.entries("news")] == ["Old"]
+
@@ -0,0 +1,62 @@
+import pytest
+
+import generators
+from llm_cache import cache_key
+
+
+class FakeChain:
+    """Stands in for `prompt | llm | parser`: answers from `answers` in turn (or `answers(inputs)`), counting calls."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def from_template(self, template):
+        return self
+
+    def __or__(self, other):
+        return self
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return self.answers(inputs) if callable(self.answers) else self.answers.pop(0)
+
+    def stream(self, inputs):
+        answer = self.invoke(inputs)
+        for n in range(1, len(answer) + 1): yield answer[:n]
+
+
+@pytest.fixture
+def chain(tmp_path, monkeypatch):
+    generators.configure(cache_path=str(tmp_path / "llm.db"))
+    fake = FakeChain([])
+    monkeypatch.setattr(generators, "ChatPromptTemplate", fake)
+    monkeypatch.setattr(generators, "get_gemini_model", lambda temp: fake)
+    monkeypatch.setattr(generators, "JsonOutputParser", lambda: fake)
+    return fake
+
+
+def test_empty_answers_are_not_cached(chain):
+    chain.answers = [[], ["tweet"], ["other"]]
+    assert generators.run_chain("{x}", 0.5, {"x": "a"}) == []
+    assert generators.run_chain("{x}", 0.5, {"x": "a"}) == ["tweet"]
+    assert generators.run_chain("{x}", 0.5, {"x": "a"}) == ["tweet"]
+    assert chain.calls == 2
+
+
+def test_stream_skips_an_empty_cached_value(chain):
+    generators.get_cache().set(cache_key("{x}", generators.MODEL, 0.5, {"x": "a"}), [])
+    chain.answers = [["one", "two"]]
+    assert list(generators.stream_chain("{x}", 0.5, {"x": "a"})) == ["one", "two"]
+    assert list(generators.stream_chain("{x}", 0.5, {"x": "a"})) == ["one", "two"]
+    assert chain.calls == 1
+
+
+def test_generate_all_rewrites_the_thread_in_the_same_batch(chain, monkeypatch):
+    batches = []
+    run_batch = generators.run_batch
+    monkeypatch.setattr(generators, "run_batch", lambda jobs, *a, **kw: batches.append(jobs) or run_batch(jobs, *a, **kw))
+    chain.answers = lambda inputs: ["remixed"] if inputs["raw_text"] == "feed" else ["long part, shorter", "second half"]
+    out = generators.generate_all({"remix": [generators.remix_job("feed")]}, thread_text="Short hook\n\n" + "y" * 300)
+    assert len(batches) == 1 and len(batches[0]) == 2
+    assert out == {"remix": ["remixed"], "thread": ["Short hook", "long part, shorter", "second half"]}
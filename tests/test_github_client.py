@@ -0,0 +1,54 @@
+import pytest
+
+from fake_servers import FakeGitHub
+from github_client import GitHubClient
+
+RAW = "application/vnd.github.raw"
+
+
+@pytest.fixture
+def fake():
+    with FakeGitHub() as server:
+        yield server
+
+
+def test_unchanged_reads_are_revalidated_with_etags(fake):
+    fake.seed({"a.json": "[1]"})
+    client = GitHubClient("t", "owner", "repo", base_url=fake.url)
+    assert client.get("/contents/a.json", accept=RAW) == (200, b"[1]")
+    assert client.get("/contents/a.json", accept=RAW) == (200, b"[1]")
+    assert fake.stats["status"] == {200: 1, 304: 1}
+
+
+def test_cache_is_bounded_by_bytes_least_recently_used_first(fake):
+    fake.seed({f"{n}.txt": "x" * 100 for n in "abc"})
+    client = GitHubClient("t", "owner", "repo", base_url=fake.url, cache_bytes=250)
+    for n in "abab c":
+        if n != " ": client.get(f"/contents/{n}.txt", accept=RAW)
+    assert [key[0] for key in client._cache] == ["/contents/b.txt", "/contents/c.txt"]
+    assert client._cache_size == 200
+
+
+def test_body_larger_than_the_cache_is_not_kept(fake):
+    fake.seed({"big.txt": "x" * 500})
+    client = GitHubClient("t", "owner", "repo", base_url=fake.url, cache_bytes=100)
+    client.get("/contents/big.txt", accept=RAW)
+    assert not client._cache and client._cache_size == 0
+
+
+def test_pinned_and_immutable_reads_are_not_cached(fake):
+    fake.seed({"a.json": "[1]"})
+    client = GitHubClient("t", "owner", "repo", base_url=fake.url)
+    client.get("/contents/a.json", params={"ref": fake.head}, accept=RAW)
+    client.get("/contents/a.json", accept=RAW, cache=False)
+    assert not client._cache
+    client.get("/git/ref/heads/main")
+    assert list(client._cache) == [("/git/ref/heads/main", (), None)]
+
+
+def test_writes_drop_the_cache(fake):
+    fake.seed({"a.json": "[1]"})
+    client = GitHubClient("t", "owner", "repo", base_url=fake.url)
+    client.get("/contents/a.json", accept=RAW)
+    client.write("PUT", "/contents/b.json", json={"message": "m", "content": "WzJd", "branch": "main"})
+    assert not client._cache and client._cache_size == 0
@@ -0,0 +1,172 @@
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import github_client
+import queue_store
+from fake_servers import FakeGitHub
+from queue_shards import day_of, partition
+from queue_store import GitHubQueueStore, QueueStore, SQLiteQueueStore, new_id
+
+DAY = 24 * 60 * 60
+
+
+def post(ts, thread_id=None):
+    return {"id": new_id(), "text": "t", "schedule_time": datetime.fromtimestamp(ts, timezone.utc).isoformat(), "thread_id": thread_id}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    with FakeGitHub() as server:
+        monkeypatch.setattr(github_client, "BASE_URL", server.url)
+        monkeypatch.setattr(github_client, "_clients", {})
+        yield server
+
+
+def store(**kw):
+    return GitHubQueueStore("t", "owner", "repo", **kw)
+
+
+def test_day_counts_see_journal_deletes_on_days_not_read(fake):
+    later = time.time() + 3 * DAY
+    a, b = post(later), post(later + 60)
+    writer = store()
+    writer.add([a, b])
+    writer.compact()
+    writer.load()
+    writer.remove([a["id"]])  # a journal op hinted with the shard of `later`
+
+    assert store().day_counts() == {day_of(later): 1}
+    assert store().size() == 1
+
+
+def test_day_counts_after_the_read_compacts(fake):
+    later = time.time() + 3 * DAY
+    writer = store()
+    writer.add([post(later), post(later + 60)])
+    reader = store(compact_every=1)
+    assert reader.day_counts() == {day_of(later): 2}
+    assert not any(path.startswith("queue_journal/") for path in fake.files())
+
+
+def test_counts_follow_new_writes(fake):
+    later = time.time() + 3 * DAY
+    s = store()
+    s.add([post(later)])
+    assert s.day_counts() == {day_of(later): 1}
+    s.add([post(later + DAY)])
+    assert s.day_counts() == {day_of(later): 1, day_of(later + DAY): 1}
+
+
+def test_sqlite_day_counts_match_the_generic_ones(tmp_path):
+    s = SQLiteQueueStore(str(tmp_path / "q.db"))
+    start = (int(time.time()) // DAY + 2) * DAY - 120  # a thread starting two minutes before midnight
+    s.add([post(start, "th"), post(start + 240, "th"), post(start + 60), post(start + DAY)])
+    assert s.day_counts() == QueueStore.day_counts(s) == {day_of(start): 3, day_of(start + DAY): 1}
+
+
+# --- JOURNAL: CONCURRENT WRITERS ---
+@pytest.fixture
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(queue_store.time, "sleep", lambda seconds: None)
+
+
+def ids(posts):
+    return sorted(p["id"] for p in posts)
+
+
+def test_two_writers_through_conflicts(fake, no_sleep):
+    fake.conflict_rate = 0.3
+    later = time.time() + DAY
+    a, b = store(compact_every=4), store(compact_every=4)
+    kept, dropped = [post(later + n) for n in range(6)], [post(later + 100 + n) for n in range(3)]
+    for n in range(3):
+        a.add([kept[2 * n], dropped[n]])
+        b.load()
+        b.add([kept[2 * n + 1]])
+        b.remove([dropped[n]["id"]])
+    fake.conflict_rate = 0
+    a.compact()
+
+    assert fake.stats["status"].get(409)
+    assert ids(store().load()) == ids(kept)
+    assert not any(path.startswith("queue_journal/") for path in fake.files())
+
+
+def test_delete_from_another_writer_wins_over_a_stale_read(fake):
+    later = time.time() + DAY
+    a, b = store(), store()
+    p = post(later)
+    a.add([p])
+    b.load()
+    b.remove([p["id"]])
+    a.update({p["id"]: {"text": "edited"}})  # a never saw the delete: its update must not bring the post back
+    assert store().load() == []
+
+
+def test_compaction_rebases_when_the_branch_moves(fake, no_sleep, monkeypatch):
+    later = time.time() + DAY
+    a, b = store(), store()
+    first, late = post(later), post(later + 60)
+    a.add([first])
+    write, raced = a.client.write, []
+
+    def racing_write(method, path, **kw):
+        if method == "PATCH" and not raced:
+            raced.append(path)
+            b.add([late])  # lands between a's read and its ref update
+        return write(method, path, **kw)
+
+    monkeypatch.setattr(a.client, "write", racing_write)
+    a.compact()
+
+    assert raced
+    assert ids(store().load()) == ids([first, late])
+    assert not any(path.startswith("queue_journal/") for path in fake.files())
+
+
+# --- SHARDS ---
+def test_partition_files_threads_under_their_first_day():
+    midnight = (int(time.time()) // DAY + 1) * DAY
+    head, tail, single = post(midnight - 60, "th"), post(midnight + 60, "th"), post(midnight + 120)
+    assert partition([tail, single, head]) == {day_of(midnight - 60): [head, tail], day_of(midnight): [single]}
+
+
+def test_compaction_reads_and_rewrites_only_the_shards_it_touches(fake, monkeypatch):
+    start = (int(time.time()) // DAY + 1) * DAY + DAY // 2  # noon tomorrow, so each day's posts share a shard
+    days = [post(start + n * DAY) for n in range(3)]
+    seeder = store()
+    seeder.add(days + [post(start + DAY + 60)])
+    seeder.compact()
+    before = json.loads(fake.files()["queue/manifest.json"])["shards"]
+
+    editor = store()
+    editor.load(start + DAY, start + 2 * DAY)
+    editor.remove([days[1]["id"]])
+    folder, read = store(), []
+    get = folder.client.get
+    monkeypatch.setattr(folder.client, "get", lambda path, *a, **kw: read.append(path) or get(path, *a, **kw))
+    folder.compact()
+
+    after = json.loads(fake.files()["queue/manifest.json"])["shards"]
+    middle = day_of(start + DAY)
+    assert [path for path in read if path.startswith("/contents/queue/2")] == [f"/contents/queue/{middle}.json"]
+    assert after[middle]["count"] == 1 and after[middle]["sha"] != before[middle]["sha"]
+    assert {d: m for d, m in after.items() if d != middle} == {d: m for d, m in before.items() if d != middle}
+
+
+def test_legacy_queue_file_is_split_into_shards(fake):
+    later = time.time() + DAY
+    legacy = [{k: v for k, v in post(later + n * DAY).items() if k != "id"} for n in range(2)]
+    fake.seed({"scheduled_posts.json": json.dumps(legacy)})
+    s = store()
+    first_read = s.load()
+    assert [p["text"] for p in first_read] == ["t", "t"] and ids(first_read) == ids(store().load())
+
+    s.compact()
+    files = fake.files()
+    assert "scheduled_posts.json" not in files
+    assert sorted(json.loads(files["queue/manifest.json"])["shards"]) == [day_of(later), day_of(later + DAY)]
+    assert ids(store().load()) == ids(first_read)  # ids derived from the content survive the migration
@@ -0,0 +1,80 @@
+import io
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+
+import image_ingest
+from image_ingest import ingest, ingest_many, sniff_mime
+
+ORIENTATION = 0x0112
+
+
+def encode(img, fmt, **kw):
+    out = io.BytesIO()
+    img.save(out, fmt, **kw)
+    return out.getvalue()
+
+
+def decode(data):
+    return Image.open(io.BytesIO(data))
+
+
+def test_sniff_mime_reads_magic_bytes():
+    assert sniff_mime(encode(Image.new("RGB", (2, 2)), "PNG")) == "image/png"
+    assert sniff_mime(encode(Image.new("RGB", (2, 2)), "JPEG")) == "image/jpeg"
+    assert sniff_mime(encode(Image.new("RGB", (2, 2)), "GIF")) == "image/gif"
+    assert sniff_mime(encode(Image.new("RGB", (2, 2)), "WEBP")) == "image/webp"
+    assert sniff_mime(b"<html>not an image</html>") == "application/octet-stream"
+
+
+def test_exif_rotation_is_applied_and_metadata_stripped():
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6  # stored sideways, shown rotated 90 degrees clockwise
+    data, mime = ingest(encode(Image.new("RGB", (40, 20), "red"), "JPEG", exif=exif))
+    out = decode(data)
+    assert mime == "image/jpeg" and out.size == (20, 40)
+    assert not out.getexif()
+
+
+def test_long_edge_is_capped():
+    data, _ = ingest(encode(Image.new("RGB", (300, 100)), "PNG"), max_px=100)
+    assert decode(data).size == (100, 33)
+
+
+def test_transparency_stays_png_and_opaque_images_become_jpeg():
+    clear = Image.new("RGBA", (10, 10), (255, 0, 0, 0))
+    data, mime = ingest(encode(clear, "PNG"))
+    assert mime == "image/png" and decode(data).mode == "RGBA"
+    data, mime = ingest(encode(Image.new("RGBA", (10, 10), (255, 0, 0, 255)), "PNG"))
+    assert mime == "image/jpeg" and sniff_mime(data) == "image/jpeg"
+
+
+def test_animated_gif_passes_through():
+    frames = [Image.new("RGB", (10, 10), color) for color in ("red", "green", "blue")]
+    gif = encode(frames[0], "GIF", save_all=True, append_images=frames[1:])
+    assert ingest(gif) == (gif, "image/gif")
+
+
+def test_ingest_many_keeps_order():
+    images = [encode(Image.new("RGB", (size, size)), "PNG") for size in (30, 10, 20)]
+    results = ingest_many(images, max_workers=2)
+    assert [decode(data).size for data, _ in results] == [(30, 30), (10, 10), (20, 20)]
+
+
+def test_ingest_many_falls_back_to_one_at_a_time(monkeypatch):
+    class BrokenPool:
+        def __init__(self, max_workers):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def map(self, *args):
+            raise BrokenProcessPool("no fork here")
+
+    monkeypatch.setattr(image_ingest, "ProcessPoolExecutor", BrokenPool)
+    images = [encode(Image.new("RGB", (size, size)), "PNG") for size in (30, 10)]
+    assert ingest_many(images, max_workers=4) == [ingest(data) for data in images]
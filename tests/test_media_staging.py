@@ -0,0 +1,85 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import media_staging
+from media_staging import EXPIRY_MARGIN, MediaStager
+from media_store import LocalMediaStore
+
+
+class FakeAPI:
+    """tweepy.API stand-in: counts uploads, fails while `down`."""
+
+    def __init__(self, ttl=86400):
+        self.uploads, self.down, self.ttl = 0, False, ttl
+
+    def media_upload(self, filename, file):
+        if self.down: raise RuntimeError("upload failed")
+        self.uploads += 1
+        return SimpleNamespace(media_id=100 + self.uploads, expires_after_secs=self.ttl)
+
+
+@pytest.fixture
+def stager(tmp_path):
+    media = LocalMediaStore(str(tmp_path / "media"))
+    stager = MediaStager(FakeAPI(), media)
+    stager.ref = media.put(b"\x89PNG\r\n\x1a\n image")
+    yield stager
+    stager.shutdown()
+
+
+def post(stager, post_id="p1", **delivery):
+    return {"id": post_id, "text": "t", "image_ref": stager.ref, "image_type": "image/png", "delivery": delivery}
+
+
+def test_uploads_once_and_attaches_the_staged_id(stager):
+    p = post(stager)
+    stager.stage([p])
+    stager.wait([p])
+    assert stager.media_ids(p) == [101] and stager.media_ids(p) == [101]
+    assert stager.api.uploads == 1
+    media_id, expires = stager.staged(p)
+    assert media_id == 101 and expires == pytest.approx(time.time() + 86400, abs=5)
+
+
+def test_reuses_an_upload_saved_by_an_earlier_run(stager):
+    p = post(stager, media_id=42, media_expires=time.time() + 3600)
+    stager.stage([p])
+    assert stager.media_ids(p) == [42]
+    assert stager.api.uploads == 0
+
+
+def test_uploads_again_close_to_expiry(stager):
+    p = post(stager, media_id=42, media_expires=time.time() + EXPIRY_MARGIN - 1)
+    stager.stage([p])
+    stager.wait([p])
+    assert stager.media_ids(p) == [101]
+    assert stager.api.uploads == 1
+
+
+def test_short_lived_upload_is_replaced(stager):
+    stager.api.ttl = EXPIRY_MARGIN / 2  # X says this id expires almost at once
+    p = post(stager)
+    assert stager.media_ids(p) == [101]
+    assert stager.media_ids(p) == [102]
+
+
+def test_failures_are_counted_until_an_upload_works(stager):
+    p = post(stager)
+    stager.api.down = True
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="Image upload failed"):
+            stager.media_ids(p)
+    assert stager.failures["p1"] == {"count": 2, "error": "upload failed"}
+    assert stager.staged(p) is None
+
+    stager.api.down = False
+    assert stager.media_ids(p) == [101]
+    assert "p1" not in stager.failures
+
+
+def test_posts_without_images_upload_nothing(stager):
+    p = {"id": "p2", "text": "t"}
+    stager.stage([p])
+    assert stager.media_ids(p) is None and stager.api.uploads == 0
@@ -0,0 +1,55 @@
+import json
+import os
+
+import metrics
+from metrics import PREFIX, Recorder
+
+
+def sample(recorder):
+    with recorder.span("phase.post", account="acme"):
+        pass
+    recorder.incr("posts_published", 3)
+    recorder.gauge("queue_size", 12)
+    recorder.observe("publish_lag_seconds", 4.5)
+    recorder.observe("publish_lag_seconds", 1.5)
+    return recorder
+
+
+def test_prometheus_text_names_counters_with_total():
+    text = sample(Recorder()).prometheus()
+    assert f"# TYPE {PREFIX}_posts_published_total counter\n{PREFIX}_posts_published_total 3\n" in text
+    assert f"# TYPE {PREFIX}_queue_size gauge\n{PREFIX}_queue_size 12\n" in text
+    assert f"{PREFIX}_publish_lag_seconds_count 2\n{PREFIX}_publish_lag_seconds_sum 6.000000\n" in text
+    assert f'{PREFIX}_span_seconds_count{{span="phase.post"}} 1' in text
+    assert "# EOF" not in text
+
+
+def test_openmetrics_types_the_family_and_ends_with_eof():
+    text = sample(Recorder(openmetrics=True)).prometheus()
+    assert f"# TYPE {PREFIX}_posts_published counter\n{PREFIX}_posts_published_total 3\n" in text
+    assert text.endswith("# EOF\n")
+
+
+def test_flush_replaces_the_textfile_atomically(tmp_path, monkeypatch):
+    path = str(tmp_path / "scheduler.prom")
+    replaced = []
+    replace = os.replace
+    monkeypatch.setattr(metrics.os, "replace", lambda src, dst: replaced.append((src, dst)) or replace(src, dst))
+    recorder = sample(Recorder(textfile=path, openmetrics=True))
+    recorder.flush()
+    assert replaced == [(path + ".tmp", path)]
+    assert sorted(os.listdir(tmp_path)) == ["scheduler.prom"]
+    with open(path, encoding="utf-8") as f:
+        assert f.read().endswith("# EOF\n")
+
+
+def test_json_lines_hold_spans_events_and_the_run_summary(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    recorder = sample(Recorder(log_path=str(path)))
+    recorder.event("published", post_id="p1", lag_s=4.5)
+    recorder.flush()
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [r.get("span") or r.get("event") for r in records] == ["phase.post", "published", "run"]
+    assert records[0]["account"] == "acme" and "ms" in records[0] and "ts" in records[0]
+    assert records[2]["counters"] == {"posts_published": 3}
+    assert records[2]["summaries"]["publish_lag_seconds"] == {"count": 2, "sum": 6.0, "max": 4.5}
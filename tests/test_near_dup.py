@@ -0,0 +1,62 @@
+import pytest
+
+from near_dup import THRESHOLD, MinHashIndex, jaccard, shingles
+
+# Same story, reworded: these must not reach the model twice
+SAME_STORY = [
+    ("OpenAI releases GPT-5 with improved reasoning", "OpenAI releases GPT-5 with better reasoning"),
+    ("Anthropic raises $5B in new funding round", "Anthropic raises $5 billion in new funding round"),
+    ("Apple unveils M4 MacBook Pro with faster neural engine", "Apple unveils new MacBook Pro with M4 and faster neural engine"),
+    ("Google DeepMind's Gemini 2 beats GPT-4 on math benchmarks", "Gemini 2 from Google DeepMind beats GPT-4 on math benchmarks"),
+    ("Meta open-sources Llama 4 models", "Meta open sources its Llama 4 models"),
+    ("Nvidia stock hits record high after earnings beat", "Nvidia shares hit record high after earnings beat"),
+    ("[N] Mistral launches new 7B coding model", "Mistral launches a new 7B coding model (2024)"),
+    ("Microsoft to invest $10B in OpenAI", "Microsoft will invest $10 billion in OpenAI"),
+]
+
+# Same company or template, different story: these must both get through
+DIFFERENT_STORY = [
+    ("OpenAI releases GPT-5 with improved reasoning", "Google releases Gemini 3 with improved coding"),
+    ("Anthropic raises $5B in new funding round", "Mistral raises $600M in new funding round"),
+    ("Apple unveils M4 MacBook Pro", "Apple delays Vision Pro launch in China"),
+    ("Meta open-sources Llama 4 models", "Meta lays off 5% of staff"),
+    ("Nvidia stock hits record high after earnings beat", "AMD stock falls after earnings miss"),
+    ("How I built a SaaS to $10k MRR in 6 months", "How I got my first 100 SaaS customers"),
+    ("Tesla recalls 2 million cars over Autopilot", "Tesla launches robotaxi service in Austin"),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    return MinHashIndex(str(tmp_path / "news.db"))
+
+
+@pytest.mark.parametrize("seen, new", SAME_STORY)
+def test_reworded_headline_is_a_duplicate(index, seen, new):
+    index.add([seen], kind="headline")
+    assert index.match(new) == seen
+
+
+@pytest.mark.parametrize("seen, new", DIFFERENT_STORY)
+def test_different_story_is_not(index, seen, new):
+    index.add([seen], kind="headline")
+    assert not index.is_duplicate(new)
+
+
+def test_threshold_sits_between_the_two_sets():
+    same = min(jaccard(shingles(a), shingles(b)) for a, b in SAME_STORY)
+    different = max(jaccard(shingles(a), shingles(b)) for a, b in DIFFERENT_STORY)
+    assert different < THRESHOLD <= same
+
+
+def test_batch_entries_are_checked_too(index):
+    assert index.is_duplicate(SAME_STORY[0][1], extra=[SAME_STORY[0][0]])
+    assert not index.is_duplicate(DIFFERENT_STORY[0][1], extra=[DIFFERENT_STORY[0][0]])
+
+
+def test_index_survives_a_restart(tmp_path):
+    path = str(tmp_path / "news.db")
+    MinHashIndex(path).add([SAME_STORY[0][0], SAME_STORY[1][0]], kind="headline")
+    index = MinHashIndex(path)
+    assert index.size == 2
+    assert index.is_duplicate(SAME_STORY[0][1]) and index.is_duplicate(SAME_STORY[1][1])
@@ -0,0 +1,316 @@
+import itertools
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+import requests
+import tweepy
+
+import delivery
+import post_scheduler
+from media_store import LocalMediaStore
+from queue_store import SQLiteQueueStore, new_id
+
+
+class Crash(BaseException):
+    """The runner dying mid-run (not an error the scheduler handles)."""
+
+
+class FakeClient:
+    """tweepy.Client stand-in: records tweets, fails the texts listed in `fail` once each (`crash`: dies on them)."""
+
+    def __init__(self, fail=()):
+        self.tweets = []
+        self.fail = set(fail)
+        self.crash = set()
+        self.rate_limited_until = 0  # answers 429 until then
+        self.media = []  # media_ids of each tweet with an image
+        self._ids = itertools.count(1000)
+
+    def create_tweet(self, text, media_ids=None, in_reply_to_tweet_id=None):
+        if self.rate_limited_until > time.time():
+            response = requests.Response()
+            response.status_code, response._content = 429, b"{}"
+            response.headers["x-rate-limit-reset"] = str(int(self.rate_limited_until))
+            raise tweepy.TooManyRequests(response)
+        if text in self.crash:
+            self.crash.discard(text)
+            raise Crash()
+        if text in self.fail:
+            self.fail.discard(text)
+            raise RuntimeError("X is down")
+        if media_ids: self.media.append(media_ids)
+        tweet_id = str(next(self._ids))
+        self.tweets.append((tweet_id, text, in_reply_to_tweet_id))
+        return SimpleNamespace(data={"id": tweet_id})
+
+
+class FakeAPI:
+    """tweepy.API stand-in for image uploads; answers 429 until `rate_limited_until`."""
+
+    def __init__(self):
+        self.uploads = []
+        self.rate_limited_until = 0
+        self._ids = itertools.count(500)
+
+    def media_upload(self, filename, file):
+        if self.rate_limited_until > time.time():
+            response = requests.Response()
+            response.status_code, response._content = 429, b"{}"
+            response.headers["x-rate-limit-reset"] = str(int(self.rate_limited_until))
+            raise tweepy.TooManyRequests(response)
+        self.uploads.append(file.read())
+        return SimpleNamespace(media_id=next(self._ids), expires_after_secs=86400)
+
+
+class FlakyStore(SQLiteQueueStore):
+    """SQLite queue whose `update` fails the first `update_failures` times."""
+
+    update_failures = 0
+
+    def update(self, changes):
+        if self.update_failures:
+            self.update_failures -= 1
+            raise RuntimeError("GitHub 502")
+        super().update(changes)
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    store = FlakyStore(str(tmp_path / "q.db"))
+    client, api, media = FakeClient(), FakeAPI(), LocalMediaStore(str(tmp_path / "media"))
+    monkeypatch.setattr(post_scheduler, "get_store", lambda: store)
+    monkeypatch.setattr(post_scheduler, "get_media_store", lambda: media)
+    monkeypatch.setattr(post_scheduler, "make_clients", lambda keys=None: (client, api))
+    for name in ("CONSUMER_KEY", "CONSUMER_SECRET", "ACCESS_TOKEN", "ACCESS_SECRET"):
+        monkeypatch.setattr(post_scheduler, name, "x")
+    return SimpleNamespace(store=store, client=client, api=api, media=media)
+
+
+def queued(texts, thread=False, minutes_ago=5):
+    start = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    thread_id = new_id() if thread else None
+    return [{"id": new_id(), "text": t, "schedule_time": (start + timedelta(minutes=i if thread else 0)).isoformat(),
+             "thread_id": thread_id} for i, t in enumerate(texts)]
+
+
+def retry_now(store):
+    """Lets every failed post go again without waiting out its backoff."""
+    store.update({p["id"]: {"delivery": {**delivery.state(p), "next_retry": 0}} for p in store.load() if delivery.state(p)})
+
+
+def test_failed_thread_resumes_from_the_part_that_failed(env):
+    env.store.add(queued(["1/ one", "2/ two", "3/ three"], thread=True))
+    env.client.fail = {"2/ two"}
+    post_scheduler.post_due()
+
+    parts = env.store.load()
+    assert [delivery.is_posted(p) for p in parts] == [True, False, False]
+    assert delivery.state(parts[1])["attempts"] == 1
+    first_tweet = delivery.tweet_id(parts[0])
+
+    retry_now(env.store)
+    post_scheduler.post_due()
+    assert env.store.load() == []
+    assert [t[1:] for t in env.client.tweets] == [("1/ one", None), ("2/ two", first_tweet), ("3/ three", env.client.tweets[1][0])]
+
+
+def test_a_failed_update_does_not_skip_removing_posted_posts(env):
+    env.store.add(queued(["single a"]) + queued(["single b"]) + queued(["1/ x", "2/ y"], thread=True))
+    env.client.fail = {"2/ y"}
+    env.store.update_failures = 1  # the thread's checkpoint fails the first time it is written
+    post_scheduler.post_due()
+
+    # The singles are out and gone; the thread's checkpoint was written on a later flush
+    parts = env.store.load()
+    assert [(p["text"], delivery.is_posted(p)) for p in parts] == [("1/ x", True), ("2/ y", False)]
+    retry_now(env.store)
+    post_scheduler.post_due()
+    assert sorted(t[1] for t in env.client.tweets) == ["1/ x", "2/ y", "single a", "single b"]
+    assert env.store.load() == []
+
+
+def test_cron_run_does_not_sleep_through_a_429(env):
+    env.store.add(queued(["single a"]) + queued(["single b"]))
+    env.client.rate_limited_until = time.time() + 900
+    t0 = time.monotonic()
+    post_scheduler.post_due()
+    assert time.monotonic() - t0 < 5
+    # Both wait for X's reset, not the usual one-minute backoff
+    assert [delivery.retry_at(p) for p in env.store.load()] == [int(env.client.rate_limited_until)] * 2
+
+
+def with_image(posts, media, data=b"\x89PNG\r\n\x1a\n image"):
+    ref = media.put(data)
+    return [{**p, "image_ref": ref, "image_type": "image/png"} for p in posts]
+
+
+def test_cron_run_does_not_sleep_through_an_upload_429(env):
+    env.store.add(with_image(queued(["with image"]), env.media) + queued(["text only"]))
+    env.api.rate_limited_until = time.time() + 900
+    t0 = time.monotonic()
+    post_scheduler.post_due()
+    assert time.monotonic() - t0 < 5
+    assert [t[1] for t in env.client.tweets] == ["text only"]
+    assert delivery.retry_at(env.store.load()[0]) == int(env.api.rate_limited_until)
+
+
+def test_cron_run_uploads_images_for_the_next_run(env):
+    soon = with_image(later(["soon"], 180), env.media)[0]
+    env.store.add([soon])
+    post_scheduler.post_due()
+    assert env.client.tweets == [] and len(env.api.uploads) == 1
+    saved = env.store.load()[0]
+    assert delivery.staged_media(saved)[0] == 500
+
+    # Next tick: the post is due and goes out with the id saved above, nothing is uploaded again
+    env.store.remove([saved["id"]])
+    env.store.add([{**saved, "schedule_time": datetime.now(timezone.utc).isoformat()}])
+    post_scheduler.post_due()
+    assert [t[1] for t in env.client.tweets] == ["soon"] and len(env.api.uploads) == 1
+    assert env.client.media == [[500]]
+
+
+def test_a_run_dying_mid_thread_keeps_the_parts_already_posted(env):
+    env.store.add(queued(["1/ one", "2/ two", "3/ three"], thread=True))
+    env.client.crash = {"3/ three"}
+    with pytest.raises(Crash):
+        post_scheduler.post_due()
+    assert [delivery.is_posted(p) for p in env.store.load()] == [True, True, False]
+
+    post_scheduler.post_due()
+    assert [t[1:] for t in env.client.tweets] == [
+        ("1/ one", None), ("2/ two", env.client.tweets[0][0]), ("3/ three", env.client.tweets[1][0])]
+    assert env.store.load() == []
+
+
+def test_uploads_for_parts_after_a_failure_are_kept(env):
+    env.store.add(with_image(queued(["1/ one", "2/ two", "3/ three"], thread=True), env.media))
+    env.client.fail = {"2/ two"}
+    post_scheduler.post_due()
+    assert len(env.api.uploads) == 3
+    assert [bool(delivery.staged_media(p)) for p in env.store.load()] == [False, True, True]
+
+    retry_now(env.store)
+    post_scheduler.post_due()
+    assert env.store.load() == [] and len(env.api.uploads) == 3
+
+
+def test_recorder_saves_tweet_ids_when_removal_fails(env):
+    class NoRemove(SQLiteQueueStore):
+        def mark_posted(self, post_ids):
+            raise RuntimeError("GitHub 500")
+
+    store = NoRemove(env.store.db_path)
+    post = queued(["single"])[0]
+    store.add([post])
+    recorder = post_scheduler.Recorder(store)
+    recorder.record({post["id"]: {"delivery": {"tweet_id": "99"}}}, [post["id"]])
+    assert recorder.flush() is False
+    assert delivery.tweet_id(store.load()[0]) == "99"  # the next run sees it as posted, not due
+    assert recorder.done == {post["id"]}
+
+
+# --- DAEMON ---
+@pytest.fixture
+def two_accounts(env, monkeypatch):
+    """Accounts "default" (env.client) and "b", each with its own FakeClient."""
+    env.clients = {"x": env.client, "b-token": FakeClient()}
+    monkeypatch.setenv("X_ACCOUNTS", "b")
+    monkeypatch.setenv("TWITTER_B_ACCESS_TOKEN", "b-token")
+    monkeypatch.setenv("TWITTER_B_ACCESS_TOKEN_SECRET", "b-secret")
+    monkeypatch.setattr(post_scheduler, "make_clients", lambda keys=None: (env.clients[keys[2]], None))
+    return env
+
+
+def test_daemon_keeps_posting_for_other_accounts_while_one_is_rate_limited(two_accounts):
+    env = two_accounts
+    throttled, other = queued(["from default"], minutes_ago=0), queued(["from b"], minutes_ago=0)
+    other[0]["account"] = "b"
+    env.store.add(throttled + other)
+    env.client.rate_limited_until = time.time() + 900
+
+    daemon = post_scheduler.Daemon()
+    t0 = time.monotonic()
+    daemon.run_once()
+    assert time.monotonic() - t0 < 5
+    assert [t[1] for t in env.clients["b-token"].tweets] == ["from b"]
+    assert env.client.tweets == []
+    # The throttled post waits for X's reset, in the queue and on the heap
+    assert delivery.retry_at(env.store.load()[0]) == int(env.client.rate_limited_until)
+    assert daemon.heap[0][0] == int(env.client.rate_limited_until)
+
+
+def later(texts, seconds, thread=False):
+    """Posts (or thread parts, a minute apart) due `seconds` from now."""
+    return queued(texts, thread=thread, minutes_ago=-seconds / 60)
+
+
+def test_daemon_sleeps_until_the_earliest_post(env):
+    env.store.add(later(["in 30s"], 30) + later(["in 10s"], 10))
+    daemon = post_scheduler.Daemon(poll_interval=60)
+    assert 8 < daemon.run_once() <= 10
+    assert [daemon.posts[pid]["text"] for _, _, pid in sorted(daemon.heap)] == ["in 10s", "in 30s"]
+
+
+def test_daemon_refresh_picks_up_edits_from_another_writer(env):
+    kept, moved, deleted = later(["kept"], 600), later(["moved"], 600), later(["deleted"], 600)
+    env.store.add(kept + moved + deleted)
+    daemon = post_scheduler.Daemon(poll_interval=60)
+    daemon.refresh()
+
+    ui = SQLiteQueueStore(env.store.db_path)  # the app's own connection
+    new_time = (datetime.now(timezone.utc) + timedelta(minutes=20)).isoformat()
+    ui.update({moved[0]["id"]: {"schedule_time": new_time}})
+    ui.remove([deleted[0]["id"]])
+    ui.add(later(["added"], 300))
+    daemon.refresh()
+
+    assert sorted(p["text"] for p in daemon.posts.values()) == ["added", "kept", "moved"]
+    assert (int(datetime.fromisoformat(new_time).timestamp()), moved[0]["id"]) in [(ts, pid) for ts, _, pid in daemon.heap]
+
+
+def test_daemon_keeps_a_thread_in_order_across_a_failure(env):
+    parts = queued(["1/ one", "2/ two", "3/ three"], thread=True)
+    env.store.add(parts)
+    env.client.fail = {"2/ two"}
+    daemon = post_scheduler.Daemon()
+    daemon.run_once()
+    first = env.client.tweets[0][0]
+    assert [t[1] for t in env.client.tweets] == ["1/ one"]
+    assert daemon.thread_tails[parts[0]["thread_id"]] == first
+
+    # Part 3 alone has to wait for part 2
+    daemon.fire([daemon.posts[parts[2]["id"]]])
+    assert len(env.client.tweets) == 1
+    assert daemon.thread_predecessor(daemon.posts[parts[2]["id"]])["id"] == parts[1]["id"]
+
+    daemon.fire([daemon.posts[parts[1]["id"]], daemon.posts[parts[2]["id"]]])
+    assert [t[1:] for t in env.client.tweets[1:]] == [("2/ two", first), ("3/ three", env.client.tweets[1][0])]
+    assert env.store.load() == [] and daemon.posts == {} and daemon.thread_tails == {}
+
+
+def test_daemon_survives_a_failed_pass(env, monkeypatch):
+    env.store.add(later(["single"], 2))
+    loads, sleeps = [], []
+    load = env.store.load
+
+    def flaky_load(*args, **kwargs):
+        loads.append(1)
+        if len(loads) == 2: raise requests.ConnectionError("GitHub 502")
+        return load(*args, **kwargs)
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if env.client.tweets or len(sleeps) > 500: raise KeyboardInterrupt
+        time.sleep(0.01)
+
+    monkeypatch.setattr(env.store, "load", flaky_load)
+    monkeypatch.setattr(env.store, "changed", lambda: True)
+    monkeypatch.setattr(post_scheduler, "time", SimpleNamespace(time=time.time, sleep=sleep))
+    errors = post_scheduler.metrics.recorder.counters.get("daemon_errors", 0)
+    with pytest.raises(KeyboardInterrupt):
+        post_scheduler.Daemon(poll_interval=0).run()
+    assert post_scheduler.metrics.recorder.counters["daemon_errors"] == errors + 1
+    assert [t[1] for t in env.client.tweets] == ["single"]
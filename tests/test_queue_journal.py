@@ -0,0 +1,48 @@
+import time
+
+from queue_journal import delete_op, mark_posted_op, op_name, replay, schedule_op, update_op
+from queue_store import SQLiteQueueStore, new_id
+
+
+def post(text="hello", when="2026-10-20T10:00:00+00:00", **fields):
+    return {"id": new_id(), "text": text, "schedule_time": when, "thread_id": None, **fields}
+
+
+def test_new_ids_are_unique_for_identical_posts():
+    a, b = post(), post()
+    assert a["id"] != b["id"]
+    assert len(replay([], [schedule_op([a]), schedule_op([b])])) == 2
+
+
+def test_same_text_scheduled_again_after_delete_survives():
+    a = post()
+    b = post()  # same text, same time, created after `a` was deleted
+    assert replay([], [schedule_op([a]), delete_op([a["id"]]), schedule_op([b])]) == [b]
+
+
+def test_delete_only_drops_what_came_before_it():
+    a = post()
+    assert replay([], [schedule_op([a]), delete_op([a["id"]])]) == []
+    assert replay([], [delete_op([a["id"]]), schedule_op([a])]) == [a]
+    assert replay([a], [mark_posted_op([a["id"]])]) == []
+
+
+def test_updates_apply_in_order_and_skip_removed_posts():
+    a, b = post("a"), post("b", when="2026-10-20T09:00:00+00:00")
+    out = replay([a, b], [update_op({a["id"]: {"n": 1}}), update_op({a["id"]: {"n": 2}, b["id"]: {"n": 1}}),
+                          delete_op([b["id"]]), update_op({b["id"]: {"n": 3}})])
+    assert out == [{**a, "n": 2}]
+
+
+def test_op_names_sort_after_the_newest_seen():
+    future = f"{int(time.time() * 1000) + 60_000:013d}-abcdef12.json"  # a writer whose clock is a minute ahead
+    assert op_name(after=future) > future
+    names = [op_name()]
+    for _ in range(50): names.append(op_name(after=names[-1]))
+    assert names == sorted(names) and len(set(names)) == 51
+
+
+def test_sqlite_keeps_identical_posts_apart(tmp_path):
+    store = SQLiteQueueStore(str(tmp_path / "q.db"))
+    store.add([{"text": "same", "schedule_time": "2026-10-20T10:00:00+00:00"} for _ in range(2)])
+    assert store.size() == 2
@@ -0,0 +1,34 @@
+from tweet_text import MAX_TWEET_LENGTH, fits, split_thread, weighted_length
+
+
+def test_weighted_length_counts_like_x():
+    assert weighted_length("hello") == 5
+    assert weighted_length("see https://example.com/a/very/long/path?x=1.") == 4 + 23 + 1
+    assert weighted_length("日本") == 4
+    assert weighted_length("👍🏽") == 2
+    assert weighted_length("👨‍👩‍👧") == 2
+    assert fits("a" * MAX_TWEET_LENGTH) and not fits("a" * (MAX_TWEET_LENGTH + 1))
+
+
+def test_numbered_markers_split_the_thread():
+    text = "1/ Intro\nstill intro\n2/ Second\n3/ Third"
+    assert [t for t, _ in split_thread(text)] == ["1/ Intro\nstill intro", "2/ Second", "3/ Third"]
+
+
+def test_unnumbered_first_tweet_keeps_its_own_part():
+    text = "Hook line\n2/ Second\n3/ Third"
+    assert [t for t, _ in split_thread(text)] == ["Hook line", "2/ Second", "3/ Third"]
+
+
+def test_list_items_and_out_of_order_numbers_are_not_markers():
+    text = "Three things:\n1. one\n2. two\n\n5/ is not a marker\n\nLast paragraph"
+    assert [t for t, _ in split_thread(text)] == ["Three things:\n1. one\n2. two", "5/ is not a marker", "Last paragraph"]
+    text = "1/ Start\n2/ Next\n10/ stays in tweet two\n3/ End"
+    assert [t for t, _ in split_thread(text)] == ["1/ Start", "2/ Next\n10/ stays in tweet two", "3/ End"]
+
+
+def test_long_paragraphs_are_packed_by_sentence():
+    sentence = "This sentence is about sixty characters long, give or take. "
+    parts = split_thread(sentence * 10)
+    assert len(parts) == 3 and all(ok for _, ok in parts)
+    assert split_thread("x" * 300) == [("x" * 300, False)]
@@ -0,0 +1,131 @@
+import re
+import unicodedata
+
+# --- CONFIGURATION ---
+# X's weighted counting (twitter-text v3): most Latin / punctuation ranges weigh 1, everything
+# else (CJK, most emoji, ...) weighs 2, every URL counts as a t.co link of 23.
+MAX_TWEET_LENGTH = 280
+URL_LENGTH = 23
+LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+
+URL = re.compile(
+    r"(?:https?://|www\.)[^\s<>\"]+"
+    r"|\b(?:[a-z0-9-]+\.)+(?:com|net|org|io|ai|dev|co|app|me|ly|gg|xyz|info|tech)\b(?:/[^\s<>\"]*)?",
+    re.IGNORECASE,
+)
+_TRAILING = ".,:;!?)]}'\""
+
+# A whole emoji sequence (flags, keycaps, skin tones, ZWJ families) counts as one emoji of weight 2
+_PICTO = "\u2190-\u21ff\u2300-\u23ff\u25a0-\u27bf\u2b00-\u2bff\U0001f000-\U0001faff"
+_MODS = "\ufe0f\u20e3\U0001f3fb-\U0001f3ff\U000e0020-\U000e007f"  # variation selector, keycap, skin tones, tags
+EMOJI = re.compile(
+    rf"[\U0001f1e6-\U0001f1ff]{{2}}"
+    rf"|[#*0-9]\ufe0f?\u20e3"
+    rf"|[{_PICTO}][{_MODS}]*(?:\u200d[{_PICTO}][{_MODS}]*)*"
+)
+
+PARAGRAPH = re.compile(r"\n\s*\n")
+NUMBERED = re.compile(r"^\s*(\d{1,3})\s*/\d{0,3}\s", re.MULTILINE)  # "1/", "2/10"; "3." and "4)" are list items
+SENTENCE = re.compile(r"(?<=[.!?\u2026\u3002\uff01\uff1f])\s+|\n")
+
+
+def _char_weight(ch):
+    cp = ord(ch)
+    return 1 if any(lo <= cp <= hi for lo, hi in LIGHT_RANGES) else 2
+
+
+def _plain_length(text):
+    total, i = 0, 0
+    while i < len(text):
+        m = EMOJI.match(text, i)
+        if m:
+            total += 2
+            i = m.end()
+        else:
+            total += _char_weight(text[i])
+            i += 1
+    return total
+
+
+def urls(text):
+    """(start, end) of every URL X would shorten, without trailing punctuation."""
+    spans = []
+    for m in URL.finditer(text):
+        end = m.end()
+        while end > m.start() and text[end - 1] in _TRAILING: end -= 1
+        spans.append((m.start(), end))
+    return spans
+
+
+def weighted_length(text):
+    """Length of `text` the way X counts it against the 280 limit."""
+    text = unicodedata.normalize("NFC", text or "")
+    total, pos = 0, 0
+    for start, end in urls(text):
+        total += _plain_length(text[pos:start]) + URL_LENGTH
+        pos = end
+    return total + _plain_length(text[pos:])
+
+
+def fits(text, limit=MAX_TWEET_LENGTH):
+    return weighted_length(text) <= limit
+
+
+def counter(text, limit=MAX_TWEET_LENGTH):
+    """Caption for the char counters in the forms."""
+    n = weighted_length(text)
+    return f"Chars: {n}/{limit}" + (" ⚠️ too long" if n > limit else "")
+
+
+# --- SPLITTING ---
+def _markers(text):
+    """Starts of the "1/", "2/", ... markers that count up one by one; others are just text.
+
+    The first tweet may go without one ("2/" first): it then starts at the top of the text.
+    """
+    starts, expected = [], None
+    for m in NUMBERED.finditer(text):
+        n = int(m.group(1))
+        if (expected is None and n in (1, 2)) or n == expected:
+            starts.append(m.start())
+            expected = n + 1
+    if starts and int(NUMBERED.match(text, starts[0]).group(1)) == 2: starts.insert(0, 0)
+    elif starts: starts[0] = 0
+    return starts
+
+
+def _pack(pieces, sep, limit):
+    """Greedily joins consecutive pieces while the result still fits."""
+    out = []
+    for piece in pieces:
+        if out and fits(out[-1] + sep + piece, limit):
+            out[-1] += sep + piece
+        else:
+            out.append(piece)
+    return out
+
+
+def split_thread(text, limit=MAX_TWEET_LENGTH):
+    """Splits a pasted thread into tweets without the LLM.
+
+    Existing "1/", "2/" markers win; otherwise every paragraph starts a new tweet. A paragraph
+    that is too long is packed sentence by sentence. Returns `[(tweet, fits)]`: a sentence
+    that can't fit on its own comes back with `fits=False` for the LLM to rewrite.
+    """
+    text = (text or "").replace("\r\n", "\n").strip()
+    if not text: return []
+    starts = _markers(text)
+    if len(starts) >= 2:
+        blocks = [text[a:b] for a, b in zip(starts, starts[1:] + [len(text)])]
+    else:
+        blocks = PARAGRAPH.split(text)
+
+    out = []
+    for block in (b.strip() for b in blocks):
+        if not block: continue
+        if fits(block, limit):
+            out.append((block, True))
+            continue
+        sentences = [s.strip() for s in SENTENCE.split(block) if s.strip()]
+        out += [(t, fits(t, limit)) for t in _pack(sentences, " ", limit)]
+    return out